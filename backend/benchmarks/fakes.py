@@ -0,0 +1,80 @@
+"""Local stand-ins for external systems used by the load benchmarks"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from services.sms_service import SMSProvider
+
+
+class FakeSMSProvider(SMSProvider):
+    """SMS provider that simulates network latency and a failure rate without sending anything"""
+
+    def __init__(self, latency_ms: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency_ms / 1000
+        self.failure_rate = failure_rate
+        self.sent = 0
+        self.failed = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send_sms(self, recipient: str, message: str) -> Dict[str, any]:
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            if self._random.random() < self.failure_rate:
+                self.failed += 1
+                return {'success': False, 'error': 'Simulated provider failure'}
+            self.sent += 1
+            return {'success': True, 'message_id': f"fake-{self.sent}", 'status': 'Success'}
+
+
+class StubSourceServer:
+    """Threaded local HTTP server returning a fixed JSON payload for any GET"""
+
+    def __init__(self, payload: Optional[dict] = None, latency_ms: float = 0.0):
+        self.payload = json.dumps(payload or {
+            "home_team": "Lakers",
+            "away_team": "Bulls",
+            "home_score": 70,
+            "away_score": 72,
+            "status": "live",
+        }).encode("utf-8")
+        self.latency = latency_ms / 1000
+        self.requests = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(stub.payload)))
+                self.end_headers()
+                self.wfile.write(stub.payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
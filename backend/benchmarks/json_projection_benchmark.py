@@ -0,0 +1,96 @@
+"""
+Source payload parsing benchmark
+
+Serves a large JSON feed from a local stub source and fetches it through
+ConditionEvaluator.fetch_payload three ways: a full orjson parse (no
+paths), a projected stream whose fields come first in the document (the
+download stops early), and a projected stream whose field is at the very
+end (the whole document is tokenized but only that field is built).
+Reports latency and peak Python heap allocated per fetch.
+
+Usage (from the backend directory):
+    python -m benchmarks.json_projection_benchmark --events 50000 --iterations 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.common import percentile
+from benchmarks.fakes import StubSourceServer
+
+
+def _payload(events: int) -> dict:
+    return {
+        "home_team": "Lakers",
+        "away_team": "Bulls",
+        "home_score": 70,
+        "away_score": 72,
+        "events": [
+            {"minute": i % 48, "description": f"Play {i} by player {i % 13}", "odds": [1.5, 2.5]}
+            for i in range(events)
+        ],
+        "summary": {"total": 142},
+    }
+
+
+async def _measure(evaluator, url, paths, iterations):
+    samples = []
+    size = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        data, size = await evaluator.fetch_payload(url, paths=paths)
+        samples.append(time.perf_counter() - start)
+        assert data is not None, "fetch failed"
+
+    # Separate pass: tracing allocations slows everything down
+    peaks = []
+    for _ in range(min(iterations, 3)):
+        tracemalloc.start()
+        await evaluator.fetch_payload(url, paths=paths)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return samples, peaks, size
+
+
+def _report(name, samples, peaks, size):
+    print(
+        f"{name:<26} p50 {statistics.median(samples) * 1000:8.2f} ms   "
+        f"p95 {percentile(samples, 95) * 1000:8.2f} ms   "
+        f"peak heap {max(peaks) / 1024 / 1024:7.2f} MiB   read {size / 1024 / 1024:6.2f} MiB"
+    )
+
+
+async def run(events: int, iterations: int):
+    from services.condition_evaluator import condition_evaluator
+
+    condition_evaluator.cache_ttl_seconds = 0  # Measure every fetch
+    source = StubSourceServer(payload=_payload(events))
+    source.start()
+    try:
+        print(f"payload {len(source.payload) / 1024 / 1024:.2f} MiB, {iterations} iterations")
+        cases = [
+            ("full parse (orjson)", None),
+            ("projected, early fields", {"home_team", "home_score", "away_team", "away_score"}),
+            ("projected, last field", {"summary.total"}),
+        ]
+        for name, paths in cases:
+            samples, peaks, size = await _measure(condition_evaluator, source.url + "/feed", paths, iterations)
+            _report(name, samples, peaks, size)
+    finally:
+        source.stop()
+        await condition_evaluator.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.events, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+List endpoint serialization benchmark
+
+Compares the previous response path for task and notification pages (load
+ORM objects, validate each through the response schema, jsonable_encoder,
+json.dumps) with the column-projected orjson path the routers now use.
+
+Usage (from the backend directory):
+    python -m benchmarks.list_benchmark --page-size 100 --iterations 200
+"""
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.common import use_temp_database, percentile
+
+
+def _timed(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _report(name, samples):
+    p95 = percentile(samples, 95)
+    print(f"{name:<28} p50 {statistics.median(samples) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms")
+
+
+def run(page_size: int, iterations: int):
+    from fastapi.encoders import jsonable_encoder
+    from database import engine, Base, SessionLocal
+    from models import User, Task, Notification, SMSProvider, DeliveryStatus
+    from services.message_store import message_store
+    from schemas import TaskListResponse, NotificationResponse
+    from serialization import rows_response
+    from routers.tasks import TASK_COLUMNS
+    from routers.notifications import NOTIFICATION_COLUMNS
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(email="bench@example.com", username="bench", hashed_password="x")
+    db.add(user)
+    db.commit()
+    tasks = [
+        Task(
+            name=f"Task {i}",
+            description="Benchmark task",
+            source_link="https://example.com/feed",
+            schedule_human="every 5 minutes",
+            recipients=[f"+2547{i:08d}", f"+2547{i + 1:08d}"],
+            condition_rules={"type": "total_over", "value": 140},
+            message_template="{home_team} {home_score} - {away_team} {away_score}",
+            user_id=user.id
+        )
+        for i in range(page_size)
+    ]
+    db.add_all(tasks)
+    db.commit()
+    body_id = message_store.body_id(db, "Lakers 70 - Bulls 72. Total: 142")
+    db.add_all([
+        Notification(
+            task_id=tasks[i % len(tasks)].id,
+            recipient=f"+2547{i:08d}",
+            body_id=body_id,
+            provider=SMSProvider.AFRICASTALKING,
+            status=DeliveryStatus.SENT
+        )
+        for i in range(page_size)
+    ])
+    db.commit()
+
+    def legacy(model, schema):
+        def serialize():
+            db.expunge_all()
+            objects = db.query(model).limit(page_size).all()
+            validated = [schema.model_validate(obj) for obj in objects]
+            return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+        return serialize
+
+    def fast(columns):
+        def serialize():
+            return rows_response(db.query(*columns).limit(page_size)).body
+        return serialize
+
+    print(f"page size {page_size}, {iterations} iterations")
+    _report("tasks (ORM + validation)", _timed(legacy(Task, TaskListResponse), iterations))
+    _report("tasks (columns + orjson)", _timed(fast(TASK_COLUMNS), iterations))
+    _report("notifications (ORM + val.)", _timed(legacy(Notification, NotificationResponse), iterations))
+    _report("notifications (fast)", _timed(fast(NOTIFICATION_COLUMNS), iterations))
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    use_temp_database()
+    run(args.page_size, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Login throughput benchmark
+
+Fires a burst of concurrent logins at the auth router while probing /health,
+and reports login throughput plus the latency other endpoints see meanwhile.
+
+Usage (from the backend directory):
+    python -m benchmarks.login_benchmark --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import use_temp_database, percentile
+
+
+async def run(logins: int, concurrency: int):
+    import httpx
+    from database import engine, Base
+    from main import app
+    from services.password_hasher import password_hasher
+
+    Base.metadata.create_all(bind=engine)
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        await client.post("/api/auth/register", json={
+            "email": "bench@example.com",
+            "username": "bench",
+            "password": "benchpassword"
+        })
+
+        semaphore = asyncio.Semaphore(concurrency)
+        login_latencies = []
+        health_latencies = []
+        done = asyncio.Event()
+
+        async def login():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/api/auth/login", data={
+                    "username": "bench",
+                    "password": "benchpassword"
+                })
+                response.raise_for_status()
+                login_latencies.append(time.perf_counter() - start)
+
+        async def probe_health():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                health_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        prober = asyncio.create_task(probe_health())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+
+    password_hasher.stop()
+
+    print(f"bcrypt rounds:      {password_hasher.rounds}")
+    print(f"hash workers:       {password_hasher.max_workers}")
+    print(f"logins:             {logins} (concurrency {concurrency})")
+    print(f"throughput:         {logins / elapsed:.1f} logins/s")
+    print(f"login p50/p95:      {percentile(login_latencies, 50) * 1000:.1f} / "
+          f"{percentile(login_latencies, 95) * 1000:.1f} ms")
+    if health_latencies:
+        print(f"/health p50/p95:    {statistics.median(health_latencies) * 1000:.1f} / "
+              f"{percentile(health_latencies, 95) * 1000:.1f} ms "
+              f"({len(health_latencies)} probes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    use_temp_database()
+    asyncio.run(run(args.logins, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
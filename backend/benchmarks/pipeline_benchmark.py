@@ -0,0 +1,245 @@
+"""
+End-to-end load benchmark for the task pipeline
+
+Runs entirely locally: a stub HTTP data source, a fake SMS provider (with
+configurable latency and failure rate) registered in SMSService, and a
+seeded database of N tasks with M recipients each. It then drives
+
+  1. TaskScheduler._execute_task for every task (fetch, evaluate, send),
+  2. one RetryService pass over the notifications that failed,
+  3. the REST list endpoints,
+
+and reports throughput, latency percentiles and database writes per run.
+Results are written as JSON (default: benchmarks/results/) so runs can be
+compared over time.
+
+Usage (from the backend directory):
+    python -m benchmarks.pipeline_benchmark --tasks 200 --recipients 10 \\
+        --provider-latency-ms 5 --failure-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+from benchmarks.common import use_temp_database, latency_summary, WriteCounter
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def _seed(db, source_url, tasks, recipients):
+    """Create a benchmark user with N tasks of M recipients each"""
+    from models import User, Task
+    from config import settings
+    from services.password_hasher import hash_password
+
+    user = User(
+        email="bench@example.com",
+        username="bench",
+        hashed_password=hash_password("benchpassword", settings.bcrypt_rounds)
+    )
+    db.add(user)
+    db.commit()
+
+    db.add_all([
+        Task(
+            name=f"Load task {i}",
+            source_link=f"{source_url}/games/{i}",
+            schedule_human="every 5 minutes",
+            recipients=[f"+2547{i:04d}{r:04d}" for r in range(recipients)],
+            condition_rules={"type": "total_over", "value": 100},
+            message_template="{home_team} {home_score} - {away_team} {away_score}",
+            user_id=user.id
+        )
+        for i in range(tasks)
+    ])
+    db.commit()
+    return user
+
+
+async def _execute_phase(task_ids, concurrency, writes):
+    from services.scheduler_service import task_scheduler
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def run(task_id):
+        async with semaphore:
+            start = time.perf_counter()
+            await task_scheduler._execute_task(task_id)
+            latencies.append(time.perf_counter() - start)
+
+    writes.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*(run(task_id) for task_id in task_ids))
+    elapsed = time.perf_counter() - started
+    return latencies, elapsed, writes.reset()
+
+
+async def _retry_phase(writes):
+    from database import SessionLocal
+    from models import Notification, DeliveryStatus
+    from services.retry_service import retry_service
+
+    db = SessionLocal()
+    try:
+        pending = db.query(Notification).filter(
+            Notification.status.in_([DeliveryStatus.FAILED, DeliveryStatus.QUEUED])
+        ).count()
+    finally:
+        db.close()
+
+    writes.reset()
+    started = time.perf_counter()
+    await retry_service._retry_failed_notifications()
+    elapsed = time.perf_counter() - started
+    return pending, elapsed, writes.reset()
+
+
+async def _api_phase(token, requests, concurrency):
+    import httpx
+    from main import app
+
+    headers = {"Authorization": f"Bearer {token}"}
+    results = {}
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        for path in ("/api/tasks/", "/api/notifications/"):
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies = []
+
+            async def call():
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.get(path, headers=headers)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(call() for _ in range(requests)))
+            elapsed = time.perf_counter() - started
+            results[path] = {
+                "requests_per_second": round(requests / elapsed, 2),
+                "latency": latency_summary(latencies),
+            }
+    return results
+
+
+async def run(args):
+    from auth import create_access_token
+    from database import engine, Base, SessionLocal
+    from models import Task
+    from services.sms_service import sms_service
+    from services.condition_evaluator import condition_evaluator
+    from benchmarks.fakes import FakeSMSProvider, StubSourceServer
+
+    # Keep per-message logging from dominating the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    source = StubSourceServer(latency_ms=args.source_latency_ms)
+    source.start()
+    provider = FakeSMSProvider(
+        latency_ms=args.provider_latency_ms,
+        failure_rate=args.failure_rate,
+        seed=args.seed
+    )
+    # Route every send (primary and fallback) through the fake provider
+    sms_service.providers = {"africastalking": provider}
+
+    Base.metadata.create_all(bind=engine)
+    writes = WriteCounter(engine)
+
+    db = SessionLocal()
+    try:
+        user = _seed(db, source.url, args.tasks, args.recipients)
+        task_ids = [task_id for (task_id,) in db.query(Task.id).order_by(Task.id)]
+        token = create_access_token({"sub": user.username})
+    finally:
+        db.close()
+
+    try:
+        latencies, elapsed, execute_writes = await _execute_phase(task_ids, args.concurrency, writes)
+        messages = args.tasks * args.recipients
+        execute = {
+            "runs": len(task_ids),
+            "messages": messages,
+            "elapsed_seconds": round(elapsed, 3),
+            "runs_per_second": round(len(task_ids) / elapsed, 2),
+            "messages_per_second": round(messages / elapsed, 2),
+            "run_latency": latency_summary(latencies),
+            "db_writes": execute_writes,
+            "db_writes_per_run": round(execute_writes / len(task_ids), 2),
+            "source_requests": source.requests,
+            "provider_failed": provider.failed,
+        }
+
+        pending, retry_elapsed, retry_writes = await _retry_phase(writes)
+        retry = {
+            "notifications": pending,
+            "elapsed_seconds": round(retry_elapsed, 3),
+            "notifications_per_second": round(pending / retry_elapsed, 2) if retry_elapsed else 0.0,
+            "db_writes": retry_writes,
+        }
+
+        api = await _api_phase(token, args.api_requests, args.concurrency)
+    finally:
+        source.stop()
+        await condition_evaluator.close()
+
+    return {
+        "benchmark": "pipeline",
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "database": engine.url.get_backend_name(),
+        "parameters": vars(args),
+        "execute": execute,
+        "retry": retry,
+        "api": api,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--recipients", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--provider-latency-ms", type=float, default=0.0)
+    parser.add_argument("--source-latency-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--api-requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/pipeline-<timestamp>.json)")
+    args = parser.parse_args()
+
+    use_temp_database()
+    results = asyncio.run(run(args))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"pipeline-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
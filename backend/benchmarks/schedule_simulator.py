@@ -0,0 +1,267 @@
+"""
+Accelerated-clock schedule simulator for capacity planning
+
+Loads tasks from the configured database and replays the triggers
+TaskScheduler._parse_schedule builds for them over a time range on a
+virtual clock: nothing is fetched or sent and no time passes. Each fire
+is charged a stub fetch (skipped when another task fetched the same URL
+within FETCH_CACHE_TTL_SECONDS) and a stub send per recipient, and runs
+are queued for the MAX_CONCURRENT_TASK_RUNS slots the way the scheduler
+queues them. Reports:
+
+  - task fires, source fetches and SMS per minute (busiest minutes, and an
+    hourly histogram; every minute goes to --json),
+  - fetches per source host (total and peak per minute),
+  - expected SMS messages and billed segments per provider,
+  - peak concurrency (runs wanting a slot at once) and queueing delay.
+
+Adaptive tasks are replayed at their minimum interval (a source that keeps
+changing) and push-only tasks are skipped. SMS counts assume every run's
+condition matches unless --match-rate says otherwise, and are counted
+before digest merging.
+
+Usage (from the backend directory; DATABASE_URL selects the database):
+    python -m benchmarks.schedule_simulator --hours 24 --user alice --json plan.json
+"""
+import argparse
+import heapq
+import json
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from apscheduler.triggers.interval import IntervalTrigger
+
+from benchmarks.common import percentile
+
+
+@dataclass
+class SimTask:
+    """What the simulator needs from a task"""
+    id: int
+    name: str
+    trigger: object
+    source_link: Optional[str]
+    recipients: int
+    segments: int
+
+
+def _load_tasks(start: datetime, user: Optional[str], include_inactive: bool) -> Tuple[List[SimTask], Counter]:
+    """Build a trigger for every task; returns the tasks and counts of the ones skipped"""
+    from database import SessionLocal
+    from models import Task, User
+    from services.scheduler_service import task_scheduler, DEFAULT_MESSAGE_TEMPLATE
+    from services.sms_encoding import segment_info
+
+    skipped = Counter()
+    tasks = []
+    db = SessionLocal()
+    try:
+        query = db.query(Task)
+        if user:
+            query = query.join(User, Task.user_id == User.id).filter(
+                (User.username == user) | (User.email == user)
+            )
+        if not include_inactive:
+            query = query.filter(Task.is_active.is_(True))
+
+        for task in query.order_by(Task.id):
+            if task.poll_min_seconds and task.poll_max_seconds:
+                trigger = IntervalTrigger(seconds=task.poll_min_seconds)
+            else:
+                trigger = task_scheduler._parse_schedule(task.schedule_cron, task.schedule_human)
+            if trigger is None:
+                skipped["push only" if not task.schedule_cron and not task.schedule_human else "unparseable schedule"] += 1
+                continue
+            if isinstance(trigger, IntervalTrigger):
+                # Live interval jobs first fire one interval after they are loaded; load them at the start
+                trigger = IntervalTrigger(seconds=trigger.interval.total_seconds(), start_date=start + trigger.interval)
+
+            recipients = task.recipient_count if task.recipient_count is not None else len(task.recipients or [])
+            tasks.append(SimTask(
+                id=task.id,
+                name=task.name,
+                trigger=trigger,
+                source_link=task.source_link,
+                recipients=recipients,
+                segments=segment_info(task.message_template or DEFAULT_MESSAGE_TEMPLATE).segments
+            ))
+    finally:
+        db.close()
+    return tasks, skipped
+
+
+def _fires(index: int, trigger, start: datetime, end: datetime) -> Iterator[Tuple[datetime, int]]:
+    previous, now = None, start
+    while True:
+        fire = trigger.get_next_fire_time(previous, now)
+        if fire is None or fire >= end:
+            return
+        yield fire, index
+        previous, now = fire, fire + timedelta(microseconds=1)
+
+
+def simulate(
+    tasks: List[SimTask],
+    start: datetime,
+    end: datetime,
+    slots: int,
+    fetch_ms: float,
+    send_ms: float,
+    match_rate: float,
+    cache_ttl_seconds: float,
+    provider: str
+) -> dict:
+    """Replay every fire in time order and aggregate the load it would cause"""
+    minutes = max(1, math.ceil((end - start).total_seconds() / 60))
+    fires_per_minute = [0] * minutes
+    fetches_per_minute = [0] * minutes
+    sms_per_minute = [0.0] * minutes
+    host_fetches: Dict[str, Counter] = defaultdict(Counter)
+    last_fetch: Dict[str, datetime] = {}
+    cache_ttl = timedelta(seconds=cache_ttl_seconds)
+
+    free_slots = [0.0] * slots  # When each run slot frees up, seconds from start
+    in_flight: List[float] = []  # End times of runs if there were no slot limit
+    peak_concurrency = 0
+    delays = []
+    messages = segments = 0.0
+
+    streams = [_fires(index, task.trigger, start, end) for index, task in enumerate(tasks)]
+    for fire, index in heapq.merge(*streams):
+        task = tasks[index]
+        offset = (fire - start).total_seconds()
+        minute = int(offset // 60)
+        fires_per_minute[minute] += 1
+
+        duration = 0.0
+        if task.source_link:
+            previous = last_fetch.get(task.source_link)
+            if previous is None or fire - previous >= cache_ttl:
+                last_fetch[task.source_link] = fire
+                fetches_per_minute[minute] += 1
+                host_fetches[urlsplit(task.source_link).netloc or task.source_link][minute] += 1
+                duration += fetch_ms / 1000
+        sent = task.recipients * match_rate
+        duration += sent * send_ms / 1000
+        sms_per_minute[minute] += sent
+        messages += sent
+        segments += sent * task.segments
+
+        while in_flight and in_flight[0] <= offset:
+            heapq.heappop(in_flight)
+        heapq.heappush(in_flight, offset + duration)
+        peak_concurrency = max(peak_concurrency, len(in_flight))
+
+        started = max(offset, heapq.heappop(free_slots))
+        heapq.heappush(free_slots, started + duration)
+        delays.append(started - offset)
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "tasks": len(tasks),
+        "fires": sum(fires_per_minute),
+        "fetches": sum(fetches_per_minute),
+        "sms": {provider: {"messages": round(messages), "segments": round(segments)}},
+        "peak_concurrency": peak_concurrency,
+        "run_slots": slots,
+        "queue_delay_seconds": {
+            "p50": round(percentile(delays, 50), 3),
+            "p95": round(percentile(delays, 95), 3),
+            "max": round(max(delays), 3) if delays else 0.0,
+        },
+        "hosts": {
+            host: {"fetches": sum(counts.values()), "peak_per_minute": max(counts.values())}
+            for host, counts in sorted(host_fetches.items(), key=lambda item: -sum(item[1].values()))
+        },
+        "per_minute": {
+            "fires": fires_per_minute,
+            "fetches": fetches_per_minute,
+            "sms": [round(value, 1) for value in sms_per_minute],
+        },
+    }
+
+
+def _bar(value: float, peak: float, width: int = 40) -> str:
+    return "#" * (round(value / peak * width) if peak else 0)
+
+
+def _report(result: dict, skipped: Counter, top: int):
+    start = datetime.fromisoformat(result["start"])
+    per_minute = result["per_minute"]
+    print(f"{result['tasks']} tasks from {result['start']} to {result['end']}"
+          + (f" (skipped: {', '.join(f'{count} {reason}' for reason, count in skipped.items())})" if skipped else ""))
+    print(f"fires {result['fires']}, fetches {result['fetches']}, "
+          f"peak fires/min {max(per_minute['fires'], default=0)}, "
+          f"peak fetches/min {max(per_minute['fetches'], default=0)}, "
+          f"peak SMS/min {max(per_minute['sms'], default=0):g}")
+    for provider, sms in result["sms"].items():
+        print(f"SMS via {provider}: {sms['messages']} messages, {sms['segments']} segments")
+    delay = result["queue_delay_seconds"]
+    print(f"peak concurrency {result['peak_concurrency']} (slots {result['run_slots']}), "
+          f"queue delay p50 {delay['p50']}s p95 {delay['p95']}s max {delay['max']}s")
+
+    if result["hosts"]:
+        print("\nfetches per host:")
+        for host, counts in list(result["hosts"].items())[:top]:
+            print(f"  {host:<40} {counts['fetches']:>8}   peak/min {counts['peak_per_minute']}")
+
+    busiest = heapq.nlargest(top, range(len(per_minute["fires"])), key=lambda minute: per_minute["fires"][minute])
+    print("\nbusiest minutes:")
+    for minute in sorted(busiest):
+        if per_minute["fires"][minute]:
+            print(f"  {start + timedelta(minutes=minute):%Y-%m-%d %H:%M}  fires {per_minute['fires'][minute]:>6}  "
+                  f"fetches {per_minute['fetches'][minute]:>6}  SMS {per_minute['sms'][minute]:>8g}")
+
+    hourly = [sum(per_minute["fires"][hour:hour + 60]) for hour in range(0, len(per_minute["fires"]), 60)]
+    peak = max(hourly, default=0)
+    print("\nfires per hour:")
+    for hour, fires in enumerate(hourly):
+        print(f"  {start + timedelta(hours=hour):%m-%d %H:00} {fires:>8} {_bar(fires, peak)}")
+
+
+def main():
+    from config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", help="ISO start time (default: now, UTC)")
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--user", help="Only this user's tasks (username or email)")
+    parser.add_argument("--include-inactive", action="store_true")
+    parser.add_argument("--fetch-ms", type=float, default=200.0, help="Stub fetch time per source request")
+    parser.add_argument("--send-ms", type=float, default=50.0, help="Stub send time per recipient")
+    parser.add_argument("--match-rate", type=float, default=1.0, help="Fraction of runs whose condition matches")
+    parser.add_argument("--slots", type=int, default=settings.max_concurrent_task_runs)
+    parser.add_argument("--top", type=int, default=10, help="Rows in the busiest minutes and hosts tables")
+    parser.add_argument("--json", help="Also write the full result, including every minute, to this file")
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.start) if args.start else datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    end = start + timedelta(hours=args.hours)
+
+    tasks, skipped = _load_tasks(start, args.user, args.include_inactive)
+    result = simulate(
+        tasks, start, end,
+        slots=args.slots,
+        fetch_ms=args.fetch_ms,
+        send_ms=args.send_ms,
+        match_rate=args.match_rate,
+        cache_ttl_seconds=settings.fetch_cache_ttl_seconds,
+        provider=settings.sms_default_provider
+    )
+    _report(result, skipped, args.top)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nwrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+SMPP provider benchmark against the local simulator
+
+Sends a batch of messages through SMPPSMSProvider for each window size:
+one at a time (send_sms), pipelined (send_sms from binds x window
+threads, as executor threads call it in the app), and through the app's own
+send path (a task run's recipient chunks, sent concurrently under fair
+dispatch and logged to a throwaway database), checking that every delivery
+receipt arrives. The app path keeps at most MAX_CONCURRENT_SENDS (--sends)
+messages in flight, so it fills the window only when that is at least
+binds x window. A final run drops the connection periodically to exercise
+rebinding.
+
+Usage (from the backend directory):
+    python -m benchmarks.smpp_benchmark --messages 1000 --latency-ms 20 --windows 1,10,50 --sends 20
+"""
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import use_temp_database
+from benchmarks.smpp_simulator import SMPPSimulator
+
+
+def _provider(port, binds, window, received):
+    from config import settings
+    from services.sms_service import SMPPSMSProvider
+    from services.receipt_service import receipt_service
+
+    settings.smpp_host = "127.0.0.1"
+    settings.smpp_port = port
+    settings.smpp_system_id = "bench"
+    settings.smpp_password = "bench"
+    settings.smpp_binds = binds
+    settings.smpp_window = window
+
+    lock = threading.Lock()
+
+    def count_receipt(receipt):
+        with lock:
+            received.append(receipt)
+
+    # Count parsed receipts instead of buffering them for the database
+    receipt_service.add_threadsafe = count_receipt
+    return SMPPSMSProvider()
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def _send_as_task(provider, recipients, sends):
+    """Send through TaskScheduler's chunked send path; returns how many were sent"""
+    from config import settings
+    from database import engine, Base, SessionLocal
+    from models import User, Task
+    from services import scheduler_service
+    from services.fair_dispatcher import FairDispatcher
+    from services.sms_service import sms_service
+
+    Base.metadata.create_all(bind=engine)
+    settings.sms_default_provider = "smpp"
+    sms_service.providers = {"smpp": provider}
+    scheduler_service.send_dispatcher = FairDispatcher("sends", sends)
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == "smpp-bench").first()
+        if user is None:
+            user = User(email="smpp-bench@example.com", username="smpp-bench", hashed_password="x")
+            db.add(user)
+            db.commit()
+        task = Task(name="SMPP benchmark", schedule_human="every 1 hour", recipients=[], user_id=user.id)
+        db.add(task)
+        db.commit()
+
+        async def send_all():
+            # Blocking send_sms calls hold executor threads; size the pool like the dispatcher
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(sends))
+            sent = 0
+            for start in range(0, len(recipients), settings.recipient_chunk_size):
+                chunk = recipients[start:start + settings.recipient_chunk_size]
+                sent += await scheduler_service.task_scheduler._send_notifications(
+                    db, task, chunk, "Lakers 70 - Bulls 72"
+                )
+            return sent
+
+        return asyncio.run(send_all())
+    finally:
+        db.close()
+
+
+def _run(simulator, binds, window, messages, mode, sends=8):
+    received = []
+    provider = _provider(simulator.port, binds, window, received)
+    try:
+        _wait_for(lambda: len(provider.client._live_sessions()) == binds)
+        recipients = [f"+2547{i:08d}" for i in range(messages)]
+
+        started = time.perf_counter()
+        if mode == "app":
+            succeeded = _send_as_task(provider, recipients, sends)
+        else:
+            if mode == "sequential":
+                results = [provider.send_sms(recipient, "Lakers 70 - Bulls 72") for recipient in recipients]
+            else:
+                with ThreadPoolExecutor(binds * window) as pool:
+                    results = list(pool.map(lambda recipient: provider.send_sms(recipient, "Lakers 70 - Bulls 72"),
+                                            recipients))
+            succeeded = sum(1 for result in results if result['success'])
+        elapsed = time.perf_counter() - started
+
+        _wait_for(lambda: len(received) >= succeeded)
+        return elapsed, succeeded, len(received)
+    finally:
+        provider.stop()
+
+
+def run(args):
+    simulator = SMPPSimulator(latency_ms=args.latency_ms, seed=42)
+    simulator.start()
+    try:
+        print(f"{args.messages} messages, {args.binds} binds, simulated SMSC latency {args.latency_ms} ms")
+        for window in args.windows:
+            for mode in ("sequential", "pipelined", "app"):
+                simulator.max_in_flight = 0
+                elapsed, succeeded, receipts = _run(simulator, args.binds, window, args.messages, mode, args.sends)
+                print(f"window {window:>3} {mode:<10} {succeeded / elapsed:8.1f} msg/s   "
+                      f"ok {succeeded}/{args.messages}   receipts {receipts}   "
+                      f"max in flight {simulator.max_in_flight}")
+    finally:
+        simulator.stop()
+
+    # Rebinding: the SMSC drops each connection after a few hundred submissions
+    flaky = SMPPSimulator(latency_ms=args.latency_ms, drop_after=max(args.messages // 5, 1), seed=42)
+    flaky.start()
+    try:
+        elapsed, succeeded, receipts = _run(flaky, args.binds, max(args.windows), args.messages, "pipelined")
+        print(f"rebind test           {succeeded / elapsed:8.1f} msg/s   ok {succeeded}/{args.messages}   "
+              f"binds {flaky.binds}")
+    finally:
+        flaky.stop()
+
+
+def main():
+    use_temp_database()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--binds", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--windows", default="1,10,50")
+    parser.add_argument("--sends", type=int, default=20, help="MAX_CONCURRENT_SENDS for the app path")
+    args = parser.parse_args()
+    args.windows = [int(window) for window in args.windows.split(",")]
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
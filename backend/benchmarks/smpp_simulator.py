@@ -0,0 +1,209 @@
+"""
+Local SMPP v3.4 SMSC simulator
+
+Accepts transceiver binds, answers submit_sm after a configurable latency
+(optionally throttling a fraction of them), sends deliver_sm delivery
+receipts afterwards and answers enquire_link. It can also drop every
+connection after a number of submissions to exercise rebinding.
+
+Usage (from the backend directory):
+    python -m benchmarks.smpp_simulator --port 2775 --latency-ms 20
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from services.smpp import (
+    PDU, read_pdu, cancel_pending_tasks, read_cstring, cstring, short_message_body, decode_short_message,
+    BIND_TRANSCEIVER, BIND_TRANSCEIVER_RESP, SUBMIT_SM, SUBMIT_SM_RESP, DELIVER_SM,
+    ENQUIRE_LINK, ENQUIRE_LINK_RESP, UNBIND, UNBIND_RESP, GENERIC_NACK,
+    ESME_ROK, ESME_RINVCMDID, ESME_RTHROTTLED, ESM_CLASS_DELIVERY_RECEIPT, DATA_CODING_DEFAULT
+)
+
+ESME_RBINDFAIL = 0x0000000D
+
+
+class SMPPSimulator:
+    """In-process SMSC with latency, throttling and connection-drop knobs"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        system_id: Optional[str] = None,
+        password: Optional[str] = None,
+        latency_ms: float = 0.0,
+        receipt_delay_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        undelivered_rate: float = 0.0,
+        drop_after: int = 0,
+        seed: Optional[int] = None
+    ):
+        self.host = host
+        self.port = port
+        self.system_id = system_id
+        self.password = password
+        self.latency = latency_ms / 1000
+        self.receipt_delay = receipt_delay_ms / 1000
+        self.failure_rate = failure_rate
+        self.undelivered_rate = undelivered_rate
+        self.drop_after = drop_after
+
+        self.binds = 0
+        self.submitted = 0
+        self.throttled = 0
+        self.receipts_sent = 0
+        self.enquire_links = 0
+        self.max_in_flight = 0
+        self.messages = deque(maxlen=10_000)  # accepted submit_sm bodies, decoded
+        self._in_flight = 0
+        self._message_ids = itertools.count(1)
+        self._random = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def serve(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def start(self):
+        """Run the simulator on a background thread"""
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="smpp-simulator", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._server.close)
+            asyncio.run_coroutine_threadsafe(cancel_pending_tasks(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop.close()
+            self._loop = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        sequence = itertools.count(1)
+        submissions = 0
+        bound = False
+
+        def send(command_id, sequence_number, body=b"", command_status=ESME_ROK):
+            if not writer.is_closing():
+                writer.write(PDU(command_id, command_status, sequence_number, body).encode())
+
+        async def answer_submit(pdu: PDU):
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            try:
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if self._random.random() < self.failure_rate:
+                    self.throttled += 1
+                    send(SUBMIT_SM_RESP, pdu.sequence_number, command_status=ESME_RTHROTTLED)
+                    return
+                message_id = f"{next(self._message_ids):010d}"
+                self.submitted += 1
+                send(SUBMIT_SM_RESP, pdu.sequence_number, cstring(message_id))
+            finally:
+                self._in_flight -= 1
+            submitted = decode_short_message(pdu.body)
+            self.messages.append(submitted)
+            asyncio.create_task(send_receipt(message_id, submitted.destination_addr))
+
+        async def send_receipt(message_id: str, destination_addr: str):
+            if self.receipt_delay:
+                await asyncio.sleep(self.receipt_delay)
+            delivered = self._random.random() >= self.undelivered_rate
+            stamp = datetime.utcnow().strftime("%y%m%d%H%M")
+            text = (
+                f"id:{message_id} sub:001 dlvrd:{'001' if delivered else '000'} "
+                f"submit date:{stamp} done date:{stamp} "
+                f"stat:{'DELIVRD' if delivered else 'UNDELIV'} err:{'000' if delivered else '001'} text:"
+            )
+            body = short_message_body(
+                destination_addr, "", text.encode("ascii"), DATA_CODING_DEFAULT,
+                esm_class=ESM_CLASS_DELIVERY_RECEIPT, registered_delivery=0
+            )
+            self.receipts_sent += 1
+            send(DELIVER_SM, next(sequence), body)
+
+        try:
+            while True:
+                pdu = await read_pdu(reader)
+                if pdu.command_id == BIND_TRANSCEIVER:
+                    system_id, offset = read_cstring(pdu.body, 0)
+                    password, _ = read_cstring(pdu.body, offset)
+                    if (self.system_id and system_id != self.system_id) or \
+                            (self.password and password != self.password):
+                        send(BIND_TRANSCEIVER_RESP, pdu.sequence_number, cstring("sim"), ESME_RBINDFAIL)
+                        continue
+                    bound = True
+                    self.binds += 1
+                    send(BIND_TRANSCEIVER_RESP, pdu.sequence_number, cstring("sim"))
+                elif pdu.command_id == SUBMIT_SM and bound:
+                    submissions += 1
+                    if self.drop_after and submissions > self.drop_after:
+                        break
+                    asyncio.create_task(answer_submit(pdu))
+                elif pdu.command_id == ENQUIRE_LINK:
+                    self.enquire_links += 1
+                    send(ENQUIRE_LINK_RESP, pdu.sequence_number)
+                elif pdu.command_id == UNBIND:
+                    send(UNBIND_RESP, pdu.sequence_number)
+                    break
+                elif pdu.command_id & 0x80000000:
+                    continue  # deliver_sm_resp / enquire_link_resp
+                else:
+                    send(GENERIC_NACK, pdu.sequence_number, command_status=ESME_RINVCMDID)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2775)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--receipt-delay-ms", type=float, default=500.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--undelivered-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    simulator = SMPPSimulator(
+        host=args.host,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        receipt_delay_ms=args.receipt_delay_ms,
+        failure_rate=args.failure_rate,
+        undelivered_rate=args.undelivered_rate
+    )
+
+    async def serve_forever():
+        await simulator.serve()
+        print(f"SMPP simulator listening on {args.host}:{simulator.port}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Cold start report
+
+Each sample runs in a fresh interpreter against a throwaway database:
+
+  1. `python -X importtime -c "import main"`, aggregated per module that
+     main imports directly (cumulative, so a router's time includes the
+     services it pulls in),
+  2. the app's lifespan through TestClient: the startup report phases
+     (imports, table creation, scheduler, ...), time until /health answers,
+     and the background warm-up of SMS providers and the HTTP client.
+
+It also lists heavy optional modules (provider SDKs, httpx, lxml, ijson)
+that importing the app loaded, which should be none.
+
+Usage (from the backend directory):
+    python -m benchmarks.startup_benchmark --runs 5
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+HEAVY_MODULES = ["africastalking", "twilio", "serial", "httpx", "httpcore", "lxml", "cssselect", "ijson"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+LIFESPAN_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter() - started
+loaded = [name for name in {heavy!r} if name in sys.modules]
+from fastapi.testclient import TestClient  # Imports httpx itself; not counted
+started = time.perf_counter()
+with TestClient(main.app) as client:
+    client.get("/health")
+    ready = imported + time.perf_counter() - started
+    from services.startup_report import startup_report
+    phases = startup_report.summary()
+print(json.dumps({{"phases": phases, "ready_ms": ready * 1000, "heavy_loaded": loaded}}))
+"""
+
+
+def _environment():
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}"
+    return env
+
+
+def _import_breakdown() -> dict:
+    """Cumulative import time (ms) of each module main imports directly"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, env=_environment(), check=True
+    )
+    lines = [match.groups() for match in map(IMPORTTIME_LINE.match, result.stderr.splitlines()) if match]
+    end = next(index for index, line in enumerate(lines) if line[3] == "main")
+    modules = {"main": int(lines[end][1]) / 1000}
+    # Children are printed before their parent: walk back from main to the previous top-level import
+    for _, cumulative, indent, name in reversed(lines[:end]):
+        if len(indent) == 1:
+            break
+        if len(indent) == 3:  # One level (two spaces) below main
+            modules[name] = int(cumulative) / 1000
+    return modules
+
+
+def _lifespan() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", LIFESPAN_SCRIPT.format(heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, env=_environment(), check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Modules to list")
+    args = parser.parse_args()
+
+    imports = defaultdict(list)
+    phases = defaultdict(list)
+    ready = []
+    heavy_loaded = set()
+    for _ in range(args.runs):
+        for name, ms in _import_breakdown().items():
+            imports[name].append(ms)
+        lifespan = _lifespan()
+        for name, ms in lifespan["phases"].items():
+            phases[name].append(ms)
+        ready.append(lifespan["ready_ms"])
+        heavy_loaded.update(lifespan["heavy_loaded"])
+
+    print(f"median of {args.runs} cold starts")
+    print(f"\nimport main: {statistics.median(imports.pop('main', [0])):.0f} ms (-X importtime, cumulative)")
+    ranked = sorted(imports.items(), key=lambda item: -statistics.median(item[1]))
+    for name, samples in ranked[:args.top]:
+        print(f"  {name:<36} {statistics.median(samples):8.1f} ms")
+
+    print("\nstartup phases:")
+    for name, samples in phases.items():
+        print(f"  {name:<36} {statistics.median(samples):8.1f} ms")
+    print(f"  {'until /health answers':<36} {statistics.median(ready):8.1f} ms")
+
+    print(f"\nheavy modules loaded by importing the app: {', '.join(sorted(heavy_loaded)) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
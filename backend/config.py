@@ -11,6 +11,11 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     
+    # Password hashing
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
+    
     # SMS Providers
     africastalking_username: Optional[str] = None
     africastalking_api_key: Optional[str] = None
@@ -19,10 +24,107 @@ class Settings(BaseSettings):
     twilio_auth_token: Optional[str] = None
     twilio_phone_number: Optional[str] = None
     
+    # SMPP (persistent transceiver binds to an aggregator SMSC)
+    smpp_host: Optional[str] = None
+    smpp_port: int = 2775
+    smpp_system_id: Optional[str] = None
+    smpp_password: Optional[str] = None
+    smpp_system_type: str = ""
+    smpp_source_addr: Optional[str] = None
+    smpp_binds: int = 2
+    smpp_window: int = 10
+    smpp_enquire_link_seconds: float = 30.0
+    smpp_response_timeout_seconds: float = 10.0
+    
+    # Provider used first for new notifications (others are fallbacks)
+    sms_default_provider: str = "africastalking"
+    
+    # Truncate rendered messages to this many SMS parts (0 = no limit)
+    sms_max_segments: int = 0
+    
+    # Send a recipient's digest early once this many messages are waiting
+    digest_max_messages: int = 10
+    
+    # Recipients (numbers without + or 00 get this country code, e.g. "254"; rejected if unset)
+    default_country_code: Optional[str] = None
+    recipient_chunk_size: int = 1000
+    contact_import_max_items: int = 50000
+    
+    # Delivery receipt callbacks
+    africastalking_callback_token: Optional[str] = None
+    twilio_status_callback_url: Optional[str] = None
+    receipt_flush_interval_seconds: float = 1.0
+    receipt_batch_size: int = 500
+    receipt_max_buffer: int = 100000
+    receipt_unmatched_retry_seconds: float = 60.0  # Keep retrying receipts that beat their notification
+    
     # GSM Modem
     gsm_modem_port: Optional[str] = None
     gsm_modem_baudrate: int = 115200
     
+    # Source fetching: responses are reused across tasks for a short TTL (0 disables),
+    # and HTML pages are parsed in a process pool
+    fetch_cache_ttl_seconds: float = 10.0
+    fetch_cache_max_entries: int = 256
+    # Larger JSON bodies are parsed as they stream, keeping only the fields a task uses (not cached)
+    fetch_stream_threshold_bytes: int = 1048576
+    scrape_workers: int = 2
+    scrape_max_pending: int = 64
+    
+    # Pushed data (task ingest webhooks): a burst runs the task once, after this
+    # long without a new payload or max delay after its first one
+    ingest_debounce_seconds: float = 2.0
+    ingest_max_delay_seconds: float = 10.0
+    ingest_max_pending: int = 10000
+    ingest_max_body_bytes: int = 1048576
+    
+    # Scheduler (keep below the database connection pool size, 15 by default)
+    max_concurrent_task_runs: int = 10
+    
+    # Fair dispatch: run slots and concurrent provider sends are shared between users by
+    # weighted round-robin (a user's weight defaults to this; quantum is send cost, in
+    # segments, credited per weight per round). Per-user caps of 0 mean no cap
+    max_concurrent_sends: int = 8
+    dispatch_default_weight: float = 1.0
+    dispatch_quantum: float = 4.0
+    dispatch_user_max_runs: int = 0
+    dispatch_user_max_sends: int = 0
+    # Slots only urgent-priority tasks may use, so bulk work never holds them all
+    dispatch_urgent_reserved_runs: int = 2
+    dispatch_urgent_reserved_sends: int = 2
+    # How often to pick up task edits made by other processes from the change feed (0 disables)
+    reconcile_interval_seconds: float = 5.0
+    # Change versions can commit out of order; each pass re-reads the feed from this long ago
+    reconcile_settle_seconds: float = 60.0
+    # Adaptive tasks multiply their poll interval by this while the source is unchanged
+    adaptive_poll_backoff_factor: float = 2.0
+    
+    # Upcoming runs calendar: cron schedules whose fire times stay cached, and the most fires per request
+    calendar_cache_max_schedules: int = 1024
+    calendar_max_items: int = 1000
+    
+    # How often the notification backlog gauges are recounted (0 disables)
+    backlog_refresh_seconds: float = 30.0
+    
+    # Task run history (written in batches off the hot path)
+    run_record_flush_interval_seconds: float = 2.0
+    run_record_batch_size: int = 500
+    run_record_max_buffer: int = 50000
+    # Run summaries take percentiles over each task's latest N runs in the window
+    run_summary_sample_size: int = 200
+    
+    # Rendered message bodies are stored once and shared by notifications; ids of this
+    # many recently sent bodies are kept in memory (0 disables the cache)
+    message_body_cache_size: int = 10000
+    
+    # Bulk operations
+    bulk_max_items: int = 1000
+    
+    # Real-time events
+    event_coalesce_seconds: float = 0.5
+    event_keepalive_seconds: float = 15.0
+    event_max_pending: int = 1000
+    
     # Application
     app_name: str = "Task2SMS"
     app_version: str = "1.0.0"
@@ -1,13 +1,35 @@
-from fastapi import FastAPI
+import time
+
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
-from database import engine, Base
+from database import engine
 from config import settings
-from routers import auth, tasks, notifications
+from routers import auth, tasks, notifications, events, webhooks, runs, contacts
 from services.scheduler_service import task_scheduler
 from services.retry_service import retry_service
+from services.password_hasher import password_hasher
+from services.receipt_service import receipt_service
+from services.run_recorder import run_recorder
+from services.digest_service import digest_service
+from services.ingest_service import ingest_service
+from services.sms_service import sms_service
+from services.scraper import scraper
+from services.recipients import backfill_recipient_counts
+from services.change_tracker import prepare_change_feed
+from migrations.upgrade_schema import upgrade as upgrade_schema
+from services.task_reconciler import task_reconciler
+from services.backlog_monitor import backlog_monitor
+from services.condition_evaluator import condition_evaluator
+from services.startup_report import startup_report
+from metrics import MetricsMiddleware, latest_metrics
+
+startup_report.record("imports", time.perf_counter() - _import_started)
 
 # Configure logging
 logging.basicConfig(
@@ -17,32 +39,96 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _warm_up():
+    """Build SMS providers and the HTTP client before the first task needs them"""
+    started = time.perf_counter()
+    sms_service.warm_up()
+    providers_done = time.perf_counter()
+    condition_evaluator.warm_up()
+    logger.info(
+        f"Warm-up took {(time.perf_counter() - started) * 1000:.0f} ms: "
+        f"SMS providers {(providers_done - started) * 1000:.0f} ms, "
+        f"HTTP client {(time.perf_counter() - providers_done) * 1000:.0f} ms"
+    )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     # Startup
     logger.info("Starting Task2SMS application...")
     
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Create missing tables and add columns, indexes and enum values added since the
+    # database was created (models read columns older databases lack)
+    with startup_report.phase("upgrade_schema"):
+        statements = upgrade_schema(engine)
+    if statements:
+        logger.info(f"Database schema upgraded ({len(statements)} changes)")
     logger.info("Database tables created")
+    with startup_report.phase("backfill_recipient_counts"):
+        backfill_recipient_counts()
+    with startup_report.phase("change_feed"):
+        prepare_change_feed()
     
     # Start scheduler
-    task_scheduler.start()
+    with startup_report.phase("scheduler"):
+        task_scheduler.start()
     logger.info("Task scheduler started")
 
+    # Follow task edits made by other processes
+    task_reconciler.start()
+
     # Start retry service
-    retry_service.start()
+    with startup_report.phase("retry_service"):
+        retry_service.start()
     logger.info("Retry service started")
 
+    # Start delivery receipt ingestion
+    with startup_report.phase("receipt_service"):
+        receipt_service.start()
+    logger.info("Receipt service started")
+
+    # Start batched task run history writes
+    with startup_report.phase("run_recorder"):
+        run_recorder.start()
+    logger.info("Run recorder started")
+
+    # Count the notification backlog for /metrics
+    backlog_monitor.start()
+
+    # SDK imports and provider connections happen in the background so /health answers
+    # right away; a send that arrives first initializes them itself
+    warm_up = asyncio.get_running_loop().run_in_executor(None, _warm_up)
+    startup_report.log()
+
     yield
 
     # Shutdown
     logger.info("Shutting down Task2SMS application...")
+    await warm_up
+    task_reconciler.stop()
     task_scheduler.stop()
     logger.info("Task scheduler stopped")
+    await ingest_service.flush_all()
+    logger.info("Pending pushed payloads processed")
+    await digest_service.flush_all()
+    logger.info("Pending digests sent")
     retry_service.stop()
     logger.info("Retry service stopped")
+    backlog_monitor.stop()
+    await run_recorder.flush()
+    run_recorder.stop()
+    logger.info("Run recorder stopped")
+    await receipt_service.flush()
+    receipt_service.stop()
+    logger.info("Receipt service stopped")
+    password_hasher.stop()
+    logger.info("Password hasher stopped")
+    sms_service.stop()
+    logger.info("SMS providers stopped")
+    scraper.stop()
+    logger.info("Scraper stopped")
+    await condition_evaluator.close()
 
 
 app = FastAPI(
@@ -61,10 +147,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request metrics (pure ASGI so streamed responses are not buffered)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(tasks.router)
 app.include_router(notifications.router)
+app.include_router(events.router)
+app.include_router(webhooks.router)
+app.include_router(runs.router)
+app.include_router(contacts.router)
 
 
 @app.get("/")
@@ -88,6 +181,13 @@ def health_check():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint (async so collection runs on the loop that owns the queues)"""
+    body, content_type = latest_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
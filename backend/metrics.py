@@ -0,0 +1,213 @@
+"""
+Prometheus metrics
+
+Hot-path metrics are pre-labelled children so recording one is a lock and
+an add; queue gauges are read when /metrics is scraped, from in-memory
+state and from notification counts refreshed on an interval.
+"""
+import heapq
+import time
+
+from prometheus_client import Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "task2sms_stage_duration_seconds",
+    "Time spent in each task pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+FETCH_SECONDS = STAGE_SECONDS.labels("fetch_data")
+EVALUATE_SECONDS = STAGE_SECONDS.labels("evaluate_condition")
+FORMAT_SECONDS = STAGE_SECONDS.labels("format_message")
+SEND_SECONDS = STAGE_SECONDS.labels("send")
+COMMIT_SECONDS = STAGE_SECONDS.labels("db_commit")
+
+SMS_ATTEMPTS = Counter(
+    "task2sms_sms_attempts_total",
+    "SMS send attempts by provider and outcome (fallbacks count as separate attempts)",
+    ["provider", "outcome"]
+)
+
+SMS_SEGMENTS = Counter(
+    "task2sms_sms_segments_total",
+    "Billed SMS parts successfully handed to a provider",
+    ["provider", "encoding"]
+)
+
+INGEST_PAYLOADS = Counter(
+    "task2sms_ingest_payloads_total",
+    "Payloads pushed to task ingest webhooks (coalesced ones joined a run already pending)",
+    ["outcome"]
+)
+
+RECONCILED_TASKS = Counter(
+    "task2sms_reconciled_tasks_total",
+    "Scheduler jobs changed by the task change feed (edits made by other processes)",
+    ["action"]
+)
+
+# Users listed by the task2sms_dispatch_user_* gauges: per-user series stay bounded however many users there are
+TOP_WAITING_USERS = 10
+
+LANE_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+DISPATCH_QUEUE_SECONDS = Histogram(
+    "task2sms_dispatch_queue_seconds",
+    "Time waiting for a fair-dispatch slot, by queue (runs, sends) and priority lane",
+    ["queue", "lane"],
+    buckets=LANE_BUCKETS
+)
+
+SEND_LATENCY_SECONDS = Histogram(
+    "task2sms_send_latency_seconds",
+    "Time from a task run starting to each message being handed to the provider, by priority lane",
+    ["lane"],
+    buckets=LANE_BUCKETS
+)
+
+SCHEDULER_LAG_SECONDS = Histogram(
+    "task2sms_scheduler_lag_seconds",
+    "Actual minus scheduled fire time of task runs",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "task2sms_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+
+class BacklogCollector:
+    """Queue-depth gauges read at scrape time"""
+
+    def describe(self):
+        # Lets the registry learn the metric names without querying the database
+        return [
+            GaugeMetricFamily("task2sms_retry_backlog", ""),
+            GaugeMetricFamily("task2sms_outbox_depth", "", labels=["queue"]),
+            GaugeMetricFamily("task2sms_dispatch_waiting", "", labels=["queue", "lane"]),
+            GaugeMetricFamily("task2sms_dispatch_user_waiting", "", labels=["queue", "user"]),
+            GaugeMetricFamily("task2sms_dispatch_user_max_wait_seconds", "", labels=["queue", "user"]),
+            GaugeMetricFamily("task2sms_scheduled_jobs", ""),
+        ]
+
+    def collect(self):
+        from services.backlog_monitor import backlog_monitor
+        from services.receipt_service import receipt_service
+        from services.scheduler_service import task_scheduler
+        from services.digest_service import digest_service
+        from services.ingest_service import ingest_service
+        from services.fair_dispatcher import run_dispatcher, send_dispatcher, LANES
+
+        counts = backlog_monitor.counts
+
+        yield GaugeMetricFamily(
+            "task2sms_retry_backlog",
+            "Failed or queued notifications the next retry pass will pick up",
+            value=counts["retry_backlog"]
+        )
+
+        outbox = GaugeMetricFamily(
+            "task2sms_outbox_depth",
+            "Messages and receipts waiting to be processed",
+            labels=["queue"]
+        )
+        outbox.add_metric(["pending_notifications"], counts["pending"])
+        outbox.add_metric(["queued_notifications"], counts["queued"])
+        outbox.add_metric(["delivery_receipts"], receipt_service.pending)
+        outbox.add_metric(["digest_messages"], digest_service.pending)
+        outbox.add_metric(["ingest_payloads"], ingest_service.pending)
+        outbox.add_metric(["dispatch_runs"], run_dispatcher.waiting)
+        outbox.add_metric(["dispatch_sends"], send_dispatcher.waiting)
+        yield outbox
+
+        lanes = GaugeMetricFamily(
+            "task2sms_dispatch_waiting",
+            "Runs and sends waiting for a fair-dispatch slot, by priority lane",
+            labels=["queue", "lane"]
+        )
+        for dispatcher in (run_dispatcher, send_dispatcher):
+            for lane in LANES:
+                lanes.add_metric([dispatcher.name, lane], dispatcher.waiting_in(lane))
+        yield lanes
+
+        users = GaugeMetricFamily(
+            "task2sms_dispatch_user_waiting",
+            f"Runs and sends waiting for a fair-dispatch slot, for the {TOP_WAITING_USERS} users with the most",
+            labels=["queue", "user"]
+        )
+        for dispatcher in (run_dispatcher, send_dispatcher):
+            waiting = dispatcher.waiting_by_user()
+            for user_id in heapq.nlargest(TOP_WAITING_USERS, waiting, key=waiting.get):
+                users.add_metric([dispatcher.name, str(user_id)], waiting[user_id])
+        yield users
+
+        delays = GaugeMetricFamily(
+            "task2sms_dispatch_user_max_wait_seconds",
+            f"Longest wait for a fair-dispatch slot since the previous scrape (queued requests count their "
+            f"wait so far), for the {TOP_WAITING_USERS} users who waited longest",
+            labels=["queue", "user"]
+        )
+        for dispatcher in (run_dispatcher, send_dispatcher):
+            waits = dispatcher.take_max_waits()
+            for user_id in heapq.nlargest(TOP_WAITING_USERS, waits, key=waits.get):
+                delays.add_metric([dispatcher.name, str(user_id)], waits[user_id])
+        yield delays
+
+        yield GaugeMetricFamily(
+            "task2sms_scheduled_jobs",
+            "Tasks currently scheduled",
+            value=len(task_scheduler.running_jobs)
+        )
+
+
+REGISTRY.register(BacklogCollector())
+
+
+def record_scheduler_lag(event):
+    """APScheduler EVENT_JOB_SUBMITTED listener"""
+    if event.scheduled_run_times:
+        scheduled = event.scheduled_run_times[-1]
+        lag = time.time() - scheduled.timestamp()
+        SCHEDULER_LAG_SECONDS.observe(max(lag, 0.0))
+
+
+def latest_metrics():
+    """Render all metrics in the Prometheus text format"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing HTTP requests by route template (streams untouched)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status)
+            ).observe(time.perf_counter() - start)
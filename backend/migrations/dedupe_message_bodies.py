@@ -0,0 +1,174 @@
+"""
+Move notification message text into message_bodies
+
+Notifications written before message bodies were deduplicated carry their
+text inline. This brings the schema up to date (migrations.upgrade_schema,
+which adds notifications.body_id), then walks those rows in id order, stores each distinct text once in
+message_bodies, points the rows at it and clears their inline copy. Each
+batch is committed on its own, so the script can be stopped and rerun, and
+the app can keep sending while it runs.
+
+It reports the message text stored before and after, and the size of the
+two tables on disk (PostgreSQL) or of the database file (SQLite). Space
+freed by the rewrite is reused by new rows; it is only returned to the
+operating system by VACUUM FULL (PostgreSQL) or VACUUM (SQLite, --vacuum).
+
+Usage (from the backend directory):
+    python -m migrations.dedupe_message_bodies --dry-run
+    python -m migrations.dedupe_message_bodies --batch-size 5000 --vacuum
+"""
+import argparse
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import func, insert, text, update
+from sqlalchemy.exc import IntegrityError
+
+from database import engine, SessionLocal
+from migrations.upgrade_schema import upgrade
+from models import MessageBody, Notification
+from services.message_store import body_hash
+
+# Stay under database bound-parameter limits when looking bodies up by hash
+HASH_CHUNK = 500
+
+
+def _disk_bytes(db) -> Optional[int]:
+    """Bytes on disk of the notification tables (PostgreSQL) or the whole database file (SQLite)"""
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        return db.execute(text(
+            "SELECT pg_total_relation_size('notifications') + pg_total_relation_size('message_bodies')"
+        )).scalar()
+    if dialect == "sqlite":
+        page_count = db.execute(text("PRAGMA page_count")).scalar()
+        page_size = db.execute(text("PRAGMA page_size")).scalar()
+        return page_count * page_size
+    return None
+
+
+def _text_stored(db) -> Dict[str, int]:
+    """Rows and characters of message text held inline and in message_bodies"""
+    inline_rows, inline_chars = db.query(
+        func.count(Notification.id), func.coalesce(func.sum(func.length(Notification.inline_message)), 0)
+    ).filter(Notification.inline_message != "").one()
+    bodies, body_chars = db.query(
+        func.count(MessageBody.id), func.coalesce(func.sum(func.length(MessageBody.text)), 0)
+    ).one()
+    return {
+        "inline_rows": inline_rows,
+        "inline_chars": inline_chars,
+        "bodies": bodies,
+        "body_chars": body_chars,
+        "total_chars": inline_chars + body_chars
+    }
+
+
+def _lookup(db, hashes, known: Dict[str, Optional[int]]):
+    """Add the ids of stored bodies among hashes to known"""
+    hashes = [key for key in hashes if key not in known]
+    for start in range(0, len(hashes), HASH_CHUNK):
+        chunk = hashes[start:start + HASH_CHUNK]
+        known.update(db.query(MessageBody.hash, MessageBody.id).filter(MessageBody.hash.in_(chunk)))
+
+
+def dedupe(batch_size: int, dry_run: bool) -> Dict[str, int]:
+    """Move inline text into message_bodies (or count what would move); returns the counts"""
+    counts = {"rows": 0, "new_bodies": 0, "new_body_chars": 0, "moved_chars": 0}
+    known: Dict[str, Optional[int]] = {}  # Body hash -> id (None: would be stored, on a dry run)
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            rows = db.query(Notification.id, Notification.inline_message).filter(
+                Notification.id > last_id,
+                Notification.body_id.is_(None),
+                Notification.inline_message != ""
+            ).order_by(Notification.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            keyed = [(row.id, body_hash(row.inline_message), row.inline_message) for row in rows]
+            texts = {key: message for _, key, message in keyed}
+            _lookup(db, texts, known)
+            new = [key for key in texts if key not in known]
+
+            if dry_run:
+                known.update((key, None) for key in new)
+            else:
+                try:
+                    if new:
+                        db.execute(insert(MessageBody), [{"hash": key, "text": texts[key]} for key in new])
+                        _lookup(db, new, known)
+                    db.execute(update(Notification), [
+                        {"id": row_id, "body_id": known[key], "inline_message": ""} for row_id, key, _ in keyed
+                    ])
+                    db.commit()
+                except IntegrityError:
+                    # The app stored one of these texts meanwhile; look it up and redo the batch
+                    db.rollback()
+                    for key in new:
+                        known.pop(key, None)
+                    continue
+
+            counts["rows"] += len(keyed)
+            counts["new_bodies"] += len(new)
+            counts["new_body_chars"] += sum(len(texts[key]) for key in new)
+            counts["moved_chars"] += sum(len(message) for _, _, message in keyed)
+            last_id = rows[-1].id
+        return counts
+    finally:
+        db.close()
+
+
+def _megabytes(size: Optional[int]) -> str:
+    return "n/a" if size is None else f"{size / 1048576:.2f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be saved")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards (SQLite) to shrink the file")
+    args = parser.parse_args()
+
+    # Upgraded even on a dry run: the app can't read notifications without body_id
+    for statement in upgrade():
+        print(f"{statement};")
+
+    db = SessionLocal()
+    try:
+        before = _text_stored(db)
+        disk_before = _disk_bytes(db)
+    finally:
+        db.close()
+
+    started = time.perf_counter()
+    counts = dedupe(args.batch_size, args.dry_run)
+    elapsed = time.perf_counter() - started
+
+    print(f"{'would move' if args.dry_run else 'moved'} {counts['rows']} notifications "
+          f"onto {counts['new_bodies']} new bodies in {elapsed:.1f} s")
+    saved = counts["moved_chars"] - counts["new_body_chars"]
+    ratio = counts["rows"] / counts["new_bodies"] if counts["new_bodies"] else 0
+    print(f"message text: {before['total_chars']} chars before, {before['total_chars'] - saved} after "
+          f"({saved} saved; {ratio:.1f} rows per new body)")
+    if args.dry_run:
+        return
+
+    if args.vacuum and engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            connection.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    db = SessionLocal()
+    try:
+        after = _text_stored(db)
+        disk_after = _disk_bytes(db)
+    finally:
+        db.close()
+    print(f"stored: {after['inline_rows']} rows still inline, {after['bodies']} bodies "
+          f"({after['body_chars']} chars)")
+    print(f"on disk: {_megabytes(disk_before)} before, {_megabytes(disk_after)} after")
+
+
+if __name__ == "__main__":
+    main()
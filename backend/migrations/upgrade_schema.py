@@ -0,0 +1,104 @@
+"""
+Bring an existing database up to the current models
+
+create_all only creates missing tables, so databases created by an earlier
+version lack the columns added since: the task source, ingest, polling,
+recipient, digest, priority and change feed settings; the per-user list
+versions and dispatch limits; the notification provider id, segments,
+priority and body_id; and task_runs.recipients_queued. This compares every
+table with the models and adds what is missing: columns (with their scalar
+defaults so existing rows satisfy NOT NULL), indexes, and the enum values
+PostgreSQL needs for the new delivery statuses and providers. It only adds,
+so it is safe to rerun; the app runs it at startup, and it can be run by
+hand (or as a dry run) beforehand.
+
+Usage (from the backend directory):
+    python -m migrations.upgrade_schema --dry-run
+    python -m migrations.upgrade_schema
+"""
+import argparse
+from typing import List
+
+from sqlalchemy import Enum, inspect, literal, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+import models  # noqa: F401  (registers the tables)
+from database import engine as default_engine, Base
+
+
+def _column_ddl(engine: Engine, column) -> str:
+    """ADD COLUMN clause for a model column, defaulting existing rows to its scalar default"""
+    dialect = engine.dialect
+    ddl = f"{dialect.identifier_preparer.format_column(column)} {column.type.compile(dialect=dialect)}"
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        value = literal(default, column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" DEFAULT {value}"
+    if not column.nullable:
+        if default is None:
+            raise ValueError(f"{column.table.name}.{column.name} is NOT NULL without a default to fill existing rows")
+        ddl += " NOT NULL"
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        ddl += f" REFERENCES {target.table.name}({target.name})"
+    return ddl
+
+
+def pending_changes(engine: Engine = default_engine) -> List[str]:
+    """DDL statements that would bring the database up to the models"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    statements = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            # upgrade() leaves these to create_all; listed for dry runs
+            statements.append(str(CreateTable(table).compile(dialect=engine.dialect)).strip())
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                statements.append(f"ALTER TABLE {table.name} ADD COLUMN {_column_ddl(engine, column)}")
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                statements.append(str(CreateIndex(index).compile(dialect=engine.dialect)))
+
+    if engine.dialect.name == "postgresql":
+        labels = {enum["name"]: set(enum["labels"]) for enum in inspector.get_enums()}
+        seen = set()
+        for table in Base.metadata.sorted_tables:
+            for column in table.columns:
+                if isinstance(column.type, Enum) and column.type.name in labels and column.type.name not in seen:
+                    seen.add(column.type.name)
+                    for label in column.type.enums:
+                        if label not in labels[column.type.name]:
+                            statements.append(f"ALTER TYPE {column.type.name} ADD VALUE IF NOT EXISTS '{label}'")
+    return statements
+
+
+def upgrade(engine: Engine = default_engine) -> List[str]:
+    """Create missing tables, then add missing columns, indexes and enum values; returns the DDL run"""
+    Base.metadata.create_all(bind=engine)
+    statements = pending_changes(engine)
+    # ALTER TYPE ... ADD VALUE can't share a transaction with statements that use the value
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+    return statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only print the statements that would run")
+    args = parser.parse_args()
+
+    statements = pending_changes() if args.dry_run else upgrade()
+    for statement in statements:
+        print(f"{statement};")
+    if not statements:
+        print("schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
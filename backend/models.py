@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, DateTime, Boolean, Text, ForeignKey, JSON, Enum, Float, Index, Sequence,
+    Table, UniqueConstraint, func, select
+)
+from sqlalchemy.orm import column_property, relationship
 from datetime import datetime
 import enum
 from database import Base
@@ -7,7 +10,8 @@ from database import Base
 
 class DeliveryStatus(str, enum.Enum):
     PENDING = "pending"
-    SENT = "sent"
+    SENT = "sent"  # Accepted by the provider
+    DELIVERED = "delivered"  # Confirmed by a delivery receipt
     FAILED = "failed"
     QUEUED = "queued"
 
@@ -16,6 +20,7 @@ class SMSProvider(str, enum.Enum):
     AFRICASTALKING = "africastalking"
     TWILIO = "twilio"
     GSM_MODEM = "gsm_modem"
+    SMPP = "smpp"
 
 
 class User(Base):
@@ -28,7 +33,25 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Change counters backing ETags for the user's task and notification lists
+    tasks_version = Column(Integer, default=0, nullable=False)
+    notifications_version = Column(Integer, default=0, nullable=False)
+    
+    # Share of send capacity under contention, and concurrent sends allowed (None = server defaults)
+    dispatch_weight = Column(Float, nullable=True)
+    max_concurrent_sends = Column(Integer, nullable=True)
+    
     tasks = relationship("Task", back_populates="owner")
+    contact_lists = relationship("ContactList", back_populates="owner")
+
+
+# Contact lists a task sends to, in addition to its own recipients
+task_contact_lists = Table(
+    "task_contact_lists",
+    Base.metadata,
+    Column("task_id", Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True),
+    Column("list_id", Integer, ForeignKey("contact_lists.id", ondelete="CASCADE"), primary_key=True, index=True)
+)
 
 
 class Task(Base):
@@ -38,15 +61,24 @@ class Task(Base):
     name = Column(String, nullable=False)
     description = Column(Text)
     source_link = Column(String)  # Optional API or data source URL
+    source_type = Column(String(10), default="json", nullable=False)  # json, or html with scrape_fields
+    scrape_fields = Column(JSON, nullable=True)  # {"price": {"css": "span.price", "number": true}}
+    ingest_token_hash = Column(String(64), nullable=True)  # SHA-256 of the push webhook token (None = disabled)
     
     # Scheduling
     schedule_cron = Column(String)  # Cron expression
     schedule_human = Column(String)  # Human-readable schedule
+    poll_min_seconds = Column(Integer, nullable=True)  # Adaptive polling bounds (set both; replaces the schedule)
+    poll_max_seconds = Column(Integer, nullable=True)
     
     # Notification settings
-    recipients = Column(JSON)  # List of phone numbers
+    recipients = Column(JSON)  # List of E.164 phone numbers (large audiences belong in contact lists)
+    recipient_count = Column(Integer, nullable=True)  # Distinct numbers across recipients and contact lists
     condition_rules = Column(JSON)  # Condition logic (e.g., {"type": "total_over", "value": 140})
     message_template = Column(Text)  # SMS message template
+    transliterate = Column(Boolean, default=False, nullable=False)  # Map smart quotes, accents etc. to GSM-7
+    digest_window_seconds = Column(Integer, default=0, nullable=False)  # Merge with other tasks' messages (0 = off)
+    priority = Column(String(10), default="normal", nullable=False)  # Dispatch lane: urgent, normal or bulk
     
     # Status
     is_active = Column(Boolean, default=True)
@@ -56,28 +88,92 @@ class Task(Base):
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_version = Column(BigInteger, default=0, nullable=False, index=True)  # Scheduler change feed position
     
     # Relationships
     user_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="tasks")
     notifications = relationship("Notification", back_populates="task")
+    contact_lists = relationship("ContactList", secondary=task_contact_lists, back_populates="tasks")
+    
+    @property
+    def contact_list_ids(self):
+        return [contact_list.id for contact_list in self.contact_lists]
+    
+    @property
+    def ingest_enabled(self):
+        return self.ingest_token_hash is not None
+
+
+class ContactList(Base):
+    """A reusable group of recipients"""
+    __tablename__ = "contact_lists"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    description = Column(Text)
+    contact_count = Column(Integer, default=0, nullable=False)
+    
+    # Metadata
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    owner = relationship("User", back_populates="contact_lists")
+    tasks = relationship("Task", secondary=task_contact_lists, back_populates="contact_lists")
+
+
+class Contact(Base):
+    """One E.164 number in a contact list (unique per list)"""
+    __tablename__ = "contacts"
+    # Also serves the keyset scans that stream a list in phone number order
+    __table_args__ = (UniqueConstraint("list_id", "phone_number", name="uq_contacts_list_phone"),)
+    
+    id = Column(Integer, primary_key=True)
+    list_id = Column(Integer, ForeignKey("contact_lists.id", ondelete="CASCADE"), nullable=False)
+    phone_number = Column(String(16), nullable=False)
+    name = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class MessageBody(Base):
+    """A rendered message text, stored once however many notifications carry it"""
+    __tablename__ = "message_bodies"
+    
+    id = Column(Integer, primary_key=True)
+    hash = Column(String(64), unique=True, nullable=False)  # SHA-256 of the text
+    text = Column(Text, nullable=False)
 
 
 class Notification(Base):
     __tablename__ = "notifications"
+    # Backlog counts and the retry pass select by status and retry count
+    __table_args__ = (Index("ix_notifications_status_retries", "status", "retry_count"),)
     
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"))
     
-    # Message details
+    # Message details: the text lives in message_bodies; rows written before deduplication
+    # keep it inline until migrations.dedupe_message_bodies moves it ('' afterwards)
     recipient = Column(String, nullable=False)
-    message = Column(Text, nullable=False)
+    body_id = Column(Integer, ForeignKey("message_bodies.id"), nullable=True)
+    inline_message = Column("message", Text, nullable=False, default="")
+    message = column_property(
+        func.coalesce(
+            select(MessageBody.text).where(MessageBody.id == body_id).correlate_except(MessageBody).scalar_subquery(),
+            inline_message
+        )
+    )
     
     # Delivery
     provider = Column(Enum(SMSProvider), nullable=False)
     status = Column(Enum(DeliveryStatus), default=DeliveryStatus.PENDING)
     
     # Tracking
+    provider_message_id = Column(String, index=True, nullable=True)  # Used to match delivery receipts
+    segments = Column(Integer, nullable=True)  # Billed SMS parts
+    priority = Column(String(10), default="normal", nullable=False)  # The task's lane when it was sent
     sent_at = Column(DateTime, nullable=True)
     delivered_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
@@ -90,6 +186,46 @@ class Notification(Base):
     task = relationship("Task", back_populates="notifications")
 
 
+class TaskRun(Base):
+    """One execution of a task with its stage timings"""
+    __tablename__ = "task_runs"
+    __table_args__ = (Index("ix_task_runs_task_started", "task_id", "started_at"),)
+    
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    
+    # Timing
+    scheduled_at = Column(DateTime, nullable=True)  # None for runs not fired by the scheduler
+    started_at = Column(DateTime, nullable=False)
+    duration_ms = Column(Float)
+    fetch_ms = Column(Float, nullable=True)
+    evaluate_ms = Column(Float, nullable=True)
+    send_ms = Column(Float, nullable=True)
+    
+    # Result
+    payload_bytes = Column(Integer, nullable=True)
+    condition_matched = Column(Boolean, nullable=True)
+    recipients_sent = Column(Integer, default=0)
+    recipients_failed = Column(Integer, default=0)
+    recipients_queued = Column(Integer, default=0)  # Handed to a digest, sent when its window closes
+    outcome = Column(String(20), nullable=False)  # completed, skipped, fetch_failed, failed
+    error = Column(String(255), nullable=True)
+
+
+# Allocates task change feed versions on databases with sequences (PostgreSQL); no row is
+# locked, so concurrent writers may commit versions out of order
+task_change_versions = Sequence("task_change_versions", metadata=Base.metadata)
+
+
+class TaskTombstone(Base):
+    """A deleted task, kept so other processes' schedulers see the deletion"""
+    __tablename__ = "task_tombstones"
+    
+    task_id = Column(Integer, primary_key=True)
+    change_version = Column(BigInteger, nullable=False, index=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 class DataCache(Base):
     """Cache for offline operation"""
     __tablename__ = "data_cache"
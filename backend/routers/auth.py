@@ -1,24 +1,51 @@
 from datetime import timedelta
+from typing import Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from database import get_db
 from models import User
 from schemas import UserCreate, UserResponse, Token
-from auth import (
-    verify_password,
-    get_password_hash,
-    create_access_token,
-    get_current_active_user
-)
+from auth import create_access_token, get_current_active_user
 from config import settings
+from services.password_hasher import password_hasher
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
 
+def _registration_conflict(db: Session, email: str, username: str) -> Optional[str]:
+    """Why an email/username pair can't be registered, if it can't"""
+    if db.query(User.id).filter(User.email == email).first():
+        return "Email already registered. Please use a different email or login if you already have an account."
+    if db.query(User.id).filter(User.username == username).first():
+        return "Username already taken. Please choose a different username."
+    return None
+
+
+def _create_user(db: Session, email: str, username: str, hashed_password: str) -> User:
+    db_user = User(email=email, username=username, hashed_password=hashed_password)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+
+def _login_record(db: Session, username: str) -> Optional[Tuple[int, str, bool]]:
+    """A user's (id, password hash, is_active)"""
+    return db.query(User.id, User.hashed_password, User.is_active).filter(User.username == username).first()
+
+
+def _update_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.query(User).filter(User.id == user_id).update({User.hashed_password: hashed_password})
+    db.commit()
+
+
+# These routes are async to await the hashing pool; their queries run on the request's
+# session in the threadpool so they never block the event loop
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
     # Validate input
     if not user.email or not user.username or not user.password:
@@ -33,58 +60,42 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             detail="Password must be at least 6 characters long"
         )
     
-    # Check if email already exists
-    existing_email = db.query(User).filter(User.email == user.email).first()
-    if existing_email:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered. Please use a different email or login if you already have an account."
-        )
-    
-    # Check if username already exists
-    existing_username = db.query(User).filter(User.username == user.username).first()
-    if existing_username:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already taken. Please choose a different username."
-        )
+    # Check if email or username already exists
+    conflict = await run_in_threadpool(_registration_conflict, db, user.email, user.username)
+    if conflict:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=conflict)
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        email=user.email,
-        username=user.username,
-        hashed_password=hashed_password
-    )
-    
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    return db_user
+    hashed_password = await password_hasher.hash(user.password)
+    return await run_in_threadpool(_create_user, db, user.email, user.username, hashed_password)
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Login and get access token"""
-    user = db.query(User).filter(User.username == form_data.username).first()
+    record = await run_in_threadpool(_login_record, db, form_data.username)
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not record or not await password_hasher.verify(form_data.password, record.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not user.is_active:
+    if not record.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
     
+    # Transparently upgrade hashes made with a different work factor
+    if password_hasher.needs_rehash(record.hashed_password):
+        hashed_password = await password_hasher.hash(form_data.password)
+        await run_in_threadpool(_update_password_hash, db, record.id, hashed_password)
+    
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": form_data.username}, expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
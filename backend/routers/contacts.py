@@ -0,0 +1,206 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from database import get_db
+from models import User, Task, ContactList, Contact, task_contact_lists
+from schemas import (
+    ContactListCreate,
+    ContactListUpdate,
+    ContactListResponse,
+    ContactResponse,
+    ContactImport,
+    ContactImportResult,
+    ContactRemoveResult
+)
+from auth import get_current_active_user
+from serialization import response_columns, rows_response
+from services.change_tracker import bump_tasks_version
+from services.recipients import IN_CHUNK_SIZE, normalize_recipients, refresh_recipient_counts
+
+router = APIRouter(prefix="/api/contacts", tags=["contacts"])
+
+CONTACT_LIST_COLUMNS = response_columns(ContactList, ContactListResponse)
+CONTACT_COLUMNS = response_columns(Contact, ContactResponse)
+
+
+def _get_contact_list(db: Session, list_id: int, user_id: int) -> ContactList:
+    contact_list = db.query(ContactList).filter(
+        ContactList.id == list_id,
+        ContactList.user_id == user_id
+    ).first()
+
+    if not contact_list:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contact list not found"
+        )
+    return contact_list
+
+
+def _refresh_list_tasks(db: Session, contact_list: ContactList):
+    """Recount recipients of the tasks sending to a list whose contacts changed"""
+    tasks = db.query(Task).join(
+        task_contact_lists, task_contact_lists.c.task_id == Task.id
+    ).filter(task_contact_lists.c.list_id == contact_list.id).all()
+    if tasks:
+        refresh_recipient_counts(db, tasks)
+        bump_tasks_version(db, [contact_list.user_id])
+
+
+@router.post("/lists", response_model=ContactListResponse, status_code=status.HTTP_201_CREATED)
+def create_contact_list(
+    contact_list: ContactListCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Create an empty contact list"""
+    db_list = ContactList(**contact_list.model_dump(), user_id=current_user.id)
+    db.add(db_list)
+    db.commit()
+    db.refresh(db_list)
+    return db_list
+
+
+@router.get("/lists", response_model=List[ContactListResponse])
+def get_contact_lists(
+    skip: int = 0,
+    limit: int = 100,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get all contact lists for current user"""
+    contact_lists = db.query(*CONTACT_LIST_COLUMNS).filter(
+        ContactList.user_id == current_user.id
+    ).order_by(ContactList.id).offset(skip).limit(limit)
+    return rows_response(contact_lists)
+
+
+@router.get("/lists/{list_id}", response_model=ContactListResponse)
+def get_contact_list(
+    list_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get a specific contact list"""
+    return _get_contact_list(db, list_id, current_user.id)
+
+
+@router.put("/lists/{list_id}", response_model=ContactListResponse)
+def update_contact_list(
+    list_id: int,
+    list_update: ContactListUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Rename or describe a contact list"""
+    db_list = _get_contact_list(db, list_id, current_user.id)
+    for field, value in list_update.model_dump(exclude_unset=True).items():
+        setattr(db_list, field, value)
+    db.commit()
+    db.refresh(db_list)
+    return db_list
+
+
+@router.delete("/lists/{list_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_contact_list(
+    list_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Delete a contact list and its contacts; tasks using it stop sending to them"""
+    db_list = _get_contact_list(db, list_id, current_user.id)
+
+    tasks = list(db_list.tasks)
+    db.query(Contact).filter(Contact.list_id == list_id).delete(synchronize_session=False)
+    db.delete(db_list)
+    db.flush()
+    if tasks:
+        for task in tasks:
+            db.expire(task, ["contact_lists"])
+        refresh_recipient_counts(db, tasks)
+        bump_tasks_version(db, [current_user.id])
+    db.commit()
+
+    return None
+
+
+@router.get("/lists/{list_id}/contacts", response_model=List[ContactResponse])
+def get_contacts(
+    list_id: int,
+    after: Optional[str] = Query(None, description="Return numbers after this one (the last of the previous page)"),
+    limit: int = Query(1000, ge=1, le=10000),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Page through a list's contacts in phone number order"""
+    _get_contact_list(db, list_id, current_user.id)
+
+    contacts = db.query(*CONTACT_COLUMNS).filter(Contact.list_id == list_id)
+    if after is not None:
+        contacts = contacts.filter(Contact.phone_number > after)
+    return rows_response(contacts.order_by(Contact.phone_number).limit(limit))
+
+
+@router.post("/lists/{list_id}/contacts", response_model=ContactImportResult)
+def import_contacts(
+    list_id: int,
+    batch: ContactImport,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Add numbers to a list, normalized to E.164 and skipping ones already in it"""
+    db_list = _get_contact_list(db, list_id, current_user.id)
+
+    valid, invalid = normalize_recipients(batch.phone_numbers)
+    existing = set()
+    for start in range(0, len(valid), IN_CHUNK_SIZE):
+        existing.update(
+            phone_number for (phone_number,) in db.query(Contact.phone_number).filter(
+                Contact.list_id == list_id,
+                Contact.phone_number.in_(valid[start:start + IN_CHUNK_SIZE])
+            )
+        )
+    new_numbers = [phone_number for phone_number in valid if phone_number not in existing]
+
+    if new_numbers:
+        db.execute(insert(Contact), [
+            {"list_id": list_id, "phone_number": phone_number}
+            for phone_number in new_numbers
+        ])
+        db_list.contact_count += len(new_numbers)
+        _refresh_list_tasks(db, db_list)
+        db.commit()
+
+    return ContactImportResult(
+        added=len(new_numbers),
+        duplicates=len(batch.phone_numbers) - len(invalid) - len(new_numbers),
+        invalid=invalid
+    )
+
+
+@router.post("/lists/{list_id}/contacts/delete", response_model=ContactRemoveResult)
+def remove_contacts(
+    list_id: int,
+    batch: ContactImport,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Remove numbers from a list"""
+    db_list = _get_contact_list(db, list_id, current_user.id)
+
+    valid, _ = normalize_recipients(batch.phone_numbers)
+    removed = 0
+    for start in range(0, len(valid), IN_CHUNK_SIZE):
+        removed += db.query(Contact).filter(
+            Contact.list_id == list_id,
+            Contact.phone_number.in_(valid[start:start + IN_CHUNK_SIZE])
+        ).delete(synchronize_session=False)
+
+    if removed:
+        db_list.contact_count -= removed
+        _refresh_list_tasks(db, db_list)
+        db.commit()
+
+    return ContactRemoveResult(removed=removed)
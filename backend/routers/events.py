@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import json
+
+from database import SessionLocal
+from models import User
+from auth import get_user_from_token
+from config import settings
+from services.event_bus import event_bus
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+
+def _authenticate(token: str) -> User:
+    """Resolve the streaming user without holding a session for the stream's lifetime"""
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(token, db)
+        if not user.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+
+@router.get("/stream")
+async def stream_events(request: Request, token: Optional[str] = Query(None)):
+    """
+    Stream task-run and notification status events as Server-Sent Events
+
+    EventSource cannot send headers, so the access token may be passed as
+    ?token=... instead of an Authorization header. Events are delivered in
+    batches: each `batch` message carries a JSON list of the latest state of
+    every object that changed during the coalescing window.
+    """
+    if not token:
+        authorization = request.headers.get("Authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+    user = await run_in_threadpool(_authenticate, token)
+
+    async def event_stream():
+        subscription = event_bus.subscribe(user.id)
+        try:
+            yield f"retry: {int(settings.event_keepalive_seconds * 1000)}\n\n"
+            while not await request.is_disconnected():
+                batch = await subscription.next_batch(
+                    window=event_bus.window,
+                    timeout=settings.event_keepalive_seconds
+                )
+                if batch:
+                    yield f"event: batch\ndata: {json.dumps(batch)}\n\n"
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,41 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Iterator, List, Optional
+from datetime import datetime
+import csv
+import io
+import zlib
 
-from database import get_db
-from models import User, Notification, Task
+import orjson
+
+from database import get_db, SessionLocal
+from models import User, Notification, Task, DeliveryStatus
 from schemas import NotificationResponse
 from auth import get_current_active_user
+from serialization import (
+    response_columns,
+    rows_response,
+    make_etag,
+    etag_matches,
+    set_etag,
+    not_modified
+)
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
 
+NOTIFICATION_COLUMNS = response_columns(Notification, NotificationResponse)
+
+# Rows fetched per server-side cursor batch and written per streamed chunk
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    Notification.id,
+    Notification.task_id,
+    Notification.recipient,
+    Notification.message,
+    Notification.provider,
+    Notification.status,
+    Notification.provider_message_id,
+    Notification.segments,
+    Notification.sent_at,
+    Notification.delivered_at,
+    Notification.error_message,
+    Notification.retry_count,
+    Notification.created_at,
+]
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
 
 @router.get("/", response_model=List[NotificationResponse])
 def get_notifications(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
+    status_filter: Optional[DeliveryStatus] = Query(None, alias="status"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get all notifications for current user's tasks"""
-    notifications = db.query(Notification).join(Task).filter(
+    """Get all notifications for current user's tasks, optionally only those with a status"""
+    etag = make_etag(
+        "notifications", current_user.id, current_user.notifications_version, skip, limit,
+        status_filter.value if status_filter else "all"
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    notifications = db.query(*NOTIFICATION_COLUMNS).join(Task).filter(
         Task.user_id == current_user.id
-    ).order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+    )
+    if status_filter:
+        notifications = notifications.filter(Notification.status == status_filter)
+    notifications = notifications.order_by(Notification.created_at.desc()).offset(skip).limit(limit)
     
-    return notifications
+    return rows_response(notifications, etag)
 
 
 @router.get("/task/{task_id}", response_model=List[NotificationResponse])
 def get_task_notifications(
     task_id: int,
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get notifications for a specific task"""
-    # Verify task belongs to user
-    task = db.query(Task).filter(
+    # Verify task belongs to user (before the ETag, so a 304 can't reveal another user's task)
+    task = db.query(Task.id).filter(
         Task.id == task_id,
         Task.user_id == current_user.id
     ).first()
@@ -46,16 +96,119 @@ def get_task_notifications(
             detail="Task not found"
         )
     
-    notifications = db.query(Notification).filter(
+    etag = make_etag("task-notifications", task_id, current_user.notifications_version, skip, limit)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    notifications = db.query(*NOTIFICATION_COLUMNS).filter(
         Notification.task_id == task_id
-    ).order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+    ).order_by(Notification.created_at.desc()).offset(skip).limit(limit)
+    
+    return rows_response(notifications, etag)
+
+
+def _export_value(value):
+    """Convert a column value to a plain serializable value"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "value"):  # Enum
+        return value.value
+    return value
+
+
+def _export_rows(user_id: int, start: Optional[datetime], end: Optional[datetime]) -> Iterator[dict]:
+    """Stream a user's notifications from a server-side cursor"""
+    # The response outlives the request-scoped session, so use our own
+    db = SessionLocal()
+    try:
+        query = db.query(*EXPORT_COLUMNS).join(Task).filter(Task.user_id == user_id)
+        if start:
+            query = query.filter(Notification.created_at >= start)
+        if end:
+            query = query.filter(Notification.created_at < end)
+        
+        rows = query.order_by(Notification.id).execution_options(
+            stream_results=True,
+            yield_per=EXPORT_BATCH_SIZE
+        )
+        for row in rows:
+            yield {field: _export_value(value) for field, value in zip(EXPORT_FIELDS, row)}
+    finally:
+        db.close()
+
+
+def _encode_csv(rows: Iterator[dict]) -> Iterator[bytes]:
+    """Encode rows as CSV, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(rows: Iterator[dict]) -> Iterator[bytes]:
+    """Encode rows as newline-delimited JSON, one chunk per batch"""
+    lines = []
+    for row in rows:
+        lines.append(orjson.dumps(row))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Compress a chunk stream incrementally"""
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+@router.get("/export")
+def export_notifications(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    compress: bool = False,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Stream all notifications for current user's tasks as CSV or NDJSON"""
+    rows = _export_rows(current_user.id, start, end)
     
-    return notifications
+    if export_format == "csv":
+        chunks = _encode_csv(rows)
+        media_type = "text/csv"
+    else:
+        chunks = _encode_ndjson(rows)
+        media_type = "application/x-ndjson"
+    
+    filename = f"notifications.{export_format}"
+    if compress:
+        chunks = _gzip(chunks)
+        media_type = "application/gzip"
+        filename += ".gz"
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 @router.get("/{notification_id}", response_model=NotificationResponse)
 def get_notification(
     notification_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -71,5 +224,10 @@ def get_notification(
             detail="Notification not found"
         )
     
+    etag = make_etag("notification", notification_id, current_user.notifications_version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    set_etag(response, etag)
     return notification
 
@@ -0,0 +1,162 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+
+from config import settings
+from database import get_db
+from models import User, Task, TaskRun
+from schemas import TaskRunResponse, TaskRunSummary, PercentileSummary
+from auth import get_current_active_user
+from serialization import response_columns, rows_response
+
+router = APIRouter(prefix="/api/runs", tags=["runs"])
+
+RUN_COLUMNS = response_columns(TaskRun, TaskRunResponse)
+
+SUMMARY_METRICS = ["lag_ms", "duration_ms", "fetch_ms", "send_ms", "payload_bytes", "recipients"]
+# Metrics whose exact maximum over the window is aggregated in SQL (lag is from the sample)
+SAMPLED_MAXIMA = ["duration_ms", "fetch_ms", "send_ms", "payload_bytes", "recipients"]
+
+
+def _percentiles(values: List[float], maximum: Optional[float] = None) -> PercentileSummary:
+    """Nearest-rank percentiles of the non-null values (max: the exact one, if known)"""
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return PercentileSummary(max=maximum)
+
+    def rank(pct):
+        return values[min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))]
+
+    return PercentileSummary(
+        p50=rank(50), p95=rank(95), p99=rank(99), max=values[-1] if maximum is None else maximum
+    )
+
+
+@router.get("/summary", response_model=List[TaskRunSummary])
+def get_run_summary(
+    hours: int = Query(24, ge=1, le=24 * 90),
+    sort_by: str = Query("duration_ms", pattern="^(" + "|".join(SUMMARY_METRICS) + ")$"),
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Per-task percentile summaries of recent runs, slowest (by p95 of sort_by) first
+
+    Counts and maxima cover every run in the window and are aggregated in the
+    database; percentiles come from each task's latest RUN_SUMMARY_SAMPLE_SIZE
+    runs, so the rows read per task stay bounded however often it runs.
+    """
+    since = datetime.utcnow() - timedelta(hours=hours)
+    in_window = (
+        Task.user_id == current_user.id,
+        TaskRun.started_at >= since
+    )
+    recipients = (
+        func.coalesce(TaskRun.recipients_sent, 0)
+        + func.coalesce(TaskRun.recipients_failed, 0)
+        + func.coalesce(TaskRun.recipients_queued, 0)
+    )
+
+    groups: Dict[int, dict] = {}
+    totals = db.query(
+        TaskRun.task_id,
+        Task.name,
+        TaskRun.outcome,
+        func.count(TaskRun.id),
+        func.count(case((TaskRun.condition_matched.is_(True), 1))),
+        func.max(TaskRun.duration_ms),
+        func.max(TaskRun.fetch_ms),
+        func.max(TaskRun.send_ms),
+        func.max(TaskRun.payload_bytes),
+        func.max(case((TaskRun.condition_matched.is_(True), recipients)))
+    ).join(Task, Task.id == TaskRun.task_id).filter(*in_window).group_by(TaskRun.task_id, Task.name, TaskRun.outcome)
+    for task_id, name, outcome, runs, matched, *maxima in totals:
+        group = groups.get(task_id)
+        if group is None:
+            group = groups[task_id] = {
+                "task_name": name,
+                "outcomes": {},
+                "condition_matched": 0,
+                "max": {},
+                **{metric: [] for metric in SUMMARY_METRICS}
+            }
+        group["outcomes"][outcome] = runs
+        group["condition_matched"] += matched
+        for metric, value in zip(SAMPLED_MAXIMA, maxima):
+            if value is not None:
+                group["max"][metric] = max(group["max"].get(metric, value), value)
+
+    # Latest runs per task for the percentiles (the task/started_at index serves the ordering)
+    ranked = db.query(
+        TaskRun.task_id,
+        TaskRun.scheduled_at,
+        TaskRun.started_at,
+        TaskRun.duration_ms,
+        TaskRun.fetch_ms,
+        TaskRun.send_ms,
+        TaskRun.payload_bytes,
+        TaskRun.condition_matched,
+        recipients.label("recipients"),
+        func.row_number().over(partition_by=TaskRun.task_id, order_by=TaskRun.started_at.desc()).label("recency")
+    ).join(Task, Task.id == TaskRun.task_id).filter(*in_window).subquery()
+    sample = db.query(ranked).filter(ranked.c.recency <= settings.run_summary_sample_size)
+
+    for row in sample:
+        group = groups.get(row.task_id)
+        if group is None:
+            continue  # Recorded between the two queries
+        if row.scheduled_at is not None:
+            group["lag_ms"].append((row.started_at - row.scheduled_at).total_seconds() * 1000)
+        group["duration_ms"].append(row.duration_ms)
+        group["fetch_ms"].append(row.fetch_ms)
+        group["send_ms"].append(row.send_ms)
+        group["payload_bytes"].append(row.payload_bytes)
+        if row.condition_matched:
+            group["recipients"].append(row.recipients)
+
+    summaries = [
+        TaskRunSummary(
+            task_id=task_id,
+            task_name=group["task_name"],
+            runs=sum(group["outcomes"].values()),
+            sampled_runs=len(group["duration_ms"]),
+            outcomes=group["outcomes"],
+            condition_matched=group["condition_matched"],
+            **{metric: _percentiles(group[metric], group["max"].get(metric)) for metric in SUMMARY_METRICS}
+        )
+        for task_id, group in groups.items()
+    ]
+    summaries.sort(key=lambda summary: getattr(summary, sort_by).p95 or 0, reverse=True)
+    return summaries[:limit]
+
+
+@router.get("/task/{task_id}", response_model=List[TaskRunResponse])
+def get_task_runs(
+    task_id: int,
+    skip: int = 0,
+    limit: int = Query(100, le=1000),
+    outcome: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get recent runs of a specific task, newest first"""
+    # Verify task belongs to user
+    task = db.query(Task).filter(
+        Task.id == task_id,
+        Task.user_id == current_user.id
+    ).first()
+
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+
+    runs = db.query(*RUN_COLUMNS).filter(TaskRun.task_id == task_id)
+    if outcome:
+        runs = runs.filter(TaskRun.outcome == outcome)
+
+    return rows_response(runs.order_by(TaskRun.started_at.desc()).offset(skip).limit(limit))
@@ -1,15 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import update
+from sqlalchemy.orm import Session, selectinload
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
 
 from database import get_db
-from models import User, Task
-from schemas import TaskCreate, TaskUpdate, TaskResponse
+from models import User, Task, Notification, TaskRun, ContactList, task_contact_lists
+from schemas import (
+    TaskCreate,
+    TaskUpdate,
+    TaskResponse,
+    TaskListResponse,
+    TaskBulkCreate,
+    TaskBulkUpdate,
+    TaskBulkDelete,
+    TaskBulkItemResult,
+    TaskBulkResponse,
+    IngestTokenResponse,
+    UpcomingRun,
+    MessagePreviewRequest,
+    MessagePreviewResponse,
+    MessageEncoding
+)
 from auth import get_current_active_user
+from config import settings
+from serialization import (
+    response_columns,
+    rows_response,
+    make_etag,
+    etag_matches,
+    set_etag,
+    not_modified
+)
 from services.scheduler_service import task_scheduler
+from services.condition_evaluator import condition_evaluator
+from services.sms_encoding import segment_info, transliterate
+from services.change_tracker import (
+    bump_tasks_version,
+    bump_notifications_version,
+    mark_tasks_changed,
+    mark_tasks_deleted
+)
+from services.recipients import refresh_recipient_counts
+from services.ingest_service import new_ingest_token
+from services.fire_calendar import fire_calendar
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
+TASK_COLUMNS = response_columns(Task, TaskListResponse)
+
+# Fields whose change alters a task's recipient_count
+RECIPIENT_FIELDS = {"recipients", "contact_list_ids"}
+
+
+def _owned_contact_lists(db: Session, list_ids: Iterable[int], user_id: int) -> Dict[int, ContactList]:
+    """The user's contact lists among the given ids"""
+    list_ids = set(list_ids)
+    if not list_ids:
+        return {}
+    return {
+        contact_list.id: contact_list
+        for contact_list in db.query(ContactList).filter(
+            ContactList.id.in_(list_ids),
+            ContactList.user_id == user_id
+        )
+    }
+
+
+def _resolve_contact_lists(list_ids: List[int], owned: Dict[int, ContactList]) -> Optional[List[ContactList]]:
+    """Contact lists for a task, or None if any of them isn't the user's"""
+    if any(list_id not in owned for list_id in list_ids):
+        return None
+    return [owned[list_id] for list_id in dict.fromkeys(list_ids)]
+
+
+def _apply_update(db_task: Task, update_data: dict, owned: Dict[int, ContactList]) -> Optional[str]:
+    """Set updated fields on a task; returns an error message instead if a contact list is not found"""
+    if "contact_list_ids" in update_data:
+        contact_lists = _resolve_contact_lists(update_data.pop("contact_list_ids") or [], owned)
+        if contact_lists is None:
+            return "Contact list not found"
+        db_task.contact_lists = contact_lists
+    for field, value in update_data.items():
+        setattr(db_task, field, value)
+    return None
+
 
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 def create_task(
@@ -18,12 +94,26 @@ def create_task(
     db: Session = Depends(get_db)
 ):
     """Create a new task"""
+    contact_lists = _resolve_contact_lists(
+        task.contact_list_ids,
+        _owned_contact_lists(db, task.contact_list_ids, current_user.id)
+    )
+    if contact_lists is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contact list not found"
+        )
+    
     db_task = Task(
-        **task.model_dump(),
+        **task.model_dump(exclude={"contact_list_ids"}),
+        contact_lists=contact_lists,
         user_id=current_user.id
     )
+    refresh_recipient_counts(db, [db_task])
     
     db.add(db_task)
+    bump_tasks_version(db, [current_user.id])
+    mark_tasks_changed(db, [db_task])
     db.commit()
     db.refresh(db_task)
     
@@ -34,25 +124,275 @@ def create_task(
     return db_task
 
 
-@router.get("/", response_model=List[TaskResponse])
+@router.get("/", response_model=List[TaskListResponse])
 def get_tasks(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get all tasks for current user"""
-    tasks = db.query(Task).filter(Task.user_id == current_user.id).offset(skip).limit(limit).all()
-    return tasks
+    """Get all tasks for current user (with recipient counts rather than the numbers)"""
+    etag = make_etag("tasks", current_user.id, current_user.tasks_version, skip, limit)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    tasks = db.query(*TASK_COLUMNS).filter(Task.user_id == current_user.id).offset(skip).limit(limit)
+    return rows_response(tasks, etag)
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+@router.get("/upcoming", response_model=List[UpcomingRun])
+def get_upcoming_runs(
+    start: Optional[datetime] = Query(None, description="Start of the range (default: now; naive times are UTC)"),
+    end: Optional[datetime] = Query(None, description="End of the range; without it the next `limit` fires are returned"),
+    limit: int = Query(100, ge=1, le=settings.calendar_max_items),
+    task_ids: Optional[List[int]] = Query(None, description="Only these tasks"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """When the current user's active tasks will fire, in order, across all their schedules"""
+    start = _utc(start) if start else datetime.now(timezone.utc)
+    end = _utc(end) if end else None
+    if end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+    query = db.query(
+        Task.id,
+        Task.name,
+        Task.schedule_cron,
+        Task.schedule_human,
+        Task.poll_min_seconds,
+        Task.poll_max_seconds,
+        Task.next_run
+    ).filter(Task.user_id == current_user.id, Task.is_active.is_(True))
+    if task_ids:
+        query = query.filter(Task.id.in_(task_ids))
+
+    names = {}
+    schedules = []
+    for task_id, name, cron, human, poll_min, poll_max, next_run in query:
+        names[task_id] = name
+        schedules.append((task_id, cron, human, poll_min, poll_max, next_run))
+
+    fires = fire_calendar.timeline(schedules, start, end, limit)
+    return ORJSONResponse([
+        {"task_id": task_id, "task_name": names[task_id], "fire_time": fire.astimezone(timezone.utc)}
+        for fire, task_id in fires
+    ])
+
+
+def _bulk_response(results: List[TaskBulkItemResult]) -> TaskBulkResponse:
+    """Summarize per-item bulk results"""
+    succeeded = sum(1 for result in results if result.success)
+    return TaskBulkResponse(
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+
+
+def _message_encoding(message: str) -> MessageEncoding:
+    info = segment_info(message)
+    return MessageEncoding(
+        message=message,
+        encoding=info.encoding,
+        length=info.length,
+        segments=info.segments,
+        segment_limit=info.segment_limit,
+        non_gsm_characters=info.non_gsm_characters
+    )
+
+
+@router.post("/preview", response_model=MessagePreviewResponse)
+def preview_message(
+    preview: MessagePreviewRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Render a message template and report its encoding and SMS segment count"""
+    message = condition_evaluator.format_message(preview.template, preview.sample_data)
+    if preview.transliterate:
+        message = transliterate(message)
+    
+    response = MessagePreviewResponse(**_message_encoding(message).model_dump())
+    converted = transliterate(message)
+    if converted != message:
+        response.transliterated = _message_encoding(converted)
+    return response
+
+
+@router.post("/bulk", response_model=TaskBulkResponse, status_code=status.HTTP_201_CREATED)
+def bulk_create_tasks(
+    batch: TaskBulkCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Create many tasks in a single transaction"""
+    # Keep rows loaded after commit so the response and scheduler don't refresh each task
+    db.expire_on_commit = False
+    
+    owned = _owned_contact_lists(
+        db, (list_id for task in batch.tasks for list_id in task.contact_list_ids), current_user.id
+    )
+    results = []
+    created = []
+    for index, task in enumerate(batch.tasks):
+        contact_lists = _resolve_contact_lists(task.contact_list_ids, owned)
+        if contact_lists is None:
+            results.append(TaskBulkItemResult(index=index, success=False, error="Contact list not found"))
+            continue
+        created.append((index, Task(
+            **task.model_dump(exclude={"contact_list_ids"}),
+            contact_lists=contact_lists,
+            user_id=current_user.id
+        )))
+    
+    db_tasks = [db_task for _, db_task in created]
+    refresh_recipient_counts(db, db_tasks)
+    db.add_all(db_tasks)
+    if db_tasks:
+        bump_tasks_version(db, [current_user.id])
+        mark_tasks_changed(db, db_tasks)
+    db.commit()
+    
+    # Schedule all active tasks in one pass
+    task_scheduler.schedule_tasks([db_task for db_task in db_tasks if db_task.is_active])
+    
+    for index, db_task in created:
+        results.append(TaskBulkItemResult(
+            index=index,
+            id=db_task.id,
+            success=True,
+            task=TaskResponse.model_validate(db_task)
+        ))
+    results.sort(key=lambda result: result.index)
+    
+    return _bulk_response(results)
+
+
+@router.put("/bulk", response_model=TaskBulkResponse)
+def bulk_update_tasks(
+    batch: TaskBulkUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Update many tasks in a single transaction"""
+    db.expire_on_commit = False
+    
+    ids = [item.id for item in batch.tasks]
+    db_tasks = {
+        db_task.id: db_task
+        for db_task in db.query(Task).options(selectinload(Task.contact_lists)).filter(
+            Task.id.in_(ids),
+            Task.user_id == current_user.id
+        ).all()
+    }
+    owned = _owned_contact_lists(
+        db, (list_id for item in batch.tasks for list_id in item.contact_list_ids or []), current_user.id
+    )
+    
+    results = []
+    updated = []
+    seen = set()
+    for index, item in enumerate(batch.tasks):
+        db_task = db_tasks.get(item.id)
+        if not db_task:
+            results.append(TaskBulkItemResult(index=index, id=item.id, success=False, error="Task not found"))
+            continue
+        if item.id in seen:
+            results.append(TaskBulkItemResult(index=index, id=item.id, success=False, error="Duplicate task id in batch"))
+            continue
+        
+        # Update fields
+        update_data = item.model_dump(exclude_unset=True, exclude={"id"})
+        error = _apply_update(db_task, update_data, owned)
+        if error:
+            results.append(TaskBulkItemResult(index=index, id=item.id, success=False, error=error))
+            continue
+        seen.add(item.id)
+        if RECIPIENT_FIELDS & item.model_fields_set:
+            refresh_recipient_counts(db, [db_task])
+        
+        updated.append((index, db_task))
+    
+    if updated:
+        bump_tasks_version(db, [current_user.id])
+        mark_tasks_changed(db, [db_task for _, db_task in updated])
+    db.commit()
+    
+    # Reschedule the updated tasks in one pass
+    task_scheduler.unschedule_tasks([db_task.id for _, db_task in updated])
+    task_scheduler.schedule_tasks([db_task for _, db_task in updated if db_task.is_active])
+    
+    for index, db_task in updated:
+        results.append(TaskBulkItemResult(
+            index=index,
+            id=db_task.id,
+            success=True,
+            task=TaskResponse.model_validate(db_task)
+        ))
+    results.sort(key=lambda result: result.index)
+    
+    return _bulk_response(results)
+
+
+@router.post("/bulk/delete", response_model=TaskBulkResponse)
+def bulk_delete_tasks(
+    batch: TaskBulkDelete,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Delete many tasks in a single transaction"""
+    owned_ids = {
+        task_id
+        for (task_id,) in db.query(Task.id).filter(
+            Task.id.in_(batch.ids),
+            Task.user_id == current_user.id
+        ).all()
+    }
+    
+    if owned_ids:
+        # Detach notification history, as deleting a single task does
+        db.execute(
+            update(Notification)
+            .where(Notification.task_id.in_(owned_ids))
+            .values(task_id=None)
+        )
+        db.query(TaskRun).filter(TaskRun.task_id.in_(owned_ids)).delete(synchronize_session=False)
+        db.execute(task_contact_lists.delete().where(task_contact_lists.c.task_id.in_(owned_ids)))
+        db.query(Task).filter(Task.id.in_(owned_ids)).delete(synchronize_session=False)
+        bump_tasks_version(db, [current_user.id])
+        mark_tasks_deleted(db, owned_ids)
+        bump_notifications_version(db, [current_user.id])
+        db.commit()
+        
+        task_scheduler.unschedule_tasks(list(owned_ids))
+    
+    results = []
+    deleted = set()
+    for index, task_id in enumerate(batch.ids):
+        if task_id in owned_ids and task_id not in deleted:
+            deleted.add(task_id)
+            results.append(TaskBulkItemResult(index=index, id=task_id, success=True))
+        else:
+            results.append(TaskBulkItemResult(index=index, id=task_id, success=False, error="Task not found"))
+    
+    return _bulk_response(results)
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
 def get_task(
     task_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get a specific task"""
+    # Load the owned task before the ETag, so a 304 can't stand in for a 404
     task = db.query(Task).filter(
         Task.id == task_id,
         Task.user_id == current_user.id
@@ -64,6 +404,11 @@ def get_task(
             detail="Task not found"
         )
     
+    etag = make_etag("task", task_id, current_user.tasks_version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    set_etag(response, etag)
     return task
 
 
@@ -88,9 +433,17 @@ def update_task(
     
     # Update fields
     update_data = task_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_task, field, value)
+    owned = _owned_contact_lists(db, update_data.get("contact_list_ids") or [], current_user.id)
+    if _apply_update(db_task, update_data, owned):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contact list not found"
+        )
+    if RECIPIENT_FIELDS & task_update.model_fields_set:
+        refresh_recipient_counts(db, [db_task])
     
+    bump_tasks_version(db, [current_user.id])
+    mark_tasks_changed(db, [db_task])
     db.commit()
     db.refresh(db_task)
     
@@ -123,7 +476,11 @@ def delete_task(
     # Unschedule the task
     task_scheduler.unschedule_task(task_id)
     
+    db.query(TaskRun).filter(TaskRun.task_id == task_id).delete(synchronize_session=False)
     db.delete(db_task)
+    bump_tasks_version(db, [current_user.id])
+    mark_tasks_deleted(db, [task_id])
+    bump_notifications_version(db, [current_user.id])
     db.commit()
     
     return None
@@ -148,6 +505,8 @@ def toggle_task(
         )
     
     db_task.is_active = not db_task.is_active
+    bump_tasks_version(db, [current_user.id])
+    mark_tasks_changed(db, [db_task])
     db.commit()
     db.refresh(db_task)
     
@@ -158,3 +517,56 @@ def toggle_task(
     
     return db_task
 
+
+@router.post("/{task_id}/ingest-token", response_model=IngestTokenResponse)
+def create_ingest_token(
+    task_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Enable the task's push webhook, replacing any previous token"""
+    db_task = db.query(Task).filter(
+        Task.id == task_id,
+        Task.user_id == current_user.id
+    ).first()
+    
+    if not db_task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    token, db_task.ingest_token_hash = new_ingest_token()
+    bump_tasks_version(db, [current_user.id])
+    db.commit()
+    
+    return IngestTokenResponse(
+        url=str(request.url_for("ingest_task_payload", task_id=task_id)),
+        token=token
+    )
+
+
+@router.delete("/{task_id}/ingest-token", status_code=status.HTTP_204_NO_CONTENT)
+def delete_ingest_token(
+    task_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Disable the task's push webhook"""
+    db_task = db.query(Task).filter(
+        Task.id == task_id,
+        Task.user_id == current_user.id
+    ).first()
+    
+    if not db_task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    db_task.ingest_token_hash = None
+    bump_tasks_version(db, [current_user.id])
+    db.commit()
+    
+    return None
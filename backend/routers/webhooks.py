@@ -0,0 +1,159 @@
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional, Tuple
+from datetime import datetime
+import base64
+import hashlib
+import hmac
+
+import orjson
+
+from config import settings
+from database import SessionLocal
+from models import Task
+from services.receipt_service import receipt_service, DeliveryReceipt
+from services.ingest_service import ingest_service, hash_ingest_token
+
+router = APIRouter(prefix="/api/webhooks", tags=["webhooks"])
+
+# Provider statuses that finalize a message; anything else is an intermediate state
+AFRICASTALKING_DELIVERED = {"Success"}
+AFRICASTALKING_FAILED = {"Failed", "Rejected", "Expired"}
+TWILIO_DELIVERED = {"delivered"}
+TWILIO_FAILED = {"failed", "undelivered"}
+
+
+def _check_buffer():
+    """Push back on providers (they retry) rather than growing the buffer without bound"""
+    if receipt_service.is_full():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Receipt buffer full, retry later"
+        )
+
+
+def _twilio_signature(url: str, params: dict) -> str:
+    """Compute Twilio's X-Twilio-Signature for a form POST"""
+    payload = url + "".join(f"{key}{params[key]}" for key in sorted(params))
+    digest = hmac.new(
+        settings.twilio_auth_token.encode("utf-8"),
+        payload.encode("utf-8"),
+        hashlib.sha1
+    ).digest()
+    return base64.b64encode(digest).decode("utf-8")
+
+
+@router.post("/africastalking/delivery")
+async def africastalking_delivery_report(request: Request, token: Optional[str] = Query(None)):
+    """Receive an Africa's Talking delivery report"""
+    # Africa's Talking does not sign callbacks, so the callback URL carries a shared secret
+    expected = settings.africastalking_callback_token
+    if not expected or not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid callback token")
+
+    _check_buffer()
+    form = await request.form()
+    message_id = form.get("id")
+    report_status = form.get("status")
+
+    if message_id and report_status in AFRICASTALKING_DELIVERED | AFRICASTALKING_FAILED:
+        receipt_service.add(DeliveryReceipt(
+            provider_message_id=message_id,
+            delivered=report_status in AFRICASTALKING_DELIVERED,
+            received_at=datetime.utcnow(),
+            error=form.get("failureReason") or report_status
+        ))
+
+    return {"status": "accepted"}
+
+
+@router.post("/twilio/status")
+async def twilio_status_callback(request: Request):
+    """Receive a Twilio message status callback"""
+    if not settings.twilio_auth_token:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Twilio not configured")
+
+    form = await request.form()
+    params = {key: value for key, value in form.items()}
+    url = settings.twilio_status_callback_url or str(request.url)
+    signature = request.headers.get("X-Twilio-Signature", "")
+    if not hmac.compare_digest(signature, _twilio_signature(url, params)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid signature")
+
+    _check_buffer()
+    message_id = params.get("MessageSid")
+    message_status = params.get("MessageStatus")
+
+    if message_id and message_status in TWILIO_DELIVERED | TWILIO_FAILED:
+        error = params.get("ErrorMessage") or params.get("ErrorCode")
+        receipt_service.add(DeliveryReceipt(
+            provider_message_id=message_id,
+            delivered=message_status in TWILIO_DELIVERED,
+            received_at=datetime.utcnow(),
+            error=f"Twilio {message_status}: {error}" if error else f"Twilio {message_status}"
+        ))
+
+    return {"status": "accepted"}
+
+
+def _ingest_target(task_id: int) -> Optional[Tuple[str, bool]]:
+    """Look up a task's (ingest token hash, is_active) without holding a session"""
+    db = SessionLocal()
+    try:
+        return db.query(Task.ingest_token_hash, Task.is_active).filter(Task.id == task_id).first()
+    finally:
+        db.close()
+
+
+def _too_large(content_length: str, limit: int) -> bool:
+    return content_length.isdigit() and int(content_length) > limit
+
+
+async def _read_body(request: Request, limit: int) -> bytes:
+    """Read the request body, stopping as soon as it exceeds limit bytes (chunked bodies have no length)"""
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Payload too large")
+    return bytes(body)
+
+
+@router.post("/tasks/{task_id}", status_code=status.HTTP_202_ACCEPTED, name="ingest_task_payload")
+async def ingest_task_payload(task_id: int, request: Request, token: Optional[str] = Query(None)):
+    """
+    Push data to a task and run it without polling its source
+
+    The body is a JSON object used in place of the fetched source payload.
+    The token goes in an X-Ingest-Token header (or ?token=... for senders
+    that cannot set headers). Bursts are debounced: the task runs once on
+    the merged payloads after they stop arriving.
+    """
+    if _too_large(request.headers.get("Content-Length", ""), settings.ingest_max_body_bytes):
+        # Refused before the token lookup, without reading the body
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Payload too large")
+
+    token = request.headers.get("X-Ingest-Token") or token
+    target = await run_in_threadpool(_ingest_target, task_id)
+    # Unknown tasks and tasks without a token look the same as a wrong token
+    if not token or not target or not target[0] or not hmac.compare_digest(hash_ingest_token(token), target[0]):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid ingest token")
+    if not target[1]:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Task is inactive")
+
+    body = await _read_body(request, settings.ingest_max_body_bytes)
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        payload = None
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Payload must be a JSON object")
+
+    if ingest_service.is_full(task_id):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Ingest queue full, retry later"
+        )
+    coalesced = ingest_service.submit(task_id, payload, len(body))
+
+    return {"status": "accepted", "coalesced": coalesced}
@@ -1,7 +1,19 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 from models import DeliveryStatus, SMSProvider
+from config import settings
+from services.recipients import normalize_recipients
+
+
+def _normalized_recipients(numbers: Optional[List[str]]) -> Optional[List[str]]:
+    """Store recipients deduplicated in E.164, rejecting numbers that can't be normalized"""
+    if numbers is None:
+        return None
+    valid, invalid = normalize_recipients(numbers)
+    if invalid:
+        raise ValueError(f"Invalid phone numbers: {', '.join(invalid[:10])}")
+    return valid
 
 
 # User schemas
@@ -24,37 +36,108 @@ class UserResponse(UserBase):
 
 
 # Task schemas
+class ScrapeField(BaseModel):
+    """Where to find one value on a scraped page (exactly one of css or xpath)"""
+    css: Optional[str] = None
+    xpath: Optional[str] = None
+    attribute: Optional[str] = None  # Read an attribute instead of the text
+    all: bool = False  # Return every match as a list instead of the first
+    number: bool = False  # Parse the first number out of the text
+
+
+def _compiled_scrape_fields(fields: Optional[Dict[str, ScrapeField]]) -> Optional[Dict[str, ScrapeField]]:
+    """Reject selectors that don't compile"""
+    if fields:
+        from services.scrape_fields import compile_fields  # lxml is only loaded for tasks that scrape
+
+        compile_fields({name: field.model_dump() for name, field in fields.items()})
+    return fields
+
+
+def _valid_poll_bounds(task):
+    """Adaptive polling needs both bounds, in order"""
+    if (task.poll_min_seconds is None) != (task.poll_max_seconds is None):
+        raise ValueError("Set both poll_min_seconds and poll_max_seconds, or neither")
+    if task.poll_min_seconds is not None and task.poll_min_seconds > task.poll_max_seconds:
+        raise ValueError("poll_min_seconds must not exceed poll_max_seconds")
+    return task
+
+
 class TaskBase(BaseModel):
     name: str
     description: Optional[str] = None
     source_link: Optional[str] = None
+    source_type: Literal["json", "html"] = "json"
+    scrape_fields: Optional[Dict[str, ScrapeField]] = None
     schedule_cron: Optional[str] = None
     schedule_human: Optional[str] = None
-    recipients: List[str] = Field(default_factory=list)
+    poll_min_seconds: Optional[int] = Field(None, ge=5, le=86400)
+    poll_max_seconds: Optional[int] = Field(None, ge=5, le=86400)
     condition_rules: Optional[Dict[str, Any]] = None
     message_template: Optional[str] = None
+    transliterate: bool = False
+    digest_window_seconds: int = Field(0, ge=0, le=3600)
+    priority: Literal["urgent", "normal", "bulk"] = "normal"
     is_active: bool = True
 
 
 class TaskCreate(TaskBase):
-    pass
+    recipients: List[str] = Field(default_factory=list)
+    contact_list_ids: List[int] = Field(default_factory=list)
+    
+    _normalize_recipients = field_validator("recipients")(_normalized_recipients)
+    _compile_scrape_fields = field_validator("scrape_fields")(_compiled_scrape_fields)
+    _check_poll_bounds = model_validator(mode="after")(_valid_poll_bounds)
+    
+    @model_validator(mode="after")
+    def _html_needs_fields(self):
+        if self.source_type == "html" and not self.scrape_fields:
+            raise ValueError("HTML sources need scrape_fields")
+        return self
 
 
 class TaskUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     source_link: Optional[str] = None
+    source_type: Optional[Literal["json", "html"]] = None
+    scrape_fields: Optional[Dict[str, ScrapeField]] = None
     schedule_cron: Optional[str] = None
     schedule_human: Optional[str] = None
+    poll_min_seconds: Optional[int] = Field(None, ge=5, le=86400)
+    poll_max_seconds: Optional[int] = Field(None, ge=5, le=86400)
     recipients: Optional[List[str]] = None
+    contact_list_ids: Optional[List[int]] = None
     condition_rules: Optional[Dict[str, Any]] = None
     message_template: Optional[str] = None
+    transliterate: Optional[bool] = None
+    digest_window_seconds: Optional[int] = Field(None, ge=0, le=3600)
+    priority: Optional[Literal["urgent", "normal", "bulk"]] = None
     is_active: Optional[bool] = None
+    
+    _normalize_recipients = field_validator("recipients")(_normalized_recipients)
+    _compile_scrape_fields = field_validator("scrape_fields")(_compiled_scrape_fields)
+    _check_poll_bounds = model_validator(mode="after")(_valid_poll_bounds)
+
+
+class TaskListResponse(TaskBase):
+    # List rows carry a count; the numbers themselves come with the single task
+    id: int
+    user_id: int
+    recipient_count: Optional[int] = None
+    last_run: Optional[datetime] = None
+    next_run: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
 
 
 class TaskResponse(TaskBase):
     id: int
     user_id: int
+    recipients: List[str] = Field(default_factory=list)
+    contact_list_ids: List[int] = Field(default_factory=list)
+    recipient_count: Optional[int] = None
+    ingest_enabled: bool = False
     last_run: Optional[datetime] = None
     next_run: Optional[datetime] = None
     created_at: datetime
@@ -64,6 +147,119 @@ class TaskResponse(TaskBase):
         from_attributes = True
 
 
+class IngestTokenResponse(BaseModel):
+    # The token is only ever shown here; the task stores its hash
+    url: str
+    token: str
+
+
+class UpcomingRun(BaseModel):
+    task_id: int
+    task_name: str
+    fire_time: datetime
+
+
+class MessagePreviewRequest(BaseModel):
+    template: str
+    sample_data: Dict[str, Any] = Field(default_factory=dict)
+    transliterate: bool = False
+
+
+class MessageEncoding(BaseModel):
+    message: str
+    encoding: str
+    length: int
+    segments: int
+    segment_limit: int
+    non_gsm_characters: List[str]
+
+
+class MessagePreviewResponse(MessageEncoding):
+    # What transliteration would produce, when it changes the message
+    transliterated: Optional[MessageEncoding] = None
+
+
+# Bulk task schemas
+class TaskBulkCreate(BaseModel):
+    tasks: List[TaskCreate] = Field(..., min_length=1, max_length=settings.bulk_max_items)
+
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: int
+
+
+class TaskBulkUpdate(BaseModel):
+    tasks: List[TaskBulkUpdateItem] = Field(..., min_length=1, max_length=settings.bulk_max_items)
+
+
+class TaskBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=settings.bulk_max_items)
+
+
+class TaskBulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    success: bool
+    error: Optional[str] = None
+    task: Optional[TaskResponse] = None
+
+
+class TaskBulkResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[TaskBulkItemResult]
+
+
+# Contact list schemas
+class ContactListBase(BaseModel):
+    name: str
+    description: Optional[str] = None
+
+
+class ContactListCreate(ContactListBase):
+    pass
+
+
+class ContactListUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+
+class ContactListResponse(ContactListBase):
+    id: int
+    user_id: int
+    contact_count: int
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class ContactResponse(BaseModel):
+    id: int
+    phone_number: str
+    name: Optional[str] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class ContactImport(BaseModel):
+    phone_numbers: List[str] = Field(..., min_length=1, max_length=settings.contact_import_max_items)
+
+
+class ContactImportResult(BaseModel):
+    added: int
+    duplicates: int  # Already in the list or repeated in the request
+    invalid: List[str]
+
+
+class ContactRemoveResult(BaseModel):
+    removed: int
+
+
 # Notification schemas
 class NotificationBase(BaseModel):
     recipient: str
@@ -79,6 +275,9 @@ class NotificationResponse(NotificationBase):
     id: int
     task_id: int
     status: DeliveryStatus
+    provider_message_id: Optional[str] = None
+    segments: Optional[int] = None
+    priority: str = "normal"
     sent_at: Optional[datetime] = None
     delivered_at: Optional[datetime] = None
     error_message: Optional[str] = None
@@ -89,6 +288,50 @@ class NotificationResponse(NotificationBase):
         from_attributes = True
 
 
+# Task run schemas
+class TaskRunResponse(BaseModel):
+    id: int
+    task_id: int
+    scheduled_at: Optional[datetime] = None
+    started_at: datetime
+    duration_ms: Optional[float] = None
+    fetch_ms: Optional[float] = None
+    evaluate_ms: Optional[float] = None
+    send_ms: Optional[float] = None
+    payload_bytes: Optional[int] = None
+    condition_matched: Optional[bool] = None
+    recipients_sent: int
+    recipients_failed: int
+    recipients_queued: Optional[int] = 0
+    outcome: str
+    error: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class PercentileSummary(BaseModel):
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+    max: Optional[float] = None
+
+
+class TaskRunSummary(BaseModel):
+    task_id: int
+    task_name: str
+    runs: int
+    sampled_runs: int  # Latest runs the percentiles are taken from
+    outcomes: Dict[str, int]
+    condition_matched: int
+    lag_ms: PercentileSummary
+    duration_ms: PercentileSummary
+    fetch_ms: PercentileSummary
+    send_ms: PercentileSummary
+    payload_bytes: PercentileSummary
+    recipients: PercentileSummary
+
+
 # Auth schemas
 class Token(BaseModel):
     access_token: str
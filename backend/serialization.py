@@ -0,0 +1,58 @@
+from typing import List, Optional, Type
+
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Query
+
+# Let browsers keep responses but revalidate them with If-None-Match on every poll
+CACHE_CONTROL = "private, no-cache"
+
+
+def response_columns(model, schema: Type[BaseModel]) -> list:
+    """ORM columns backing each field of a response schema, in schema order"""
+    return [getattr(model, field) for field in schema.model_fields]
+
+
+def rows_response(query: Query, etag: Optional[str] = None) -> ORJSONResponse:
+    """
+    Serialize a column query straight to JSON
+
+    List endpoints select only the columns their response schema needs and
+    hand the rows to orjson (which handles datetimes and enums natively),
+    skipping ORM object construction and per-row model validation.
+    """
+    rows: List[dict] = [row._asdict() for row in query]
+    response = ORJSONResponse(rows)
+    if etag:
+        set_etag(response, etag)
+    return response
+
+
+def make_etag(*parts) -> str:
+    """Build a weak ETag from version components"""
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check a request's If-None-Match header against an ETag (weak comparison)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def set_etag(response: Response, etag: str):
+    """Attach validator headers to a response"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a matching conditional GET"""
+    response = Response(status_code=304)
+    set_etag(response, etag)
+    return response
@@ -0,0 +1,86 @@
+"""
+Adaptive polling for tasks with poll_min_seconds/poll_max_seconds
+
+Each poll fingerprints the fields the task actually reads (its template
+placeholders and condition fields, or the whole payload when it reads
+none), so a timestamp elsewhere in the feed doesn't count as a change.
+A change drops the interval back to the minimum; every poll that sees the
+same data (or fails) multiplies it by the backoff factor, up to the maximum.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+import orjson
+
+from config import settings
+
+
+def _field(data: Any, path: str) -> Any:
+    for part in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data
+
+
+def payload_fingerprint(data: Dict[str, Any], paths: Iterable[str]) -> bytes:
+    """Digest of the values a task reads from a payload"""
+    paths = sorted(paths)
+    if paths:
+        data = {path: _field(data, path) for path in paths}
+    encoded = orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+    return hashlib.blake2b(encoded, digest_size=16).digest()
+
+
+@dataclass
+class PollState:
+    interval: float
+    fingerprint: Optional[bytes] = None
+
+
+class AdaptivePoller:
+    """Tracks each adaptive task's current poll interval"""
+
+    def __init__(self):
+        self.backoff_factor = settings.adaptive_poll_backoff_factor
+        self._states: Dict[int, PollState] = {}
+
+    def interval(self, task_id: int, min_seconds: float, max_seconds: float) -> float:
+        """Current interval for a task (the minimum until it has been polled)"""
+        state = self._states.get(task_id)
+        if state is None:
+            return min_seconds
+        return min(max(state.interval, min_seconds), max_seconds)
+
+    def observe(
+        self,
+        task_id: int,
+        min_seconds: float,
+        max_seconds: float,
+        data: Optional[Dict[str, Any]],
+        paths: Iterable[str]
+    ) -> Optional[float]:
+        """Record a poll's result (None when the fetch failed); returns the new interval if it changed"""
+        current = self.interval(task_id, min_seconds, max_seconds)
+        state = self._states.setdefault(task_id, PollState(interval=current))
+
+        fingerprint = payload_fingerprint(data, paths) if data is not None else None
+        if fingerprint is not None and state.fingerprint is None:
+            interval = current  # First look at the source: nothing to compare with yet
+        elif fingerprint is not None and fingerprint != state.fingerprint:
+            interval = min_seconds
+        else:
+            interval = min(current * self.backoff_factor, max_seconds)
+
+        if fingerprint is not None:
+            state.fingerprint = fingerprint
+        state.interval = interval
+        return interval if interval != current else None
+
+    def forget(self, task_id: int):
+        self._states.pop(task_id, None)
+
+
+# Singleton instance
+adaptive_poller = AdaptivePoller()
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import func
+
+from config import settings
+from database import SessionLocal
+from models import Notification, DeliveryStatus
+from services.retry_service import retry_service
+
+logger = logging.getLogger(__name__)
+
+
+class BacklogMonitor:
+    """Counts the notification backlog on an interval so metric scrapes don't query the database"""
+
+    def __init__(self):
+        self.scheduler = AsyncIOScheduler()
+        self.interval_seconds = settings.backlog_refresh_seconds
+        # Served until the first count completes
+        self.counts: Dict[str, int] = {"pending": 0, "queued": 0, "retry_backlog": 0}
+
+    def start(self):
+        """Start counting the backlog"""
+        if self.interval_seconds > 0 and not self.scheduler.running:
+            self.scheduler.add_job(
+                self.refresh,
+                trigger=IntervalTrigger(seconds=self.interval_seconds),
+                id='count_notification_backlog',
+                replace_existing=True,
+                next_run_time=datetime.now()  # Count once right away
+            )
+            self.scheduler.start()
+            logger.info("Backlog monitor started")
+
+    def stop(self):
+        """Stop counting the backlog"""
+        if self.scheduler.running:
+            self.scheduler.shutdown()
+            logger.info("Backlog monitor stopped")
+
+    def _count(self) -> Dict[str, int]:
+        """Non-terminal notifications by state (both filters use the status/retry_count index)"""
+        db = SessionLocal()
+        try:
+            by_status = dict(
+                db.query(Notification.status, func.count(Notification.id))
+                .filter(Notification.status.in_([DeliveryStatus.PENDING, DeliveryStatus.QUEUED]))
+                .group_by(Notification.status)
+            )
+            retry_backlog = db.query(func.count(Notification.id)).filter(
+                Notification.status.in_([DeliveryStatus.FAILED, DeliveryStatus.QUEUED]),
+                Notification.retry_count < retry_service.max_retries
+            ).scalar()
+        finally:
+            db.close()
+        return {
+            "pending": by_status.get(DeliveryStatus.PENDING, 0),
+            "queued": by_status.get(DeliveryStatus.QUEUED, 0),
+            "retry_backlog": retry_backlog
+        }
+
+    async def refresh(self):
+        """Recount the backlog off the event loop"""
+        try:
+            self.counts = await asyncio.get_running_loop().run_in_executor(None, self._count)
+        except Exception as e:
+            logger.error(f"Error counting notification backlog: {e}")
+
+
+# Singleton instance
+backlog_monitor = BacklogMonitor()
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import User, Task, Notification, TaskTombstone, task_change_versions
+
+
+def bump_tasks_version(db: Session, user_ids: Iterable[int]):
+    """Mark the users' task lists as changed (applied with the caller's commit)"""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        db.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(tasks_version=User.tasks_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def bump_notifications_version(db: Session, user_ids: Iterable[int]):
+    """Mark the users' notification lists as changed (applied with the caller's commit)"""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        db.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(notifications_version=User.notifications_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def bump_notifications_version_for_messages(db: Session, provider_message_ids: Iterable[str]):
+    """Mark notification lists as changed for the owners of the given provider messages"""
+    provider_message_ids = list(provider_message_ids)
+    # Chunk to stay under database bound-parameter limits
+    for start in range(0, len(provider_message_ids), 500):
+        chunk = provider_message_ids[start:start + 500]
+        owners = (
+            select(Task.user_id)
+            .join(Notification, Notification.task_id == Task.id)
+            .where(Notification.provider_message_id.in_(chunk))
+        )
+        db.execute(
+            update(User)
+            .where(User.id.in_(owners))
+            .values(notifications_version=User.notifications_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def prepare_change_feed(tombstone_retention: timedelta = timedelta(days=1)):
+    """Bring the version sequence up to the feed and prune old tombstones (run at startup)"""
+    db = SessionLocal()
+    try:
+        current = current_task_change_version(db)
+        if db.get_bind().dialect.supports_sequences:
+            # Versions stamped before the sequence existed (or restored from a dump) must stay below it
+            db.execute(text(
+                "SELECT setval('task_change_versions', GREATEST(:current, "
+                "(SELECT last_value FROM task_change_versions)))"
+            ), {"current": max(current, 1)})
+        # Keep the newest tombstone: it holds the feed's high version once its task is gone
+        db.query(TaskTombstone).filter(
+            TaskTombstone.deleted_at < datetime.utcnow() - tombstone_retention,
+            TaskTombstone.change_version < current
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def current_task_change_version(db: Session) -> int:
+    """Highest task change version committed so far (lower ones may still be committing)"""
+    tasks = db.query(func.max(Task.change_version)).scalar() or 0
+    tombstones = db.query(func.max(TaskTombstone.change_version)).scalar() or 0
+    return max(tasks, tombstones)
+
+
+def _next_task_change_version(db: Session) -> int:
+    if db.get_bind().dialect.supports_sequences:
+        return db.scalar(select(task_change_versions.next_value()))
+    # SQLite has no sequences, but it serializes writers; versions taken by concurrent
+    # transactions may repeat, which the reconciler's settle window absorbs
+    return current_task_change_version(db) + 1
+
+
+def mark_tasks_changed(db: Session, tasks: Iterable[Task]):
+    """Put created or edited tasks on the scheduler change feed (applied with the caller's commit)"""
+    tasks = list(tasks)
+    if tasks:
+        version = _next_task_change_version(db)
+        for task in tasks:
+            task.change_version = version
+
+
+def mark_tasks_deleted(db: Session, task_ids: Iterable[int]):
+    """Leave tombstones for deleted tasks on the scheduler change feed"""
+    task_ids = list(set(task_ids))
+    if task_ids:
+        version = _next_task_change_version(db)
+        db.query(TaskTombstone).filter(TaskTombstone.task_id.in_(task_ids)).delete(synchronize_session=False)
+        db.execute(insert(TaskTombstone), [
+            {"task_id": task_id, "change_version": version, "deleted_at": datetime.utcnow()}
+            for task_id in task_ids
+        ])
@@ -1,26 +1,179 @@
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Optional, Set, Tuple
+import asyncio
 import logging
-import httpx
+import re
+import time
+import orjson
 from datetime import datetime
 
+from config import settings
+from services.scraper import scraper
+
+if TYPE_CHECKING:
+    from services.json_projection import JSONProjector
+
 logger = logging.getLogger(__name__)
 
+PLACEHOLDER_PATTERN = re.compile(r"\{([^{}]+)\}")
+TOTAL_FIELDS = ['total', 'score_total', 'combined_score', 'sum']
+SCORE_FIELDS = ['home_score', 'away_score']
+ODDS_FIELDS = ['odds', 'current_odds', 'line']
+
 
 class ConditionEvaluator:
     """Evaluates task conditions to determine if notifications should be sent"""
     
     def __init__(self):
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        self._http_client = None
+        self.cache_ttl_seconds = settings.fetch_cache_ttl_seconds
+        self.cache_max_entries = settings.fetch_cache_max_entries
+        self.stream_threshold_bytes = settings.fetch_stream_threshold_bytes
+        # Response bodies by URL, shared by every task (and source type) polling it
+        self._cache: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+    
+    @property
+    def http_client(self):
+        """Shared HTTP client, created (and httpx imported) on first use"""
+        if self._http_client is None:
+            import httpx
+            self._http_client = httpx.AsyncClient(timeout=30.0)
+        return self._http_client
+    
+    def warm_up(self):
+        """Create the HTTP client ahead of the first fetch (importing httpx blocks; run off the event loop)"""
+        return self.http_client
     
     async def fetch_data(self, source_link: str) -> Optional[Dict[str, Any]]:
         """Fetch data from external source"""
+        data, _ = await self.fetch_payload(source_link)
+        return data
+    
+    async def fetch_payload(
+        self,
+        source_link: str,
+        source_type: str = "json",
+        scrape_fields: Optional[Dict[str, Dict[str, Any]]] = None,
+        paths: Optional[Iterable[str]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+        """
+        Fetch data from external source along with the number of body bytes read
+        
+        With paths (see referenced_paths), JSON bodies too large to cache are
+        parsed as they stream in, keeping only those fields and stopping the
+        download once all of them have been seen.
+        """
         try:
-            response = await self.http_client.get(source_link)
-            response.raise_for_status()
-            return response.json()
+            if source_type == "html":
+                body, size = await self._fetch_body(source_link)
+                return await scraper.extract(scrape_fields or {}, body, source_link), size
+            
+            projector = None
+            if paths is not None:
+                from services.json_projection import JSONProjector  # ijson is only loaded for projected fetches
+                projector = JSONProjector(paths)
+            body, size = await self._fetch_body(source_link, projector)
+            data = orjson.loads(body) if body is not None else projector.data
+            return data, size
         except Exception as e:
             logger.error(f"Error fetching data from {source_link}: {e}")
-            return None
+            return None, None
+    
+    async def _fetch_body(
+        self,
+        source_link: str,
+        projector: Optional["JSONProjector"] = None
+    ) -> Tuple[Optional[bytes], int]:
+        """
+        GET a URL, reusing a recent response and joining a request already in flight
+        
+        Returns the body and its size, or None and the bytes read when the body
+        was handed to the projector instead of being kept.
+        """
+        entry = self._cache.get(source_link)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1], len(entry[1])
+        
+        in_flight = self._in_flight.get(source_link)
+        if in_flight is not None:
+            body = await asyncio.shield(in_flight)
+            if body is not None:
+                return body, len(body)
+            # The request in flight streamed a large body without keeping it, or was cancelled
+            return await self._request(source_link, projector)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[source_link] = future
+        try:
+            body, size = await self._request(source_link, projector)
+            if body is not None and self.cache_ttl_seconds > 0:
+                self._cache[source_link] = (time.monotonic() + self.cache_ttl_seconds, body)
+                self._cache.move_to_end(source_link)
+                while len(self._cache) > self.cache_max_entries:
+                    self._cache.popitem(last=False)
+            future.set_result(body)
+            return body, size
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Waiters (if any) re-raise it; don't warn when there are none
+            raise
+        finally:
+            if not future.done():
+                # Cancelled mid-request: let waiters make their own request instead of waiting forever
+                future.set_result(None)
+            del self._in_flight[source_link]
+    
+    async def _request(
+        self,
+        source_link: str,
+        projector: Optional["JSONProjector"] = None
+    ) -> Tuple[Optional[bytes], int]:
+        """Read a response, switching to the projector once it outgrows stream_threshold_bytes"""
+        chunks = []
+        size = 0
+        streaming = False
+        async with self.http_client.stream("GET", source_link) as response:
+            response.raise_for_status()
+            length = response.headers.get("content-length")
+            streaming = (
+                projector is not None
+                and length is not None and length.isdigit()
+                and int(length) > self.stream_threshold_bytes
+            )
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if not streaming:
+                    chunks.append(chunk)
+                    if projector is None or size <= self.stream_threshold_bytes:
+                        continue
+                    streaming = True
+                    chunk = b"".join(chunks)
+                    chunks = []
+                projector.feed(chunk)
+                if projector.complete:
+                    break  # Skip the rest of the document
+        
+        if streaming:
+            if not projector.complete:
+                projector.close()
+            return None, size
+        return b"".join(chunks), size
+    
+    def referenced_paths(self, condition_rules: Optional[Dict[str, Any]], template: str) -> Set[str]:
+        """Payload fields (dotted paths) a task's condition and message template read"""
+        paths = set(PLACEHOLDER_PATTERN.findall(template or ""))
+        condition_type = (condition_rules or {}).get("type", "always")
+        
+        if condition_type in ("total_over", "total_under"):
+            paths.update(TOTAL_FIELDS)
+            paths.update(SCORE_FIELDS)
+        elif condition_type.startswith("field_"):
+            if condition_rules.get("field"):
+                paths.add(condition_rules["field"])
+        elif condition_type == "odds_change":
+            paths.update(ODDS_FIELDS)
+        return paths
     
     def evaluate_condition(self, condition_rules: Dict[str, Any], data: Dict[str, Any]) -> bool:
         """
@@ -101,7 +254,7 @@ class ConditionEvaluator:
     def _extract_total(self, data: Dict[str, Any]) -> Optional[float]:
         """Extract total score from data"""
         # Try common field names
-        for field in ['total', 'score_total', 'combined_score', 'sum']:
+        for field in TOTAL_FIELDS:
             if field in data:
                 try:
                     return float(data[field])
@@ -120,7 +273,7 @@ class ConditionEvaluator:
     
     def _extract_odds(self, data: Dict[str, Any]) -> Optional[float]:
         """Extract odds from data"""
-        for field in ['odds', 'current_odds', 'line']:
+        for field in ODDS_FIELDS:
             if field in data:
                 try:
                     return float(data[field])
@@ -164,7 +317,9 @@ class ConditionEvaluator:
     
     async def close(self):
         """Close HTTP client"""
-        await self.http_client.aclose()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
 
 
 # Singleton instance
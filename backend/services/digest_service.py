@@ -0,0 +1,230 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from config import settings
+from database import SessionLocal
+from models import Notification, DeliveryStatus, SMSProvider, Task, User
+from services.sms_service import sms_service
+from services.sms_encoding import segment_info
+from services.event_bus import event_bus
+from services.message_store import message_store
+from services.change_tracker import bump_notifications_version
+from services.fair_dispatcher import send_dispatcher, dispatch_policy, LANES, DEFAULT_LANE
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SEPARATOR = "\n"
+
+# Digest sends each hold a DB connection; task runs already take up to
+# MAX_CONCURRENT_TASK_RUNS of the pool, so keep this small
+DIGEST_SEND_CONCURRENCY = 4
+
+
+@dataclass
+class DigestItem:
+    task_id: int
+    message: str
+
+
+@dataclass
+class Digest:
+    """Messages waiting for one recipient of one user"""
+    user_id: int
+    recipient: str
+    deadline: float
+    items: List[DigestItem] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+def pack_messages(messages: List[str]) -> List[List[str]]:
+    """
+    Group messages into as few SMS as possible
+
+    A message joins an existing bundle only if the merged text costs no more
+    segments than sending both separately (so one UCS-2 message doesn't drag
+    a GSM-7 bundle down to 70-character parts). Identical texts are sent once.
+    """
+    bundles: List[Tuple[List[str], int]] = []
+    for message in dict.fromkeys(messages):
+        cost = segment_info(message).segments
+        for index, (bundle, bundle_cost) in enumerate(bundles):
+            merged = segment_info(DIGEST_SEPARATOR.join(bundle + [message])).segments
+            if merged <= bundle_cost + cost:
+                bundles[index] = (bundle + [message], merged)
+                break
+        else:
+            bundles.append(([message], cost))
+    return [bundle for bundle, _ in bundles]
+
+
+class DigestService:
+    """Merges messages to the same recipient that arrive within a task's digest window"""
+
+    def __init__(self):
+        self.max_messages = settings.digest_max_messages
+        self._digests: Dict[Tuple[int, str], Digest] = {}
+        self._send_slots: Optional[asyncio.Semaphore] = None
+        # Flushes started by window timers; the loop only keeps weak references to tasks
+        self._flushes: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        return sum(len(digest.items) for digest in list(self._digests.values()))
+
+    def add(self, user_id: int, task_id: int, recipient: str, message: str, window_seconds: float):
+        """Queue a message (call from the event loop); it is sent when the earliest window closes"""
+        loop = asyncio.get_running_loop()
+        key = (user_id, recipient)
+        deadline = loop.time() + window_seconds
+
+        digest = self._digests.get(key)
+        if digest is None:
+            digest = self._digests[key] = Digest(user_id, recipient, deadline)
+        digest.items.append(DigestItem(task_id, message))
+
+        if len(digest.items) >= self.max_messages:
+            self._schedule(key, loop.time())
+        elif digest.timer is None or deadline < digest.deadline:
+            self._schedule(key, min(deadline, digest.deadline))
+
+    def _schedule(self, key: Tuple[int, str], when: float):
+        loop = asyncio.get_running_loop()
+        digest = self._digests[key]
+        if digest.timer is not None:
+            digest.timer.cancel()
+        digest.deadline = when
+        digest.timer = loop.call_at(when, self._start_flush, key)
+
+    def _start_flush(self, key: Tuple[int, str]):
+        flush = asyncio.get_running_loop().create_task(self.flush(key))
+        self._flushes.add(flush)
+        flush.add_done_callback(self._flush_done)
+
+    def _flush_done(self, flush: asyncio.Task):
+        self._flushes.discard(flush)
+        if not flush.cancelled() and flush.exception() is not None:
+            logger.error(f"Digest flush failed: {flush.exception()!r}")
+
+    async def flush(self, key: Tuple[int, str]):
+        """Send one recipient's pending digest"""
+        digest = self._digests.pop(key, None)
+        if digest is None:
+            return
+        if digest.timer is not None:
+            digest.timer.cancel()
+
+        if self._send_slots is None:
+            self._send_slots = asyncio.Semaphore(DIGEST_SEND_CONCURRENCY)
+        async with self._send_slots:
+            try:
+                await self._send(digest)
+            except Exception as e:
+                logger.error(f"Error sending digest to {digest.recipient}: {e}", exc_info=True)
+
+    async def flush_all(self):
+        """Send everything pending and wait for sends already under way (used on shutdown)"""
+        await asyncio.gather(
+            *(self.flush(key) for key in list(self._digests)),
+            *list(self._flushes),
+            return_exceptions=True
+        )
+
+    async def _send(self, digest: Digest):
+        provider = SMSProvider(settings.sms_default_provider)
+        loop = asyncio.get_running_loop()
+        db = SessionLocal()
+        try:
+            # Tasks deleted while the digest was pending have nothing to attach to
+            task_ids = {item.task_id for item in digest.items}
+            priorities = dict(db.query(Task.id, Task.priority).filter(Task.id.in_(task_ids)))
+            items = [item for item in digest.items if item.task_id in priorities]
+            if not items:
+                return
+            # The digest goes out in the most urgent lane of the tasks in it
+            lane = min((priorities[item.task_id] for item in items), key=LANES.index, default=DEFAULT_LANE)
+            weight, cap = dispatch_policy(
+                db.query(User.dispatch_weight, User.max_concurrent_sends).filter(User.id == digest.user_id).first()
+            )
+
+            # Record a pending row per task message before anything is sent, so a crash or a
+            # failed commit mid-digest can't leave sent messages without a record.
+            # Receipts match all of a bundle's rows by message id, and its billed segments are counted once
+            sends = []
+            notifications = []
+            for bundle in pack_messages([item.message for item in items]):
+                text = DIGEST_SEPARATOR.join(bundle)
+                segments = segment_info(text)
+                bundle_notifications = []
+                for item in items:
+                    if item.message not in bundle:
+                        continue
+                    notification = Notification(
+                        task_id=item.task_id,
+                        recipient=digest.recipient,
+                        body_id=message_store.body_id(db, item.message),
+                        provider=provider,
+                        status=DeliveryStatus.PENDING,
+                        segments=0 if bundle_notifications else segments.segments,
+                        priority=priorities[item.task_id]
+                    )
+                    bundle_notifications.append(notification)
+                    notifications.append((notification, item.message))
+                sends.append((text, segments, bundle_notifications))
+            db.add_all([notification for notification, _ in notifications])
+            db.flush()
+            # Detached before the commit so reading them afterwards doesn't reload each row
+            for notification, message in notifications:
+                set_committed_value(notification, "message", message)
+                db.expunge(notification)
+            db.commit()
+
+            for text, segments, bundle_notifications in sends:
+                try:
+                    async with send_dispatcher.slot(digest.user_id, None, segments.segments, weight, cap, lane):
+                        result = await loop.run_in_executor(
+                            None, sms_service.send_sms, digest.recipient, text, provider.value, segments
+                        )
+                    error = None
+                except Exception as e:
+                    result = None
+                    error = str(e)
+
+                for notification in bundle_notifications:
+                    if result is None:
+                        notification.status = DeliveryStatus.QUEUED  # Queue for retry
+                        notification.error_message = error
+                    elif result['success']:
+                        notification.status = DeliveryStatus.SENT
+                        notification.sent_at = datetime.utcnow()
+                        notification.provider_message_id = result.get('message_id')
+                    else:
+                        notification.status = DeliveryStatus.FAILED
+                        notification.error_message = result.get('error', 'Unknown error')
+
+            db.execute(update(Notification), [
+                {
+                    "id": notification.id,
+                    "status": notification.status,
+                    "sent_at": notification.sent_at,
+                    "provider_message_id": notification.provider_message_id,
+                    "error_message": notification.error_message
+                }
+                for notification, _ in notifications
+            ])
+            bump_notifications_version(db, [digest.user_id])
+            db.commit()
+            for notification, _ in notifications:
+                event_bus.publish_notification(digest.user_id, notification)
+            logger.info(f"Digest to {digest.recipient}: {len(items)} messages sent as {len(sends)} SMS")
+        finally:
+            db.close()
+
+
+# Singleton instance
+digest_service = DigestService()
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from config import settings
+from models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """A single client's queue of pending events, coalesced by event key"""
+
+    def __init__(self, user_id: int, max_pending: int):
+        self.user_id = user_id
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending: Dict[tuple, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, event: Dict[str, Any]):
+        """Queue an event, replacing any pending event for the same object"""
+        key = (event["type"], event.get("id"))
+        # Re-insert so the latest update moves to the end of the batch
+        self._pending.pop(key, None)
+        self._pending[key] = event
+
+        if len(self._pending) > self.max_pending:
+            # Slow consumer: drop the oldest pending update
+            self._pending.pop(next(iter(self._pending)))
+            self.dropped += 1
+
+        self._ready.set()
+
+    async def next_batch(self, window: float, timeout: float) -> List[Dict[str, Any]]:
+        """Wait for events, then collect everything that arrives within the window"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+
+        # Let further updates for the same objects coalesce before flushing
+        if window > 0:
+            await asyncio.sleep(window)
+
+        batch = list(self._pending.values())
+        self._pending = {}
+        self._ready.clear()
+        return batch
+
+
+class EventBus:
+    """In-process fan-out of task-run and notification status events per user"""
+
+    def __init__(self):
+        self.window = settings.event_coalesce_seconds
+        self.max_pending = settings.event_max_pending
+        self.subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Register a new subscriber for a user's events"""
+        subscription = Subscription(user_id, self.max_pending)
+        self.subscribers[user_id].add(subscription)
+        logger.info(f"Event subscriber added for user {user_id}")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber"""
+        subscribers = self.subscribers.get(subscription.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscribers[subscription.user_id]
+        logger.info(f"Event subscriber removed for user {subscription.user_id}")
+
+    def has_subscribers(self, user_id: int) -> bool:
+        """Check whether anyone is listening for a user's events"""
+        return user_id in self.subscribers
+
+    def publish(self, user_id: int, event: Dict[str, Any]):
+        """Deliver an event to all of a user's subscribers (call from the event loop)"""
+        subscribers = self.subscribers.get(user_id)
+        if not subscribers:
+            return
+        for subscription in subscribers:
+            subscription.push(event)
+
+    def publish_notification(self, user_id: int, notification: Notification):
+        """Publish a notification status change"""
+        if not self.has_subscribers(user_id):
+            return
+        self.publish(user_id, {
+            "type": "notification",
+            "id": notification.id,
+            "task_id": notification.task_id,
+            "recipient": notification.recipient,
+            "message": notification.message,
+            "provider": notification.provider.value if notification.provider else None,
+            "status": notification.status.value if notification.status else None,
+            "provider_message_id": notification.provider_message_id,
+            "sent_at": _isoformat(notification.sent_at),
+            "delivered_at": _isoformat(notification.delivered_at),
+            "error_message": notification.error_message,
+            "retry_count": notification.retry_count or 0,
+            "created_at": _isoformat(notification.created_at),
+        })
+
+    def publish_task_run(
+        self,
+        user_id: int,
+        task_id: int,
+        status: str,
+        last_run: Optional[datetime] = None,
+        sent: int = 0
+    ):
+        """Publish a task execution status change"""
+        if not self.has_subscribers(user_id):
+            return
+        self.publish(user_id, {
+            "type": "task_run",
+            "id": task_id,
+            "status": status,
+            "last_run": _isoformat(last_run),
+            "sent": sent,
+        })
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+# Singleton instance
+event_bus = EventBus()
@@ -0,0 +1,301 @@
+"""
+Weighted fair dispatch across users, in priority lanes
+
+Sends (and task runs) used to go out in arrival order, so one user's
+100k-recipient task could hold up everyone else's alerts for minutes. A
+FairDispatcher hands out a fixed number of slots by deficit round-robin:
+each backlogged user gets weight x quantum credit per round and spends it
+on the cost of what it dispatches (billed segments for sends), and a user's
+tasks take turns within its share. Per-user concurrency caps bound how many
+slots one user holds at a time. When nothing is queued, a slot is granted
+immediately.
+
+Requests come in priority lanes (a task's priority). A free slot always
+goes to the most urgent lane with a request that can take it, and some
+slots are reserved for the urgent lane so bulk work never holds them all.
+Sends acquire a slot per message, so a bulk broadcast yields to an urgent
+alert at its next message.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+from config import settings
+from metrics import DISPATCH_QUEUE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Most urgent first
+LANES = ("urgent", "normal", "bulk")
+DEFAULT_LANE = "normal"
+
+
+def dispatch_policy(user) -> Tuple[float, int]:
+    """A user's (weight, concurrent send cap), falling back to the server defaults"""
+    weight = getattr(user, "dispatch_weight", None)
+    cap = getattr(user, "max_concurrent_sends", None)
+    return (
+        settings.dispatch_default_weight if weight is None else weight,
+        settings.dispatch_user_max_sends if cap is None else cap
+    )
+
+
+class _Waiter:
+    __slots__ = ("future", "cost", "queued_at")
+
+    def __init__(self, future: asyncio.Future, cost: float):
+        self.future = future
+        self.cost = cost
+        self.queued_at = time.perf_counter()
+
+
+class _User:
+    """A user's policy and slots held, across lanes"""
+    __slots__ = ("weight", "cap", "in_flight")
+
+    def __init__(self, weight: float, cap: int):
+        self.weight = weight
+        self.cap = cap
+        self.in_flight = 0
+
+    def has_room(self) -> bool:
+        return not self.cap or self.in_flight < self.cap
+
+
+class _Flow:
+    """One user's queue in one lane: its credit and queued requests per task"""
+    __slots__ = ("deficit", "tasks")
+
+    def __init__(self):
+        self.deficit = 0.0
+        self.tasks: "OrderedDict[Optional[int], Deque[_Waiter]]" = OrderedDict()
+
+    def head(self) -> Optional[_Waiter]:
+        """Next request in task round-robin order, dropping ones whose caller gave up"""
+        while self.tasks:
+            task_id, waiters = next(iter(self.tasks.items()))
+            while waiters and waiters[0].future.done():
+                waiters.popleft()
+            if waiters:
+                return waiters[0]
+            del self.tasks[task_id]
+        return None
+
+    def pop(self) -> _Waiter:
+        task_id, waiters = next(iter(self.tasks.items()))
+        waiter = waiters.popleft()
+        if waiters:
+            self.tasks.move_to_end(task_id)  # The user's other tasks go next
+        else:
+            del self.tasks[task_id]
+        return waiter
+
+
+class _Lane:
+    """Deficit round-robin state of one priority lane"""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit  # Slots the non-urgent lanes may hold together (the urgent lane: all)
+        self.in_use = 0
+        self.flows: Dict[Optional[int], _Flow] = {}
+        self.ring: Deque[Optional[int]] = deque()  # Users with queued requests, in turn order
+        self.turn_open = False  # Whether the user at the head has had this round's credit
+
+    def next_turn(self):
+        self.ring.rotate(-1)
+        self.turn_open = False
+
+    def leave_ring(self, user_id: Optional[int]):
+        """Drop the user at the head, whose queue is empty; a user doesn't bank credit while idle"""
+        self.ring.popleft()
+        del self.flows[user_id]
+        self.turn_open = False
+
+
+class FairDispatcher:
+    """Deficit round-robin over users (weighted, optionally capped) for a fixed number of slots, by lane"""
+
+    def __init__(self, name: str, capacity: int, user_cap: int = 0, urgent_reserved: int = 0):
+        self.name = name
+        self.capacity = capacity
+        self.user_cap = user_cap
+        self.quantum = settings.dispatch_quantum
+        self.in_use = 0
+        self._users: Dict[Optional[int], _User] = {}
+        # Every lane but the first leaves the reserved slots free
+        reserved = min(urgent_reserved, capacity - 1)
+        self._lanes = [_Lane(lane, capacity if index == 0 else capacity - reserved) for index, lane in enumerate(LANES)]
+        self._lane_index = {lane: index for index, lane in enumerate(LANES)}
+        self._queue_seconds = [DISPATCH_QUEUE_SECONDS.labels(name, lane) for lane in LANES]
+        self._max_wait: Dict[Optional[int], float] = {}  # Longest wait per user since take_max_waits
+
+    @property
+    def waiting(self) -> int:
+        return sum(self.waiting_in(lane) for lane in LANES)
+
+    def waiting_in(self, lane: str) -> int:
+        state = self._lanes[self._lane_index[lane]]
+        return sum(len(waiters) for flow in list(state.flows.values()) for waiters in list(flow.tasks.values()))
+
+    def waiting_by_user(self) -> Dict[Optional[int], int]:
+        """Queued requests per user, across lanes"""
+        waiting: Dict[Optional[int], int] = {}
+        for state in self._lanes:
+            for user_id, flow in list(state.flows.items()):
+                waiting[user_id] = waiting.get(user_id, 0) + sum(len(waiters) for waiters in list(flow.tasks.values()))
+        return waiting
+
+    def take_max_waits(self) -> Dict[Optional[int], float]:
+        """Longest wait per user since the last call; requests still queued count their wait so far"""
+        waits, self._max_wait = self._max_wait, {}
+        now = time.perf_counter()
+        # Scrapes may run off the event loop: copy the containers it may be changing
+        for state in self._lanes:
+            for user_id, flow in list(state.flows.items()):
+                for waiters in list(flow.tasks.values()):
+                    oldest = next((waiter for waiter in list(waiters) if not waiter.future.done()), None)
+                    if oldest is not None:
+                        waits[user_id] = max(waits.get(user_id, 0.0), now - oldest.queued_at)
+        return waits
+
+    def _user(self, user_id: Optional[int], weight: Optional[float], cap: Optional[int]) -> _User:
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _User(settings.dispatch_default_weight, self.user_cap)
+        # Callers that know the user's policy pass it; others reuse the last one seen
+        if weight is not None:
+            user.weight = max(weight, 0.01)
+        if cap is not None:
+            user.cap = cap
+        return user
+
+    def _forget_if_idle(self, user_id: Optional[int]):
+        if not self._users[user_id].in_flight and not any(user_id in lane.flows for lane in self._lanes):
+            del self._users[user_id]
+
+    def _lane_has_room(self, index: int) -> bool:
+        """Whether a request in this lane may take a free slot, given the urgent reservation"""
+        held = self.in_use if index == 0 else self.in_use - self._lanes[0].in_use
+        return self.in_use < self.capacity and held < self._lanes[index].limit
+
+    async def acquire(
+        self,
+        user_id: Optional[int],
+        task_id: Optional[int] = None,
+        cost: float = 1,
+        weight: Optional[float] = None,
+        cap: Optional[int] = None,
+        lane: str = DEFAULT_LANE
+    ):
+        """Wait for a slot; pair with release(user_id, lane)"""
+        index = self._lane_index.get(lane, self._lane_index[DEFAULT_LANE])
+        state = self._lanes[index]
+        user = self._user(user_id, weight, cap)
+        if (
+            not any(other.ring for other in self._lanes[:index + 1])
+            and self._lane_has_room(index)
+            and user.has_room()
+        ):
+            self._grant(user, state)
+            self._queue_seconds[index].observe(0.0)
+            return
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), cost)
+        flow = state.flows.get(user_id)
+        if flow is None:
+            flow = state.flows[user_id] = _Flow()
+            state.ring.append(user_id)
+        flow.tasks.setdefault(task_id, deque()).append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(user_id, state.name)  # Granted just as the caller gave up
+            raise
+        waited = time.perf_counter() - waiter.queued_at
+        self._queue_seconds[index].observe(waited)
+        if waited > self._max_wait.get(user_id, 0.0):
+            self._max_wait[user_id] = waited
+
+    def release(self, user_id: Optional[int], lane: str = DEFAULT_LANE):
+        state = self._lanes[self._lane_index.get(lane, self._lane_index[DEFAULT_LANE])]
+        self._users[user_id].in_flight -= 1
+        state.in_use -= 1
+        self.in_use -= 1
+        self._forget_if_idle(user_id)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id: Optional[int],
+        task_id: Optional[int] = None,
+        cost: float = 1,
+        weight: Optional[float] = None,
+        cap: Optional[int] = None,
+        lane: str = DEFAULT_LANE
+    ):
+        await self.acquire(user_id, task_id, cost, weight, cap, lane)
+        try:
+            yield
+        finally:
+            self.release(user_id, lane)
+
+    def _grant(self, user: _User, state: _Lane):
+        user.in_flight += 1
+        state.in_use += 1
+        self.in_use += 1
+
+    def _dispatch(self):
+        """Hand free slots to queued requests: lanes in priority order, users in deficit round-robin order"""
+        for index, state in enumerate(self._lanes):
+            self._dispatch_lane(index, state)
+            if self.in_use >= self.capacity:
+                return
+
+    def _dispatch_lane(self, index: int, state: _Lane):
+        blocked = 0  # Consecutive users skipped because they are at their cap
+        while state.ring and blocked < len(state.ring) and self._lane_has_room(index):
+            user_id = state.ring[0]
+            flow = state.flows[user_id]
+            waiter = flow.head()
+            if waiter is None:
+                state.leave_ring(user_id)
+                self._forget_if_idle(user_id)
+                continue
+
+            user = self._users[user_id]
+            if not user.has_room():
+                state.next_turn()
+                blocked += 1
+                continue
+
+            if not state.turn_open:
+                flow.deficit += user.weight * self.quantum
+                state.turn_open = True
+            if flow.deficit < waiter.cost:
+                state.next_turn()
+                continue
+
+            flow.deficit -= waiter.cost
+            flow.pop()
+            self._grant(user, state)
+            waiter.future.set_result(None)
+            blocked = 0
+            if not flow.tasks:
+                state.leave_ring(user_id)
+
+
+# Singleton instances. A run holds a DB session across awaits; keep concurrent runs below the
+# connection pool size so a blocking pool checkout can't stall the event loop
+run_dispatcher = FairDispatcher(
+    "runs", settings.max_concurrent_task_runs, settings.dispatch_user_max_runs, settings.dispatch_urgent_reserved_runs
+)
+send_dispatcher = FairDispatcher(
+    "sends", settings.max_concurrent_sends, settings.dispatch_user_max_sends, settings.dispatch_urgent_reserved_sends
+)
@@ -0,0 +1,191 @@
+"""
+Upcoming fire times across many tasks
+
+Cron schedules are shared by many tasks ("0 9 * * *"), so each distinct
+expression gets one FireSeries: its fire times, computed in chunks on
+demand and kept (LRU) for later requests. Interval schedules are plain
+arithmetic from the job's next run. Tasks with the same schedule are merged
+as one stream, so a calendar over thousands of tasks costs a heap of
+distinct schedules rather than an iterator per task.
+"""
+import heapq
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from apscheduler.triggers.interval import IntervalTrigger
+
+from config import settings
+from services.adaptive_polling import adaptive_poller
+from services.scheduler_service import task_scheduler
+
+# A series is extended in chunks that start small (most views need a few fires) and double
+SERIES_FIRST_CHUNK = 8
+SERIES_MAX_CHUNK = 512
+# Drop a cached series once its start is this far in the past and recompute from now
+SERIES_MAX_AGE = timedelta(days=1)
+
+
+class FireSeries:
+    """Fire times of one cron trigger from an origin, extended on demand"""
+
+    def __init__(self, trigger, origin: datetime):
+        self.trigger = trigger
+        self.origin = origin
+        self.times: List[datetime] = []
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    def _extend(self):
+        # Caller holds the lock; times is replaced, never mutated, so readers can keep iterating
+        times = list(self.times)
+        previous = times[-1] if times else None
+        now = previous + timedelta(microseconds=1) if previous else self.origin
+        chunk = min(max(SERIES_FIRST_CHUNK, len(times)), SERIES_MAX_CHUNK)
+        for _ in range(chunk):
+            fire = self.trigger.get_next_fire_time(previous, now)
+            if fire is None:
+                self.exhausted = True
+                break
+            times.append(fire)
+            previous, now = fire, fire + timedelta(microseconds=1)
+        self.times = times
+
+    def iter_from(self, start: datetime) -> Iterator[datetime]:
+        """Fire times at or after start (start must not precede the origin)"""
+        times = self.times
+        index = bisect_left(times, start)
+        while True:
+            # Extend until the series reaches start (it may lie several chunks past the origin)
+            while index >= len(times):
+                with self._lock:
+                    if index >= len(self.times) and not self.exhausted:
+                        self._extend()
+                    times = self.times
+                if index >= len(times) and self.exhausted:
+                    return
+                index = bisect_left(times, start, index)
+            yield times[index]
+            index += 1
+
+
+class FireCalendar:
+    """Caches fire series per cron expression and merges task schedules into one timeline"""
+
+    def __init__(self):
+        self.max_series = settings.calendar_cache_max_schedules
+        self._series: "OrderedDict[str, FireSeries]" = OrderedDict()
+        self._triggers: "OrderedDict[tuple, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _trigger(self, cron: Optional[str], human: Optional[str]):
+        """Parsed trigger for a schedule, shared by every task that uses it"""
+        key = (cron, human)
+        with self._lock:
+            if key in self._triggers:
+                self._triggers.move_to_end(key)
+                return self._triggers[key]
+        trigger = task_scheduler._parse_schedule(cron, human)
+        with self._lock:
+            self._triggers[key] = trigger
+            while len(self._triggers) > self.max_series:
+                self._triggers.popitem(last=False)
+        return trigger
+
+    def _cron_series(self, key: str, trigger, start: datetime) -> FireSeries:
+        now = datetime.now(timezone.utc)
+        if start < now - timedelta(minutes=1):
+            return FireSeries(trigger, start)  # Looking back: not worth caching
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None or start < series.origin or now - series.origin > SERIES_MAX_AGE:
+                series = FireSeries(trigger, min(start, now))
+                self._series[key] = series
+            self._series.move_to_end(key)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+            return series
+
+    @staticmethod
+    def _interval_times(interval: timedelta, anchor: datetime, start: datetime) -> Iterator[datetime]:
+        if anchor < start:
+            anchor += interval * -((anchor - start) // interval)
+        while True:
+            yield anchor
+            anchor += interval
+
+    @staticmethod
+    def _phase(task_id: int, next_run: Optional[datetime], start: datetime, interval: timedelta) -> datetime:
+        """Where an interval task's fires fall: its live job, else its stored next run"""
+        job_id = f"task_{task_id}"
+        job = task_scheduler.scheduler.get_job(job_id) if job_id in task_scheduler.running_jobs else None
+        anchor = getattr(job, "next_run_time", None) or next_run
+        if anchor is None:
+            return start + interval  # Not loaded yet: fires one interval after scheduling
+        if anchor.tzinfo is None:
+            anchor = anchor.replace(tzinfo=timezone.utc)
+        return anchor
+
+    def timeline(
+        self,
+        tasks: Iterable[Tuple],
+        start: datetime,
+        end: Optional[datetime] = None,
+        limit: int = 100
+    ) -> List[Tuple[datetime, int]]:
+        """
+        Fire times of tasks in [start, end), in order, as (fire_time, task_id) pairs
+
+        tasks are (id, schedule_cron, schedule_human, poll_min_seconds,
+        poll_max_seconds, next_run) rows; at most limit fires are returned.
+        """
+        groups: Dict[tuple, List[int]] = {}
+        streams = {}
+        for task_id, cron, human, poll_min, poll_max, next_run in tasks:
+            if poll_min and poll_max:
+                interval = timedelta(seconds=adaptive_poller.interval(task_id, poll_min, poll_max))
+                trigger = None
+            else:
+                trigger = self._trigger(cron, human)
+                if trigger is None:
+                    continue  # Push only, or unparseable
+                interval = trigger.interval if isinstance(trigger, IntervalTrigger) else None
+
+            if interval is not None:
+                key = ("interval", interval, self._phase(task_id, next_run, start, interval))
+                if key not in streams:
+                    streams[key] = self._interval_times(interval, key[2], start)
+            else:
+                key = ("cron", cron)
+                if key not in streams:
+                    streams[key] = self._cron_series(cron, trigger, start).iter_from(start)
+            groups.setdefault(key, []).append(task_id)
+
+        heap = []
+        for order, (key, stream) in enumerate(streams.items()):
+            fire = next(stream, None)
+            if fire is not None:
+                heap.append((fire, order, key))
+        heapq.heapify(heap)
+
+        results = []
+        while heap and len(results) < limit:
+            fire, order, key = heap[0]
+            if end is not None and fire >= end:
+                break
+            for task_id in groups[key]:
+                results.append((fire, task_id))
+            following = next(streams[key], None)
+            if following is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (following, order, key))
+
+        return results[:limit]
+
+
+# Singleton instance
+fire_calendar = FireCalendar()
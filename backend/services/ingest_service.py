@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import logging
+import secrets
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set, Tuple
+
+from config import settings
+from metrics import INGEST_PAYLOADS
+from services.scheduler_service import task_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def new_ingest_token() -> Tuple[str, str]:
+    """Generate a task's push token; returns (token, hash to store)"""
+    token = secrets.token_urlsafe(32)
+    return token, hash_ingest_token(token)
+
+
+def hash_ingest_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PendingPayload:
+    """Pushed data waiting for a task's burst to settle"""
+    first_at: float
+    data: Dict[str, Any] = field(default_factory=dict)
+    size: int = 0
+    count: int = 0
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class IngestService:
+    """Debounces payloads pushed to tasks and runs each task once per burst"""
+
+    def __init__(self):
+        self.debounce_seconds = settings.ingest_debounce_seconds
+        self.max_delay_seconds = settings.ingest_max_delay_seconds
+        self.max_pending = settings.ingest_max_pending
+        self._pending: Dict[int, PendingPayload] = {}
+        self._flushes: Set[asyncio.Task] = set()  # Runs started by timers, referenced until done
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def is_full(self, task_id: int) -> bool:
+        """Check whether a payload for this task would exceed the pending limit (joining a burst never does)"""
+        return task_id not in self._pending and len(self._pending) >= self.max_pending
+
+    def submit(self, task_id: int, payload: Dict[str, Any], size: int) -> bool:
+        """
+        Queue a payload (call from the event loop); returns whether it joined a pending burst
+
+        Payloads pushed within debounce_seconds of each other are merged (later
+        top-level keys win) and the task runs once, debounce_seconds after the
+        last one, or max_delay_seconds after the first if pushes keep coming.
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        pending = self._pending.get(task_id)
+        coalesced = pending is not None
+        if pending is None:
+            pending = self._pending[task_id] = PendingPayload(first_at=now)
+        pending.data.update(payload)
+        pending.size += size
+        pending.count += 1
+        INGEST_PAYLOADS.labels("coalesced" if coalesced else "accepted").inc()
+
+        if pending.timer is not None:
+            pending.timer.cancel()
+        run_at = min(now + self.debounce_seconds, pending.first_at + self.max_delay_seconds)
+        pending.timer = loop.call_at(run_at, self._start_flush, task_id)
+        return coalesced
+
+    def _start_flush(self, task_id: int):
+        flush = asyncio.get_running_loop().create_task(self.flush(task_id))
+        self._flushes.add(flush)
+        flush.add_done_callback(self._flush_done)
+
+    def _flush_done(self, flush: asyncio.Task):
+        self._flushes.discard(flush)
+        if not flush.cancelled() and flush.exception() is not None:
+            logger.error(f"Ingest run failed: {flush.exception()!r}")
+
+    async def flush(self, task_id: int):
+        """Run a task on its pending payload"""
+        pending = self._pending.pop(task_id, None)
+        if pending is None:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+
+        if pending.count > 1:
+            logger.info(f"Task {task_id}: {pending.count} pushed payloads coalesced into one run")
+        await task_scheduler.run_with_payload(task_id, pending.data, pending.size)
+
+    async def flush_all(self):
+        """Run everything pending and wait for runs already under way (used on shutdown)"""
+        await asyncio.gather(
+            *(self.flush(task_id) for task_id in list(self._pending)),
+            *list(self._flushes),
+            return_exceptions=True
+        )
+
+
+# Singleton instance
+ingest_service = IngestService()
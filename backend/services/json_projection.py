@@ -0,0 +1,93 @@
+"""
+Field-projected JSON parsing
+
+Tasks usually read a handful of fields out of a source payload. A
+JSONProjector is fed the document in chunks (yajl's C tokenizer through
+ijson) and only builds Python objects for the requested dotted paths, so
+memory scales with the fields used rather than the payload, and a stream
+can be abandoned as soon as every field has been seen.
+"""
+from typing import Any, Dict, Iterable, Set
+
+import ijson
+from ijson.common import ObjectBuilder
+
+CONTAINER_START = ("start_map", "start_array")
+CONTAINER_END = ("end_map", "end_array")
+
+
+def minimal_paths(paths: Iterable[str]) -> Set[str]:
+    """Drop paths nested under another requested path (the parent already holds them)"""
+    paths = {path for path in paths if path}
+    return {
+        path for path in paths
+        if not any(path.startswith(other + ".") for other in paths if other != path)
+    }
+
+
+class JSONProjector:
+    """Incrementally builds the requested paths of one JSON document"""
+
+    def __init__(self, paths: Iterable[str]):
+        self.wanted = minimal_paths(paths)
+        self.data: Dict[str, Any] = {}
+        self._pending: Set[str] = set(self.wanted)
+        self._events = ijson.sendable_list()
+        self._parser = ijson.parse_coro(self._events, use_float=True)
+        self._builder = None
+        self._builder_path = None
+        self._depth = 0
+
+    @property
+    def complete(self) -> bool:
+        """Whether every requested path has been read (the rest of the document can be skipped)"""
+        return not self._pending
+
+    def feed(self, chunk: bytes):
+        self._parser.send(chunk)
+        self._process()
+
+    def close(self) -> Dict[str, Any]:
+        """Finish a fully fed document (raises on truncated or invalid JSON) and return the data"""
+        self._parser.close()
+        self._process()
+        return self.data
+
+    def _store(self, path: str, value: Any):
+        self._pending.discard(path)
+        *parents, key = path.split(".")
+        target = self.data
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[key] = value
+
+    def _process(self):
+        # Runs once per token, so the common case (a prefix nobody asked for) is one set lookup
+        pending = self._pending
+        for prefix, event, value in self._events:
+            if self._builder is not None:
+                # Inside a requested object or array: build all of it
+                self._builder.event(event, value)
+                if event in CONTAINER_START:
+                    self._depth += 1
+                elif event in CONTAINER_END:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._store(self._builder_path, self._builder.value)
+                        self._builder = None
+            elif prefix in pending and event != "map_key":
+                if event in CONTAINER_START:
+                    self._builder = ObjectBuilder()
+                    self._builder.event(event, value)
+                    self._builder_path = prefix
+                    self._depth = 1
+                else:
+                    self._store(prefix, value)
+        del self._events[:]
+
+
+def project(body: bytes, paths: Iterable[str]) -> Dict[str, Any]:
+    """Parse only the requested paths of a complete document"""
+    projector = JSONProjector(paths)
+    projector.feed(body)
+    return projector.close()
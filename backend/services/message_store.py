@@ -0,0 +1,110 @@
+"""
+Content-addressed storage of rendered message bodies
+
+A broadcast renders the same text for every recipient, and a recurring
+alert renders the same text run after run, so notification rows reference
+a message_bodies row by id instead of each carrying its own copy. Bodies
+are keyed by the SHA-256 of their text and written in the same transaction
+as the notifications that use them; the ids of recently used bodies are
+kept in memory so a broadcast looks its body up once.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import MessageBody
+
+logger = logging.getLogger(__name__)
+
+# Session.info key of the bodies looked up or added in the session's current transaction
+PENDING_BODIES = "message_bodies"
+
+
+def body_hash(text: str) -> str:
+    """Key of a message body: SHA-256 of its UTF-8 text, hex encoded"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _insert(db: Session):
+    """INSERT with ON CONFLICT support for the session's database"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(MessageBody)
+
+
+class MessageStore:
+    """Stores each distinct rendered message body once"""
+
+    def __init__(self):
+        self.max_cached = settings.message_body_cache_size
+        self._ids: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, key: str) -> Optional[int]:
+        with self._lock:
+            body_id = self._ids.get(key)
+            if body_id is not None:
+                self._ids.move_to_end(key)
+            return body_id
+
+    def _remember(self, key: str, body_id: int):
+        if self.max_cached <= 0:
+            return
+        with self._lock:
+            self._ids[key] = body_id
+            self._ids.move_to_end(key)
+            while len(self._ids) > self.max_cached:
+                self._ids.popitem(last=False)
+
+    def body_id(self, db: Session, text: str) -> int:
+        """
+        Id of the stored body with this text, adding it in the caller's transaction if new
+
+        The insert skips a body another writer stored first rather than
+        failing the caller's transaction. Ids are cached once the caller commits.
+        """
+        key = body_hash(text)
+        body_id = self._cached(key)
+        if body_id is not None:
+            return body_id
+
+        body_id = db.query(MessageBody.id).filter(MessageBody.hash == key).scalar()
+        if body_id is None:
+            db.execute(_insert(db).values(hash=key, text=text).on_conflict_do_nothing(index_elements=["hash"]))
+            body_id = db.query(MessageBody.id).filter(MessageBody.hash == key).scalar()
+
+        db.info.setdefault(PENDING_BODIES, {})[key] = body_id
+        return body_id
+
+    def _committed(self, session: Session):
+        for key, body_id in session.info.pop(PENDING_BODIES, {}).items():
+            self._remember(key, body_id)
+
+    def forget(self):
+        """Drop cached ids (after bodies were deleted from the database)"""
+        with self._lock:
+            self._ids.clear()
+
+
+# Singleton instance
+message_store = MessageStore()
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_bodies(session: Session):
+    message_store._committed(session)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_uncommitted_bodies(session: Session, transaction):
+    # A rolled back (or abandoned) transaction's new bodies may not exist; don't cache their ids
+    if transaction.parent is None:
+        session.info.pop(PENDING_BODIES, None)
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def hash_password(password: str, rounds: int) -> str:
+    """Hash a password with the given bcrypt work factor"""
+    # Truncate to 72 bytes for bcrypt compatibility
+    password_bytes = password.encode('utf-8')[:72]
+    salt = bcrypt.gensalt(rounds=rounds)
+    return bcrypt.hashpw(password_bytes, salt).decode('utf-8')
+
+
+def check_password(password: str, hashed_password: str) -> bool:
+    """Verify a password against its bcrypt hash"""
+    # Truncate to 72 bytes for bcrypt compatibility
+    password_bytes = password.encode('utf-8')[:72]
+    try:
+        return bcrypt.checkpw(password_bytes, hashed_password.encode('utf-8'))
+    except ValueError:
+        # Malformed hash stored in the database
+        return False
+
+
+def get_hash_rounds(hashed_password: str) -> Optional[int]:
+    """Extract the work factor from a bcrypt hash (e.g. '$2b$12$...')"""
+    parts = hashed_password.split('$')
+    if len(parts) < 4:
+        return None
+    try:
+        return int(parts[2])
+    except ValueError:
+        return None
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated, bounded process pool so hashing does not
+    tie up the request threadpool"""
+
+    def __init__(self):
+        self.rounds = settings.bcrypt_rounds
+        self.max_workers = settings.password_hash_workers
+        self.max_pending = settings.password_hash_max_pending
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def start(self):
+        """Start the hashing process pool"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            logger.info(f"Password hasher started with {self.max_workers} workers")
+
+    def stop(self):
+        """Stop the hashing process pool"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+            self._semaphore = None
+            logger.info("Password hasher stopped")
+
+    async def _run(self, func, *args):
+        """Run a bcrypt function in the process pool"""
+        self.start()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password using the configured work factor"""
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash"""
+        return await self._run(check_password, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Check whether a stored hash was made with a different work factor"""
+        return get_hash_rounds(hashed_password) != self.rounds
+
+
+# Singleton instance
+password_hasher = PasswordHasher()
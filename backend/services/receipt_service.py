@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import Notification, DeliveryStatus
+from services.change_tracker import bump_notifications_version_for_messages
+from services.retry_service import retry_service
+
+logger = logging.getLogger(__name__)
+
+# Stay under database bound-parameter limits when matching receipts to notifications
+MATCH_CHUNK_SIZE = 500
+
+
+@dataclass
+class DeliveryReceipt:
+    """A normalized provider delivery report"""
+    provider_message_id: str
+    delivered: bool
+    received_at: datetime
+    error: Optional[str] = None
+    # Set when the receipt first matches no notification (its row may not be committed yet)
+    retry_until: Optional[float] = None
+
+
+class ReceiptService:
+    """Buffers delivery receipts and applies them to notifications in bulk"""
+
+    def __init__(self):
+        self.scheduler = AsyncIOScheduler()
+        self.flush_interval_seconds = settings.receipt_flush_interval_seconds
+        self.batch_size = settings.receipt_batch_size
+        self.max_buffer = settings.receipt_max_buffer
+        self.unmatched_retry_seconds = settings.receipt_unmatched_retry_seconds
+        self.expired = 0
+        self._buffer: Dict[str, DeliveryReceipt] = {}
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_pending = False
+        self._early_flush: Optional[asyncio.Task] = None  # Referenced so it isn't collected mid-flush
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self):
+        """Start the periodic flush"""
+        if not self.scheduler.running:
+            self._loop = asyncio.get_event_loop()
+            self.scheduler.add_job(
+                self.flush,
+                trigger=IntervalTrigger(seconds=self.flush_interval_seconds),
+                id='flush_delivery_receipts',
+                replace_existing=True
+            )
+            self.scheduler.start()
+            logger.info("Receipt service started")
+
+    def stop(self):
+        """Stop the periodic flush"""
+        if self.scheduler.running:
+            self.scheduler.shutdown()
+            logger.info("Receipt service stopped")
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def is_full(self) -> bool:
+        """Check whether the buffer has hit its limit"""
+        return len(self._buffer) >= self.max_buffer
+
+    def add(self, receipt: DeliveryReceipt):
+        """Buffer a receipt (call from the event loop); see _keep for which report for a message wins"""
+        self._keep(receipt)
+
+        # Flush early during bursts instead of waiting for the next interval
+        if len(self._buffer) >= self.batch_size and not self._flush_pending:
+            self._flush_pending = True
+            self._early_flush = asyncio.get_running_loop().create_task(self.flush())
+
+    def _keep(self, receipt: DeliveryReceipt, newer: bool = True):
+        """Buffer a receipt unless one already buffered for the message supersedes it
+
+        A failure beats a delivery: a long SMPP message's failed later part is
+        reported under the first part's id, whose own receipt may say delivered.
+        Otherwise the newer report wins.
+        """
+        current = self._buffer.get(receipt.provider_message_id)
+        if current is not None:
+            if current.delivered != receipt.delivered:
+                if receipt.delivered:
+                    return
+            elif not newer:
+                return
+        self._buffer[receipt.provider_message_id] = receipt
+
+    def add_threadsafe(self, receipt: DeliveryReceipt):
+        """Buffer a receipt from another thread (e.g. the SMPP client loop)"""
+        if self._loop is None or self._loop.is_closed():
+            logger.warning(f"Receipt service not running, dropping receipt for {receipt.provider_message_id}")
+            return
+        self._loop.call_soon_threadsafe(self.add, receipt)
+
+    async def flush(self):
+        """Write all buffered receipts to the database"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            self._flush_pending = False
+            if not self._buffer:
+                return
+            receipts = list(self._buffer.values())
+            self._buffer = {}
+
+            loop = asyncio.get_running_loop()
+            try:
+                unmatched = await loop.run_in_executor(None, self._apply, receipts)
+            except Exception as e:
+                logger.error(f"Error applying {len(receipts)} delivery receipts: {e}", exc_info=True)
+                # Put them back unless newer reports arrived meanwhile
+                for receipt in receipts:
+                    self._keep(receipt, newer=False)
+                return
+
+            # A receipt can beat the commit of its notification; keep it for a while
+            now = time.monotonic()
+            expired = 0
+            for receipt in unmatched:
+                if receipt.retry_until is None:
+                    receipt.retry_until = now + self.unmatched_retry_seconds
+                if receipt.retry_until <= now:
+                    expired += 1
+                else:
+                    self._keep(receipt, newer=False)
+            if expired:
+                self.expired += expired
+                logger.warning(f"Dropped {expired} delivery receipts matching no notification")
+
+    def _apply(self, receipts: List[DeliveryReceipt]) -> List[DeliveryReceipt]:
+        """Apply receipts as one bulk UPDATE per outcome; returns those matching no notification"""
+        table = Notification.__table__
+        db = SessionLocal()
+        try:
+            message_ids = [receipt.provider_message_id for receipt in receipts]
+            known = set()
+            for start in range(0, len(message_ids), MATCH_CHUNK_SIZE):
+                known.update(db.execute(
+                    select(table.c.provider_message_id)
+                    .where(table.c.provider_message_id.in_(message_ids[start:start + MATCH_CHUNK_SIZE]))
+                ).scalars())
+            unmatched = [receipt for receipt in receipts if receipt.provider_message_id not in known]
+            receipts = [receipt for receipt in receipts if receipt.provider_message_id in known]
+            if not receipts:
+                return unmatched
+
+            self._update(db, receipts)
+            return unmatched
+        finally:
+            db.close()
+
+    def _update(self, db: Session, receipts: List[DeliveryReceipt]):
+        table = Notification.__table__
+        delivered = [
+            {"message_id": receipt.provider_message_id, "received_at": receipt.received_at}
+            for receipt in receipts if receipt.delivered
+        ]
+        failed = [
+            {"message_id": receipt.provider_message_id, "error": receipt.error or "Delivery failed"}
+            for receipt in receipts if not receipt.delivered
+        ]
+
+        if delivered:
+            # A failure report is final too (for SMPP it may be a later part's, which the
+            # first part's delivery must not hide)
+            db.execute(
+                table.update()
+                .where(table.c.provider_message_id == bindparam("message_id"))
+                .where(table.c.status != DeliveryStatus.FAILED)
+                .values(
+                    status=DeliveryStatus.DELIVERED,
+                    delivered_at=bindparam("received_at"),
+                    error_message=None
+                ),
+                delivered
+            )
+        if failed:
+            # A delivery receipt is final: a failure report arriving after it is stale.
+            # The carrier refused the message, so it is marked as out of retries rather than resent
+            db.execute(
+                table.update()
+                .where(table.c.provider_message_id == bindparam("message_id"))
+                .where(table.c.status != DeliveryStatus.DELIVERED)
+                .values(
+                    status=DeliveryStatus.FAILED,
+                    error_message=bindparam("error"),
+                    retry_count=retry_service.max_retries
+                ),
+                failed
+            )
+        bump_notifications_version_for_messages(db, [receipt.provider_message_id for receipt in receipts])
+        db.commit()
+        logger.info(f"Applied {len(delivered)} delivered and {len(failed)} failed receipts")
+
+
+# Singleton instance
+receipt_service = ReceiptService()
@@ -0,0 +1,136 @@
+import logging
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import distinct, func
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import Task, Contact, task_contact_lists
+
+logger = logging.getLogger(__name__)
+
+E164_PATTERN = re.compile(r"^\+[1-9]\d{6,14}$")
+SEPARATORS = re.compile(r"[\s\-().]")
+
+# Stay under database bound-parameter limits
+IN_CHUNK_SIZE = 500
+
+
+def normalize_phone_number(number: str, default_country_code: Optional[str] = None) -> str:
+    """
+    Convert a phone number to E.164 (+<country code><number>)
+
+    Spaces, dashes, dots and brackets are dropped and a 00 prefix becomes +.
+    Numbers without a + or 00 are local: a leading 0 is dropped and the
+    default country code prepended. Without a default country code they are
+    rejected rather than guessed at.
+    """
+    default_country_code = default_country_code or settings.default_country_code
+    digits = SEPARATORS.sub("", number.strip())
+    if digits.startswith("00"):
+        digits = "+" + digits[2:]
+    elif not digits.startswith("+"):
+        if not default_country_code:
+            raise ValueError(f"Phone number needs a country code: {number}")
+        local = digits[1:] if digits.startswith("0") else digits
+        digits = "+" + default_country_code.lstrip("+") + local
+
+    if not E164_PATTERN.match(digits):
+        raise ValueError(f"Invalid phone number: {number}")
+    return digits
+
+
+def normalize_recipients(numbers: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """Normalize and deduplicate numbers, keeping first-seen order; returns (valid, invalid)"""
+    valid = {}
+    invalid = []
+    for number in numbers:
+        try:
+            valid.setdefault(normalize_phone_number(number), None)
+        except ValueError:
+            invalid.append(number)
+    return list(valid), invalid
+
+
+def _chunks(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def task_list_ids(db: Session, task_id: int) -> List[int]:
+    """Ids of the contact lists a task sends to"""
+    return [
+        list_id for (list_id,) in db.query(task_contact_lists.c.list_id).filter(
+            task_contact_lists.c.task_id == task_id
+        )
+    ]
+
+
+def count_recipients(db: Session, recipients: List[str], list_ids: List[int]) -> int:
+    """Distinct numbers across a task's own recipients and its contact lists"""
+    if not list_ids:
+        return len(recipients)
+
+    listed = db.query(func.count(distinct(Contact.phone_number))).filter(
+        Contact.list_id.in_(list_ids)
+    ).scalar()
+    overlap = 0
+    for chunk in _chunks(recipients, IN_CHUNK_SIZE):
+        overlap += db.query(func.count(distinct(Contact.phone_number))).filter(
+            Contact.list_id.in_(list_ids),
+            Contact.phone_number.in_(chunk)
+        ).scalar()
+    return len(recipients) + listed - overlap
+
+
+def refresh_recipient_counts(db: Session, tasks: Iterable[Task]):
+    """Recompute recipient_count for tasks whose recipients or lists changed (saved with the caller's commit)"""
+    for task in tasks:
+        task.recipient_count = count_recipients(db, task.recipients or [], task.contact_list_ids)
+
+
+def iter_recipient_chunks(db: Session, task: Task, chunk_size: int) -> Iterator[List[str]]:
+    """
+    Yield a task's recipients in chunks, each number once
+
+    The task's own recipients come first, then its contact lists, read with
+    keyset queries in phone number order so only one chunk is held at a time
+    and no cursor stays open while the chunk is being sent.
+    """
+    recipients = task.recipients or []
+    yield from _chunks(recipients, chunk_size)
+
+    list_ids = task_list_ids(db, task.id)
+    if not list_ids:
+        return
+
+    seen = set(recipients)
+    last = None
+    while True:
+        query = db.query(Contact.phone_number).filter(Contact.list_id.in_(list_ids))
+        if last is not None:
+            query = query.filter(Contact.phone_number > last)
+        numbers = [
+            number for (number,) in query.distinct().order_by(Contact.phone_number).limit(chunk_size)
+        ]
+        if not numbers:
+            return
+        last = numbers[-1]
+        chunk = [number for number in numbers if number not in seen]
+        if chunk:
+            yield chunk
+
+
+def backfill_recipient_counts():
+    """Fill recipient_count for tasks saved before it existed"""
+    db = SessionLocal()
+    try:
+        tasks = db.query(Task).filter(Task.recipient_count.is_(None)).all()
+        if tasks:
+            refresh_recipient_counts(db, tasks)
+            db.commit()
+            logger.info(f"Backfilled recipient counts for {len(tasks)} tasks")
+    finally:
+        db.close()
@@ -1,12 +1,17 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta
+from sqlalchemy import case
 from sqlalchemy.orm import Session
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
 from database import SessionLocal
-from models import Notification, DeliveryStatus
+from models import Notification, DeliveryStatus, Task, User
 from services.sms_service import sms_service
+from services.event_bus import event_bus
+from services.change_tracker import bump_notifications_version
+from services.fair_dispatcher import LANES, dispatch_policy, send_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -42,28 +47,41 @@ class RetryService:
         """Retry failed and queued notifications"""
         db = SessionLocal()
         try:
-            # Get failed and queued notifications that haven't exceeded max retries
-            notifications = db.query(Notification).filter(
+            # Get failed and queued notifications that haven't exceeded max retries, urgent ones first
+            notifications = db.query(
+                Notification, Task.user_id, User.dispatch_weight, User.max_concurrent_sends
+            ).select_from(Notification).outerjoin(Task, Task.id == Notification.task_id).outerjoin(
+                User, User.id == Task.user_id
+            ).filter(
                 Notification.status.in_([DeliveryStatus.FAILED, DeliveryStatus.QUEUED]),
                 Notification.retry_count < self.max_retries
+            ).order_by(
+                case({lane: index for index, lane in enumerate(LANES)}, value=Notification.priority, else_=len(LANES)),
+                Notification.id
             ).all()
             
             logger.info(f"Found {len(notifications)} notifications to retry")
             
-            for notification in notifications:
+            for row in notifications:
+                notification, user_id = row.Notification, row.user_id
                 try:
-                    # Attempt to send
-                    result = sms_service.send_sms(
-                        notification.recipient,
-                        notification.message,
-                        notification.provider.value
-                    )
+                    # Resends share provider capacity with live sends: same slots, lanes and user caps
+                    weight, cap = dispatch_policy(row)
+                    async with send_dispatcher.slot(
+                        user_id, notification.task_id, notification.segments or 1, weight, cap, notification.priority
+                    ):
+                        # Read on the loop: message may load the body through the session
+                        result = await asyncio.get_running_loop().run_in_executor(
+                            None, sms_service.send_sms, notification.recipient, notification.message,
+                            notification.provider.value
+                        )
                     
                     notification.retry_count += 1
                     
                     if result['success']:
                         notification.status = DeliveryStatus.SENT
                         notification.sent_at = datetime.utcnow()
+                        notification.provider_message_id = result.get('message_id')
                         notification.error_message = None
                         logger.info(f"Successfully retried notification {notification.id}")
                     else:
@@ -74,13 +92,17 @@ class RetryService:
                         notification.error_message = result.get('error', 'Unknown error')
                         logger.warning(f"Retry failed for notification {notification.id}: {notification.error_message}")
                     
+                    bump_notifications_version(db, [user_id])
                     db.commit()
                     
                 except Exception as e:
                     logger.error(f"Error retrying notification {notification.id}: {e}")
                     notification.retry_count += 1
                     notification.error_message = str(e)
+                    bump_notifications_version(db, [user_id])
                     db.commit()
+                
+                event_bus.publish_notification(user_id, notification)
             
         except Exception as e:
             logger.error(f"Error in retry service: {e}", exc_info=True)
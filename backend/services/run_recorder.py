@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import insert
+
+from config import settings
+from database import SessionLocal
+from models import Task, TaskRun
+
+logger = logging.getLogger(__name__)
+
+
+class RunRecorder:
+    """Buffers task run records and inserts them in batches"""
+
+    def __init__(self):
+        self.scheduler = AsyncIOScheduler()
+        self.flush_interval_seconds = settings.run_record_flush_interval_seconds
+        self.batch_size = settings.run_record_batch_size
+        self.max_buffer = settings.run_record_max_buffer
+        self.dropped = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_pending = False
+        self._early_flush: Optional[asyncio.Task] = None  # Referenced so it isn't collected mid-flush
+
+    def start(self):
+        """Start the periodic flush"""
+        if not self.scheduler.running:
+            self.scheduler.add_job(
+                self.flush,
+                trigger=IntervalTrigger(seconds=self.flush_interval_seconds),
+                id='flush_task_runs',
+                replace_existing=True
+            )
+            self.scheduler.start()
+            logger.info("Run recorder started")
+
+    def stop(self):
+        """Stop the periodic flush"""
+        if self.scheduler.running:
+            self.scheduler.shutdown()
+            logger.info("Run recorder stopped")
+
+    def record(self, run: Dict[str, Any]):
+        """Buffer one run (call from the event loop); history is best-effort under overload"""
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Run record buffer full, dropped {self.dropped} runs so far")
+            return
+        self._buffer.append(run)
+
+        if len(self._buffer) >= self.batch_size and not self._flush_pending:
+            self._flush_pending = True
+            self._early_flush = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        """Write all buffered runs to the database"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            self._flush_pending = False
+            if not self._buffer:
+                return
+            runs = self._buffer
+            self._buffer = []
+
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self._insert, runs)
+            except Exception as e:
+                logger.error(f"Error writing {len(runs)} task runs: {e}", exc_info=True)
+                # Keep them for the next flush, within the buffer limit
+                self._buffer = (runs + self._buffer)[-self.max_buffer:]
+
+    def _insert(self, runs: List[Dict[str, Any]]):
+        """Insert runs in one executemany, skipping tasks deleted since the run"""
+        db = SessionLocal()
+        try:
+            task_ids = {run["task_id"] for run in runs}
+            existing = {
+                task_id for (task_id,) in db.query(Task.id).filter(Task.id.in_(task_ids))
+            }
+            rows = [run for run in runs if run["task_id"] in existing]
+            if rows:
+                db.execute(insert(TaskRun), rows)
+                db.commit()
+        finally:
+            db.close()
+
+
+# Singleton instance
+run_recorder = RunRecorder()
@@ -1,19 +1,40 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-from datetime import datetime, timedelta
+from apscheduler.events import EVENT_JOB_SUBMITTED
+from datetime import datetime, timezone
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
 import logging
+import time
 from croniter import croniter
 
+from config import settings
 from database import SessionLocal
 from models import Task, Notification, DeliveryStatus, SMSProvider
 from services.condition_evaluator import condition_evaluator
 from services.sms_service import sms_service
+from services.event_bus import event_bus
+from services.change_tracker import bump_tasks_version, bump_notifications_version, current_task_change_version
+from services.run_recorder import run_recorder
+from services.digest_service import digest_service
+from services.message_store import message_store
+from services.recipients import iter_recipient_chunks
+from services.adaptive_polling import adaptive_poller
+from services.fair_dispatcher import run_dispatcher, send_dispatcher, dispatch_policy, DEFAULT_LANE
+from services.sms_encoding import SegmentInfo, segment_info, transliterate, truncate_to_segments
+from metrics import (
+    FETCH_SECONDS, EVALUATE_SECONDS, FORMAT_SECONDS, SEND_SECONDS, COMMIT_SECONDS, SEND_LATENCY_SECONDS,
+    record_scheduler_lag
+)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MESSAGE_TEMPLATE = "Task update: {name}"
+
 
 class TaskScheduler:
     """Manages scheduled task execution"""
@@ -21,6 +42,16 @@ class TaskScheduler:
     def __init__(self):
         self.scheduler = AsyncIOScheduler()
         self.running_jobs = {}
+        # Owner (and their dispatch weight, once a run has loaded it) and priority lane of
+        # each task, so a run can queue fairly for a slot before it loads anything
+        self._task_owners: Dict[int, Tuple[int, Optional[float], str]] = {}
+        self._scheduled_times = {}
+        # Schedule each job was built from, so change feed entries that don't alter it are no-ops
+        self._job_signatures: Dict[int, Tuple] = {}
+        # Task change feed position this process's schedule reflects
+        self.change_watermark = 0
+        self.scheduler.add_listener(record_scheduler_lag, EVENT_JOB_SUBMITTED)
+        self.scheduler.add_listener(self._record_scheduled_time, EVENT_JOB_SUBMITTED)
     
     def start(self):
         """Start the scheduler"""
@@ -40,57 +71,125 @@ class TaskScheduler:
         """Load all active tasks from database and schedule them"""
         db = SessionLocal()
         try:
+            # Read the watermark first: changes committed during the load are replayed, not missed
+            self.change_watermark = current_task_change_version(db)
             tasks = db.query(Task).filter(Task.is_active == True).all()
-            for task in tasks:
-                self.schedule_task(task)
+            self.schedule_tasks(tasks)
             logger.info(f"Loaded {len(tasks)} active tasks")
         finally:
             db.close()
     
     def schedule_task(self, task: Task):
         """Schedule a single task"""
+        self.schedule_tasks([task])
+    
+    def schedule_tasks(self, tasks: List[Task]):
+        """Schedule many tasks, persisting their next_run in a single session"""
+        next_runs = []
+        user_ids = set()
+        for task in tasks:
+            next_run_time = self._add_job(task)
+            if next_run_time:
+                next_runs.append({"id": task.id, "next_run": next_run_time})
+                user_ids.add(task.user_id)
+        
+        # Update next_run times
+        if next_runs:
+            db = SessionLocal()
+            try:
+                db.execute(update(Task), next_runs)
+                bump_tasks_version(db, user_ids)
+                db.commit()
+            finally:
+                db.close()
+    
+    def _add_job(self, task: Task) -> Optional[datetime]:
+        """Register the scheduler job for a task and return its next fire time"""
         job_id = f"task_{task.id}"
+        weight = self._task_owners.get(task.id, (None, None))[1]
+        self._task_owners[task.id] = (task.user_id, weight, task.priority or DEFAULT_LANE)
         
         # Remove existing job if any
         if job_id in self.running_jobs:
             self.scheduler.remove_job(job_id)
+            del self.running_jobs[job_id]
         
-        # Parse schedule
-        trigger = self._parse_schedule(task.schedule_cron, task.schedule_human)
-        
-        if trigger:
-            self.scheduler.add_job(
-                self._execute_task,
-                trigger=trigger,
-                id=job_id,
-                args=[task.id],
-                replace_existing=True
-            )
-            self.running_jobs[job_id] = task.id
-            
-            # Update next_run time
-            db = SessionLocal()
-            try:
-                db_task = db.query(Task).filter(Task.id == task.id).first()
-                if db_task:
-                    job = self.scheduler.get_job(job_id)
-                    if job and job.next_run_time:
-                        db_task.next_run = job.next_run_time
-                        db.commit()
-            finally:
-                db.close()
-            
-            logger.info(f"Scheduled task {task.id}: {task.name}")
+        if task.poll_min_seconds and task.poll_max_seconds:
+            # Adaptive: starts at the current interval, rescheduled after each poll
+            trigger = IntervalTrigger(seconds=adaptive_poller.interval(
+                task.id, task.poll_min_seconds, task.poll_max_seconds
+            ))
+        elif not task.schedule_cron and not task.schedule_human:
+            # Tasks fed only by their ingest webhook have no schedule
+            return None
         else:
+            trigger = self._parse_schedule(task.schedule_cron, task.schedule_human)
+        
+        if not trigger:
             logger.warning(f"Could not parse schedule for task {task.id}")
+            return None
+        
+        job = self.scheduler.add_job(
+            self._execute_task,
+            trigger=trigger,
+            id=job_id,
+            args=[task.id],
+            replace_existing=True
+        )
+        self.running_jobs[job_id] = task.id
+        self._job_signatures[task.id] = self._signature(task)
+        logger.info(f"Scheduled task {task.id}: {task.name}")
+        
+        return getattr(job, "next_run_time", None)
     
     def unschedule_task(self, task_id: int):
         """Remove a task from the schedule"""
-        job_id = f"task_{task_id}"
-        if job_id in self.running_jobs:
-            self.scheduler.remove_job(job_id)
-            del self.running_jobs[job_id]
-            logger.info(f"Unscheduled task {task_id}")
+        self.unschedule_tasks([task_id])
+    
+    def unschedule_tasks(self, task_ids: List[int]):
+        """Remove many tasks from the schedule"""
+        for task_id in task_ids:
+            job_id = f"task_{task_id}"
+            if job_id in self.running_jobs:
+                self.scheduler.remove_job(job_id)
+                del self.running_jobs[job_id]
+                logger.info(f"Unscheduled task {task_id}")
+            self._job_signatures.pop(task_id, None)
+            self._task_owners.pop(task_id, None)
+            adaptive_poller.forget(task_id)
+    
+    @staticmethod
+    def _signature(task: Task) -> Tuple:
+        return (task.schedule_cron, task.schedule_human, task.poll_min_seconds, task.poll_max_seconds)
+    
+    def apply_changes(self, tasks: Iterable[Task], deleted_ids: Iterable[int]) -> Dict[str, int]:
+        """
+        Bring the schedule in line with changed and deleted tasks from the change feed
+
+        Only jobs whose task was removed, deactivated or given a different
+        schedule are touched; returns how many were added, updated and removed.
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        removed = [task_id for task_id in set(deleted_ids) if f"task_{task_id}" in self.running_jobs]
+        to_schedule = []
+        for task in tasks:
+            scheduled = f"task_{task.id}" in self.running_jobs
+            has_schedule = any(self._signature(task))
+            if not task.is_active or not has_schedule:
+                if scheduled:
+                    removed.append(task.id)
+            elif not scheduled:
+                to_schedule.append(task)
+                counts["added"] += 1
+            elif self._job_signatures.get(task.id) != self._signature(task):
+                removed.append(task.id)
+                to_schedule.append(task)
+                counts["updated"] += 1
+        
+        counts["removed"] = len(removed) - counts["updated"]
+        self.unschedule_tasks(removed)
+        self.schedule_tasks(to_schedule)
+        return counts
     
     def _parse_schedule(self, cron_expr: Optional[str], human_expr: Optional[str]):
         """Parse schedule expression into APScheduler trigger"""
@@ -134,7 +233,70 @@ class TaskScheduler:
     
     async def _execute_task(self, task_id: int):
         """Execute a scheduled task"""
+        scheduled_at = self._scheduled_times.pop(f"task_{task_id}", None)
+        requested_at = time.perf_counter()
+        async with self._run_slot(task_id):
+            await self._run_task(task_id, scheduled_at, requested_at=requested_at)
+    
+    async def run_with_payload(self, task_id: int, data: dict, payload_bytes: Optional[int] = None):
+        """Run a task on pushed data instead of fetching its source"""
+        requested_at = time.perf_counter()
+        async with self._run_slot(task_id):
+            await self._run_task(task_id, payload=data, payload_bytes=payload_bytes, requested_at=requested_at)
+    
+    def _run_slot(self, task_id: int):
+        """A fair-dispatch run slot, queued under the task's owner"""
+        user_id, weight, lane = self._task_owners.get(task_id, (None, None, DEFAULT_LANE))
+        return run_dispatcher.slot(user_id, task_id, weight=weight, lane=lane)
+    
+    def _adapt_poll_interval(self, task: Task, data: Optional[dict], paths):
+        """Shorten an adaptive task's interval when its data changed, back off when it didn't"""
+        interval = adaptive_poller.observe(
+            task.id, task.poll_min_seconds, task.poll_max_seconds, data, paths
+        )
+        job_id = f"task_{task.id}"
+        if interval is None or job_id not in self.running_jobs:
+            return
+        
+        job = self.scheduler.reschedule_job(job_id, trigger=IntervalTrigger(seconds=interval))
+        task.next_run = getattr(job, "next_run_time", None)
+        logger.info(f"Task {task.id} now polls every {interval:g}s")
+    
+    def _record_scheduled_time(self, event):
+        """Remember when a job was due so its run record can store it"""
+        if event.scheduled_run_times:
+            scheduled = event.scheduled_run_times[-1]
+            self._scheduled_times[event.job_id] = scheduled.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    async def _run_task(
+        self,
+        task_id: int,
+        scheduled_at: Optional[datetime] = None,
+        payload: Optional[dict] = None,
+        payload_bytes: Optional[int] = None,
+        requested_at: Optional[float] = None
+    ):
+        """Fetch (unless data was pushed), evaluate and send for a single task run"""
         db = SessionLocal()
+        user_id = None
+        run_started = time.perf_counter()
+        requested_at = requested_at or run_started  # Per-lane latency includes waiting for a run slot
+        run = {
+            "task_id": task_id,
+            "scheduled_at": scheduled_at,
+            "started_at": datetime.utcnow(),
+            "duration_ms": None,
+            "fetch_ms": None,
+            "evaluate_ms": None,
+            "send_ms": None,
+            "payload_bytes": payload_bytes,
+            "condition_matched": None,
+            "recipients_sent": 0,
+            "recipients_failed": 0,
+            "recipients_queued": 0,
+            "outcome": "failed",
+            "error": None,
+        }
         try:
             task = db.query(Task).filter(Task.id == task_id).first()
             if not task or not task.is_active:
@@ -144,70 +306,202 @@ class TaskScheduler:
             logger.info(f"Executing task {task_id}: {task.name}")
             
             # Update last_run
-            task.last_run = datetime.utcnow()
+            task.last_run = run["started_at"]
+            user_id = task.user_id
+            self._task_owners[task_id] = (user_id, dispatch_policy(task.owner)[0], task.priority)
+            event_bus.publish_task_run(user_id, task_id, "running", task.last_run)
             
-            # Fetch data if source link provided
+            # Use pushed data, or fetch it if a source link is provided
             data = {}
-            if task.source_link:
-                data = await condition_evaluator.fetch_data(task.source_link)
+            if payload is not None:
+                data = payload
+            elif task.source_link:
+                started = time.perf_counter()
+                paths = condition_evaluator.referenced_paths(
+                    task.condition_rules, task.message_template or DEFAULT_MESSAGE_TEMPLATE
+                )
+                data, run["payload_bytes"] = await condition_evaluator.fetch_payload(
+                    task.source_link,
+                    task.source_type,
+                    task.scrape_fields,
+                    paths
+                )
+                elapsed = time.perf_counter() - started
+                FETCH_SECONDS.observe(elapsed)
+                run["fetch_ms"] = elapsed * 1000
+                if task.poll_min_seconds and task.poll_max_seconds:
+                    self._adapt_poll_interval(task, data, paths)
                 if data is None:
                     logger.error(f"Failed to fetch data for task {task_id}")
+                    bump_tasks_version(db, [user_id])
                     db.commit()
+                    run["outcome"] = "fetch_failed"
+                    event_bus.publish_task_run(user_id, task_id, "fetch_failed", task.last_run)
                     return
             
             # Evaluate condition
+            started = time.perf_counter()
             should_send = condition_evaluator.evaluate_condition(
                 task.condition_rules or {},
                 data
             )
+            elapsed = time.perf_counter() - started
+            EVALUATE_SECONDS.observe(elapsed)
+            run["evaluate_ms"] = elapsed * 1000
+            run["condition_matched"] = should_send
             
+            sent = 0
             if should_send:
                 # Format message
+                started = time.perf_counter()
                 message = condition_evaluator.format_message(
-                    task.message_template or "Task update: {name}",
+                    task.message_template or DEFAULT_MESSAGE_TEMPLATE,
                     {**data, "name": task.name, "description": task.description or ""}
                 )
+                if task.transliterate:
+                    message = transliterate(message)
+                if settings.sms_max_segments:
+                    message = truncate_to_segments(message, settings.sms_max_segments)
+                segments = segment_info(message)
+                FORMAT_SECONDS.observe(time.perf_counter() - started)
                 
-                # Send to all recipients
-                for recipient in task.recipients or []:
-                    await self._send_notification(db, task, recipient, message)
+                # Send to all recipients, reading contact lists a chunk at a time
+                started = time.perf_counter()
+                for chunk in iter_recipient_chunks(db, task, settings.recipient_chunk_size):
+                    if task.digest_window_seconds:
+                        # Handed to the digest, sent (and recorded) when its window closes
+                        for recipient in chunk:
+                            digest_service.add(user_id, task.id, recipient, message, task.digest_window_seconds)
+                        run["recipients_queued"] += len(chunk)
+                    else:
+                        delivered = await self._send_notifications(db, task, chunk, message, segments, requested_at)
+                        run["recipients_sent"] += delivered
+                        run["recipients_failed"] += len(chunk) - delivered
+                    sent += len(chunk)
+                run["send_ms"] = (time.perf_counter() - started) * 1000
                 
-                logger.info(f"Task {task_id} sent {len(task.recipients or [])} notifications")
+                logger.info(f"Task {task_id} sent {sent} notifications")
             else:
                 logger.info(f"Task {task_id} condition not met, skipping notification")
             
+            bump_tasks_version(db, [user_id])
+            started = time.perf_counter()
             db.commit()
+            COMMIT_SECONDS.observe(time.perf_counter() - started)
+            run["outcome"] = "completed" if should_send else "skipped"
+            event_bus.publish_task_run(
+                user_id, task_id, run["outcome"], task.last_run, sent
+            )
             
         except Exception as e:
             logger.error(f"Error executing task {task_id}: {e}", exc_info=True)
             db.rollback()
+            run["error"] = str(e)[:255]
+            if user_id is not None:
+                event_bus.publish_task_run(user_id, task_id, "failed")
         finally:
             db.close()
+            if user_id is not None:
+                run["duration_ms"] = (time.perf_counter() - run_started) * 1000
+                run_recorder.record(run)
     
-    async def _send_notification(self, db: Session, task: Task, recipient: str, message: str):
-        """Send notification and log to database"""
+    async def _send_notifications(
+        self,
+        db: Session,
+        task: Task,
+        recipients: List[str],
+        message: str,
+        segments: Optional[SegmentInfo] = None,
+        requested_at: Optional[float] = None
+    ) -> int:
+        """Send one message to a chunk of recipients concurrently; returns the number sent"""
         
-        # Determine provider (default to africastalking)
-        provider = SMSProvider.AFRICASTALKING
+        # Determine provider (configured default, africastalking unless overridden)
+        provider = SMSProvider(settings.sms_default_provider)
         
-        # Create notification record
-        notification = Notification(
-            task_id=task.id,
-            recipient=recipient,
-            message=message,
-            provider=provider,
-            status=DeliveryStatus.PENDING
-        )
-        db.add(notification)
-        db.flush()  # Get notification ID
+        # Record the chunk as pending before anything is sent, so a crash mid-chunk still
+        # leaves a row per message and receipts have a row to match
+        segments = segments or segment_info(message)
+        body_id = message_store.body_id(db, message)
+        notifications = [
+            Notification(
+                task_id=task.id,
+                recipient=recipient,
+                body_id=body_id,
+                provider=provider,
+                status=DeliveryStatus.PENDING,
+                segments=segments.segments,
+                priority=task.priority
+            )
+            for recipient in recipients
+        ]
+        db.add_all(notifications)
+        db.flush()
+        # Detached before the commit so reading them afterwards doesn't reload each row
+        for notification in notifications:
+            set_committed_value(notification, "message", message)
+            db.expunge(notification)
+        self._commit(db)
+        
+        # Each send takes its own fair-dispatch slot, so the chunk goes out as wide as the
+        # user's share allows (filling an SMPP bind's window) and still yields to urgent sends
+        weight, cap = dispatch_policy(task.owner)
+        await asyncio.gather(*(
+            self._deliver(task, notification, message, segments, weight, cap, requested_at)
+            for notification in notifications
+        ))
         
+        db.execute(update(Notification), [
+            {
+                "id": notification.id,
+                "status": notification.status,
+                "sent_at": notification.sent_at,
+                "provider_message_id": notification.provider_message_id,
+                "error_message": notification.error_message
+            }
+            for notification in notifications
+        ])
+        bump_notifications_version(db, [task.user_id])
+        self._commit(db)
+        for notification in notifications:
+            event_bus.publish_notification(task.user_id, notification)
+        return sum(notification.status == DeliveryStatus.SENT for notification in notifications)
+    
+    @staticmethod
+    def _commit(db: Session):
+        started = time.perf_counter()
+        db.commit()
+        COMMIT_SECONDS.observe(time.perf_counter() - started)
+    
+    async def _deliver(
+        self,
+        task: Task,
+        notification: Notification,
+        message: str,
+        segments: SegmentInfo,
+        weight: float,
+        cap: int,
+        requested_at: Optional[float]
+    ):
+        """Send one notification's SMS and set its status (not yet saved)"""
+        recipient = notification.recipient
         try:
-            # Send SMS
-            result = sms_service.send_sms(recipient, message, provider.value)
+            # Send SMS off the event loop (and outside any open transaction)
+            # so concurrent runs can share persistent provider sessions
+            # Provider capacity is shared between users by weighted round-robin, urgent lane first
+            async with send_dispatcher.slot(task.user_id, task.id, segments.segments, weight, cap, task.priority):
+                started = time.perf_counter()
+                result = await asyncio.get_running_loop().run_in_executor(
+                    None, sms_service.send_sms, recipient, message, notification.provider.value, segments
+                )
+                SEND_SECONDS.observe(time.perf_counter() - started)
+            if requested_at is not None:
+                SEND_LATENCY_SECONDS.labels(task.priority).observe(time.perf_counter() - requested_at)
             
             if result['success']:
                 notification.status = DeliveryStatus.SENT
                 notification.sent_at = datetime.utcnow()
+                notification.provider_message_id = result.get('message_id')
                 logger.info(f"SMS sent to {recipient} for task {task.id}")
             else:
                 notification.status = DeliveryStatus.FAILED
@@ -218,8 +512,6 @@ class TaskScheduler:
             notification.status = DeliveryStatus.QUEUED  # Queue for retry
             notification.error_message = str(e)
             logger.error(f"Exception sending SMS to {recipient}: {e}")
-        
-        db.commit()
 
 
 # Singleton instance
@@ -0,0 +1,93 @@
+"""
+Compiled scrape fields and the page extraction run in scraper workers
+
+A task's scrape_fields map output names to a CSS or XPath selector, e.g.
+{"price": {"css": "span.price", "number": true}}. Selectors are compiled
+to lxml XPath objects once per field set in each worker process. Kept apart
+from the scraper so lxml and cssselect are only imported where pages are
+parsed or selectors validated, not when the app starts.
+"""
+import json
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import lxml.html
+from cssselect import HTMLTranslator, SelectorError
+from lxml import etree
+
+NUMBER_PATTERN = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+
+_translator = HTMLTranslator()
+
+
+@dataclass
+class CompiledField:
+    """One scrape field with its selector compiled to XPath"""
+    name: str
+    xpath: etree.XPath
+    attribute: Optional[str] = None
+    all: bool = False
+    number: bool = False
+
+    def _value(self, match) -> Any:
+        if isinstance(match, etree._Element):
+            if self.attribute:
+                text = match.get(self.attribute)
+            else:
+                text = "".join(match.itertext())
+        elif isinstance(match, (bool, float)):
+            return match  # count(), boolean() etc.
+        else:
+            text = str(match)
+
+        if text is None:
+            return None
+        text = " ".join(text.split())
+        if self.number:
+            found = NUMBER_PATTERN.search(text)
+            return float(found.group().replace(",", "")) if found else None
+        return text
+
+    def extract(self, document) -> Any:
+        result = self.xpath(document)
+        if not isinstance(result, list):
+            return self._value(result)
+        values = [self._value(match) for match in result]
+        if self.all:
+            return [value for value in values if value is not None]
+        return next((value for value in values if value is not None), None)
+
+
+def compile_fields(fields: Dict[str, Dict[str, Any]]) -> List[CompiledField]:
+    """Compile a task's scrape_fields; raises ValueError naming the bad selector"""
+    compiled = []
+    for name, spec in fields.items():
+        css, xpath = spec.get("css"), spec.get("xpath")
+        if bool(css) == bool(xpath):
+            raise ValueError(f"Field '{name}' needs exactly one of css or xpath")
+        try:
+            expression = _translator.css_to_xpath(css) if css else xpath
+            compiled.append(CompiledField(
+                name=name,
+                xpath=etree.XPath(expression),
+                attribute=spec.get("attribute"),
+                all=bool(spec.get("all", False)),
+                number=bool(spec.get("number", False))
+            ))
+        except (SelectorError, etree.XPathSyntaxError) as e:
+            raise ValueError(f"Invalid selector for field '{name}': {e}")
+    return compiled
+
+
+@lru_cache(maxsize=1024)
+def _compiled_fields(fields_key: str) -> List[CompiledField]:
+    # Per worker process: each distinct field set is compiled on first use
+    return compile_fields(json.loads(fields_key))
+
+
+def scrape_html(fields_key: str, body: bytes, base_url: Optional[str] = None) -> Dict[str, Any]:
+    """Parse a page and extract the fields (runs in a worker process)"""
+    document = lxml.html.document_fromstring(body, base_url=base_url)
+    return {field.name: field.extract(document) for field in _compiled_fields(fields_key)}
@@ -0,0 +1,61 @@
+"""
+HTML scraping for tasks with source_type "html"
+
+Pages are parsed in a dedicated process pool so large documents don't hold
+the event loop (or the GIL of the API process). Selector compilation and
+extraction live in services.scrape_fields, imported on first use.
+"""
+import asyncio
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def fields_key(fields: Dict[str, Dict[str, Any]]) -> str:
+    """Stable cache key for a field set"""
+    return json.dumps(fields, sort_keys=True, separators=(",", ":"))
+
+
+class Scraper:
+    """Runs HTML extraction in a dedicated, bounded process pool"""
+
+    def __init__(self):
+        self.max_workers = settings.scrape_workers
+        self.max_pending = settings.scrape_max_pending
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def start(self):
+        """Start the parsing process pool"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            logger.info(f"Scraper started with {self.max_workers} workers")
+
+    def stop(self):
+        """Stop the parsing process pool"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+            self._semaphore = None
+            logger.info("Scraper stopped")
+
+    async def extract(self, fields: Dict[str, Dict[str, Any]], body: bytes, base_url: Optional[str] = None) -> Dict[str, Any]:
+        """Extract named fields from an HTML page"""
+        self.start()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+
+        from services.scrape_fields import scrape_html
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, scrape_html, fields_key(fields), body, base_url)
+
+
+# Singleton instance
+scraper = Scraper()
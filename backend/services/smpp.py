@@ -0,0 +1,604 @@
+"""
+Minimal asyncio SMPP v3.4 transceiver client
+
+Only the PDUs Task2SMS needs are implemented: bind_transceiver, submit_sm,
+deliver_sm (delivery receipts), enquire_link, unbind and generic_nack.
+SMPPClient keeps a pool of binds alive on a dedicated event loop thread so
+the synchronous SMSProvider interface can use it from any thread.
+"""
+import asyncio
+import concurrent.futures
+import itertools
+import logging
+import re
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from services.sms_encoding import decode_gsm7, encode_gsm7, is_gsm7, split_segments
+
+logger = logging.getLogger(__name__)
+
+# Command ids
+GENERIC_NACK = 0x80000000
+BIND_TRANSCEIVER = 0x00000009
+BIND_TRANSCEIVER_RESP = 0x80000009
+SUBMIT_SM = 0x00000004
+SUBMIT_SM_RESP = 0x80000004
+DELIVER_SM = 0x00000005
+DELIVER_SM_RESP = 0x80000005
+UNBIND = 0x00000006
+UNBIND_RESP = 0x80000006
+ENQUIRE_LINK = 0x00000015
+ENQUIRE_LINK_RESP = 0x80000015
+
+# Command status
+ESME_ROK = 0x00000000
+ESME_RINVCMDID = 0x00000003
+ESME_RMSGQFUL = 0x00000014
+ESME_RTHROTTLED = 0x00000058
+
+# Statuses meaning "slow down": the submit is retried with exponential backoff
+THROTTLE_STATUSES = {ESME_RTHROTTLED, ESME_RMSGQFUL}
+THROTTLE_RETRIES = 6
+THROTTLE_BACKOFF = 0.1
+THROTTLE_MAX_BACKOFF = 5.0
+THROTTLE_WAIT_LIMIT = sum(min(THROTTLE_BACKOFF * 2 ** attempt, THROTTLE_MAX_BACKOFF) for attempt in range(THROTTLE_RETRIES))
+
+# Optional parameter tags
+TAG_RECEIPTED_MESSAGE_ID = 0x001E
+TAG_MESSAGE_PAYLOAD = 0x0424
+TAG_MESSAGE_STATE = 0x0427
+
+# Data coding
+DATA_CODING_DEFAULT = 0x00  # GSM 03.38, one septet per octet
+DATA_CODING_LATIN1 = 0x03
+DATA_CODING_UCS2 = 0x08
+
+# esm_class bits marking an SMSC delivery receipt and a user data header
+ESM_CLASS_DELIVERY_RECEIPT = 0x04
+ESM_CLASS_UDHI = 0x40
+
+# message_state values
+MESSAGE_STATE_DELIVERED = 2
+MESSAGE_STATE_FAILED = {3, 4, 5, 8}  # expired, deleted, undeliverable, rejected
+
+# Receipt text stat values
+RECEIPT_DELIVERED = {"DELIVRD"}
+RECEIPT_FAILED = {"EXPIRED", "DELETED", "UNDELIV", "REJECTD", "UNKNOWN"}
+
+HEADER = struct.Struct(">IIII")
+SHORT_MESSAGE_LIMIT = 254
+
+# How many part ids of concatenated messages are remembered for receipts
+PART_IDS_LIMIT = 100_000
+
+RECEIPT_PATTERN = re.compile(r"id:(?P<id>\S+).*?stat:(?P<stat>\w+)(?:.*?err:(?P<err>\w+))?", re.S)
+
+
+class SMPPError(Exception):
+    """SMPP command failed with a non-zero command_status"""
+
+    def __init__(self, command_status: int, message: str = ""):
+        self.command_status = command_status
+        super().__init__(message or f"SMPP error status 0x{command_status:08X}")
+
+
+class SessionClosed(ConnectionError):
+    """The session closed before the request was written, so it is safe to resend"""
+
+
+@dataclass
+class PDU:
+    command_id: int
+    command_status: int = ESME_ROK
+    sequence_number: int = 0
+    body: bytes = b""
+
+    def encode(self) -> bytes:
+        return HEADER.pack(
+            HEADER.size + len(self.body),
+            self.command_id,
+            self.command_status,
+            self.sequence_number
+        ) + self.body
+
+
+@dataclass
+class ShortMessage:
+    """Decoded submit_sm / deliver_sm body"""
+    source_addr: str
+    destination_addr: str
+    esm_class: int
+    data_coding: int
+    short_message: bytes
+    tlvs: Dict[int, bytes] = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        payload = self.tlvs.get(TAG_MESSAGE_PAYLOAD, self.short_message)
+        if self.esm_class & ESM_CLASS_UDHI and payload:
+            payload = payload[payload[0] + 1:]
+        if self.data_coding == DATA_CODING_UCS2:
+            return payload.decode("utf-16-be", errors="replace")
+        if self.data_coding == DATA_CODING_DEFAULT:
+            return decode_gsm7(payload)
+        return payload.decode("latin-1")
+
+
+def cstring(value: str) -> bytes:
+    return value.encode("latin-1") + b"\x00"
+
+
+def read_cstring(data: bytes, offset: int) -> Tuple[str, int]:
+    end = data.index(b"\x00", offset)
+    return data[offset:end].decode("latin-1"), end + 1
+
+
+def encode_tlv(tag: int, value: bytes) -> bytes:
+    return struct.pack(">HH", tag, len(value)) + value
+
+
+def decode_tlvs(data: bytes, offset: int) -> Dict[int, bytes]:
+    tlvs = {}
+    while offset + 4 <= len(data):
+        tag, length = struct.unpack_from(">HH", data, offset)
+        offset += 4
+        tlvs[tag] = data[offset:offset + length]
+        offset += length
+    return tlvs
+
+
+def encode_text(text: str) -> Tuple[bytes, int]:
+    """Encode message text as GSM 03.38, falling back to UCS-2 outside the GSM-7 alphabet"""
+    if is_gsm7(text):
+        return encode_gsm7(text), DATA_CODING_DEFAULT
+    return text.encode("utf-16-be"), DATA_CODING_UCS2
+
+
+def message_parts(text: str, reference: int) -> List[Tuple[bytes, int, int]]:
+    """(short_message, data_coding, esm_class) of each submit_sm needed for the text
+
+    Long messages are split on segment boundaries and each part carries a
+    concatenation user data header (8-bit reference) so handsets reassemble them.
+    """
+    parts = split_segments(text)
+    if len(parts) <= 1:
+        message, data_coding = encode_text(text)
+        return [(message, data_coding, 0)]
+    # Every part shares the encoding the whole text needs
+    data_coding = DATA_CODING_DEFAULT if is_gsm7(text) else DATA_CODING_UCS2
+    encode = encode_gsm7 if data_coding == DATA_CODING_DEFAULT else (lambda part: part.encode("utf-16-be"))
+    return [
+        (bytes([0x05, 0x00, 0x03, reference & 0xFF, len(parts), number]) + encode(part), data_coding, ESM_CLASS_UDHI)
+        for number, part in enumerate(parts, 1)
+    ]
+
+
+def bind_transceiver_body(system_id: str, password: str, system_type: str = "") -> bytes:
+    return (
+        cstring(system_id) + cstring(password) + cstring(system_type)
+        + bytes([0x34, 0, 0]) + cstring("")  # interface_version, addr_ton, addr_npi, address_range
+    )
+
+
+def short_message_body(
+    source_addr: str,
+    destination_addr: str,
+    message: bytes,
+    data_coding: int,
+    esm_class: int = 0,
+    registered_delivery: int = 1,
+    tlvs: Optional[Dict[int, bytes]] = None
+) -> bytes:
+    """Encode a submit_sm / deliver_sm body; longer texts go through message_parts first"""
+    if len(message) > SHORT_MESSAGE_LIMIT:
+        raise ValueError(f"short_message of {len(message)} octets exceeds {SHORT_MESSAGE_LIMIT}")
+    body = (
+        cstring("")  # service_type
+        + bytes([1, 1]) + cstring(source_addr)  # source TON/NPI
+        + bytes([1, 1]) + cstring(destination_addr)  # destination TON/NPI
+        + bytes([esm_class, 0, 0])  # esm_class, protocol_id, priority_flag
+        + cstring("") + cstring("")  # schedule_delivery_time, validity_period
+        + bytes([registered_delivery, 0, data_coding, 0, len(message)])
+        + message
+    )
+    for tag, value in (tlvs or {}).items():
+        body += encode_tlv(tag, value)
+    return body
+
+
+def decode_short_message(body: bytes) -> ShortMessage:
+    offset = 0
+    _, offset = read_cstring(body, offset)  # service_type
+    offset += 2
+    source_addr, offset = read_cstring(body, offset)
+    offset += 2
+    destination_addr, offset = read_cstring(body, offset)
+    esm_class = body[offset]
+    offset += 3
+    _, offset = read_cstring(body, offset)  # schedule_delivery_time
+    _, offset = read_cstring(body, offset)  # validity_period
+    data_coding = body[offset + 2]
+    sm_length = body[offset + 4]
+    offset += 5
+    short_message = body[offset:offset + sm_length]
+    offset += sm_length
+    return ShortMessage(
+        source_addr=source_addr,
+        destination_addr=destination_addr,
+        esm_class=esm_class,
+        data_coding=data_coding,
+        short_message=short_message,
+        tlvs=decode_tlvs(body, offset)
+    )
+
+
+def parse_receipt(message: ShortMessage) -> Optional[Tuple[str, bool, Optional[str]]]:
+    """Extract (message_id, delivered, error) from a delivery receipt, or None if not final"""
+    message_id = None
+    state = None
+    error = None
+
+    if TAG_RECEIPTED_MESSAGE_ID in message.tlvs:
+        message_id = message.tlvs[TAG_RECEIPTED_MESSAGE_ID].rstrip(b"\x00").decode("latin-1")
+    if TAG_MESSAGE_STATE in message.tlvs:
+        state = message.tlvs[TAG_MESSAGE_STATE][0]
+
+    match = RECEIPT_PATTERN.search(message.text)
+    if match:
+        message_id = message_id or match.group("id")
+        stat = match.group("stat").upper()
+        error = f"{stat} err:{match.group('err')}" if match.group("err") else stat
+        if state is None:
+            if stat in RECEIPT_DELIVERED:
+                state = MESSAGE_STATE_DELIVERED
+            elif stat in RECEIPT_FAILED:
+                state = 5
+
+    if not message_id or state is None:
+        return None
+    if state == MESSAGE_STATE_DELIVERED:
+        return message_id, True, None
+    if state in MESSAGE_STATE_FAILED:
+        return message_id, False, error or f"message_state {state}"
+    return None
+
+
+async def read_pdu(reader: asyncio.StreamReader) -> PDU:
+    header = await reader.readexactly(HEADER.size)
+    command_length, command_id, command_status, sequence_number = HEADER.unpack(header)
+    body = await reader.readexactly(command_length - HEADER.size) if command_length > HEADER.size else b""
+    return PDU(command_id, command_status, sequence_number, body)
+
+
+class SMPPSession:
+    """A single transceiver bind with a window of in-flight submit_sm requests"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        system_id: str,
+        password: str,
+        system_type: str = "",
+        window: int = 10,
+        enquire_link_interval: float = 30.0,
+        response_timeout: float = 10.0,
+        on_deliver: Optional[Callable[[ShortMessage], None]] = None
+    ):
+        self.host = host
+        self.port = port
+        self.system_id = system_id
+        self.password = password
+        self.system_type = system_type
+        self.window_size = window
+        self.enquire_link_interval = enquire_link_interval
+        self.response_timeout = response_timeout
+        self.on_deliver = on_deliver
+
+        self.window = asyncio.Semaphore(window)
+        self.throttled = 0
+        self.closed = asyncio.Event()
+        self._unbinding = False
+        self._sequence = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def connect(self):
+        """Open the connection and bind as a transceiver"""
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port),
+            self.response_timeout
+        )
+        self._tasks.append(asyncio.create_task(self._read_loop()))
+        await self._request(BIND_TRANSCEIVER, bind_transceiver_body(self.system_id, self.password, self.system_type))
+        self._tasks.append(asyncio.create_task(self._keepalive()))
+        logger.info(f"SMPP bound to {self.host}:{self.port} as {self.system_id}")
+
+    async def submit(self, body: bytes) -> str:
+        """Submit a submit_sm body and return the SMSC message id
+
+        Throttling responses are retried with exponential backoff, outside
+        the window so other submissions keep going.
+        """
+        backoff = THROTTLE_BACKOFF
+        for attempt in itertools.count():
+            try:
+                async with self.window:
+                    response = await self._request(SUBMIT_SM, body)
+            except SMPPError as e:
+                if e.command_status not in THROTTLE_STATUSES or attempt >= THROTTLE_RETRIES:
+                    raise
+                self.throttled += 1
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, THROTTLE_MAX_BACKOFF)
+                continue
+            message_id, _ = read_cstring(response.body, 0)
+            return message_id
+
+    async def close(self):
+        """Unbind (best effort) and close the connection"""
+        if self._writer and not self.closed.is_set():
+            self._unbinding = True
+            try:
+                await asyncio.wait_for(self._request(UNBIND), 2)
+            except Exception:
+                pass
+        self._shutdown(ConnectionError("SMPP session closed"))
+
+    async def _request(self, command_id: int, body: bytes = b"") -> PDU:
+        if self.closed.is_set() or self._writer.is_closing():
+            raise SessionClosed("SMPP session closed")
+        sequence_number = next(self._sequence)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[sequence_number] = future
+        try:
+            self._writer.write(PDU(command_id, ESME_ROK, sequence_number, body).encode())
+            response = await asyncio.wait_for(future, self.response_timeout)
+        finally:
+            self._pending.pop(sequence_number, None)
+        if response.command_status != ESME_ROK:
+            raise SMPPError(response.command_status)
+        return response
+
+    def _respond(self, request: PDU, command_id: int, body: bytes = b"", command_status: int = ESME_ROK):
+        if not self._writer.is_closing():
+            self._writer.write(PDU(command_id, command_status, request.sequence_number, body).encode())
+
+    async def _read_loop(self):
+        try:
+            while True:
+                pdu = await read_pdu(self._reader)
+                if pdu.command_id & 0x80000000:
+                    # Response (or generic_nack) to one of our requests
+                    future = self._pending.get(pdu.sequence_number)
+                    if future and not future.done():
+                        future.set_result(pdu)
+                elif pdu.command_id == DELIVER_SM:
+                    self._respond(pdu, DELIVER_SM_RESP, cstring(""))
+                    if self.on_deliver:
+                        try:
+                            self.on_deliver(decode_short_message(pdu.body))
+                        except Exception as e:
+                            logger.error(f"Error handling SMPP deliver_sm: {e}")
+                elif pdu.command_id == ENQUIRE_LINK:
+                    self._respond(pdu, ENQUIRE_LINK_RESP)
+                elif pdu.command_id == UNBIND:
+                    self._respond(pdu, UNBIND_RESP)
+                    break
+                else:
+                    self._respond(pdu, GENERIC_NACK, command_status=ESME_RINVCMDID)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            if not self._unbinding:
+                logger.warning(f"SMPP connection to {self.host}:{self.port} lost: {e}")
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            logger.error(f"SMPP read error: {e}", exc_info=True)
+        self._shutdown(ConnectionError("SMPP connection lost"))
+
+    async def _keepalive(self):
+        try:
+            while not self.closed.is_set():
+                await asyncio.sleep(self.enquire_link_interval)
+                await self._request(ENQUIRE_LINK)
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            logger.warning(f"SMPP enquire_link failed: {e}")
+            self._shutdown(ConnectionError("SMPP enquire_link failed"))
+
+    def _shutdown(self, error: Exception):
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        current = asyncio.current_task()
+        for task in self._tasks:
+            if task is not current:
+                task.cancel()
+        if self._writer:
+            self._writer.close()
+
+
+class SMPPClient:
+    """Pool of SMPP binds kept alive (with rebinding) on a background event loop"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        system_id: str,
+        password: str,
+        system_type: str = "",
+        binds: int = 1,
+        window: int = 10,
+        enquire_link_interval: float = 30.0,
+        response_timeout: float = 10.0,
+        on_deliver: Optional[Callable[[ShortMessage], None]] = None
+    ):
+        self.session_options = dict(
+            host=host,
+            port=port,
+            system_id=system_id,
+            password=password,
+            system_type=system_type,
+            window=window,
+            enquire_link_interval=enquire_link_interval,
+            response_timeout=response_timeout,
+            on_deliver=on_deliver
+        )
+        self.binds = binds
+        self.response_timeout = response_timeout
+        self.sessions: List[Optional[SMPPSession]] = [None] * binds
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._bound: Optional[asyncio.Condition] = None
+        self._stopping = False
+        self._round_robin = itertools.count()
+        self._references = itertools.count()
+        # Ids of the second and later parts of concatenated messages -> id of the first part
+        self.part_ids: "OrderedDict[str, str]" = OrderedDict()
+
+    def start(self):
+        """Start the background loop and begin binding"""
+        if self._thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self._bound = asyncio.Condition()
+            for index in range(self.binds):
+                self.loop.create_task(self._maintain(index))
+            ready.set()
+            self.loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="smpp-client", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        """Unbind all sessions and stop the background loop"""
+        if self._thread is None:
+            return
+        self._stopping = True
+        future = asyncio.run_coroutine_threadsafe(self._close_all(), self.loop)
+        try:
+            future.result(timeout=5)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+        self.loop.close()
+
+    def submit(self, source_addr: str, destination_addr: str, text: str) -> str:
+        """Submit one message from any thread, blocking until the SMSC responds"""
+        future = asyncio.run_coroutine_threadsafe(
+            self.submit_async(source_addr, destination_addr, text), self.loop
+        )
+        parts = max(len(split_segments(text)), 1)
+        try:
+            return future.result(timeout=self.response_timeout * (parts + 1) + THROTTLE_WAIT_LIMIT)
+        except concurrent.futures.TimeoutError:
+            # Cancels the submission on the client loop (via call_soon_threadsafe), so it stops
+            # waiting for a session or its response and gives back its window slot
+            future.cancel()
+            raise TimeoutError(f"SMPP submission to {destination_addr} not answered in time")
+
+    async def submit_async(self, source_addr: str, destination_addr: str, text: str) -> str:
+        """Submit every part of a message and return the message id of the first part"""
+        parts = message_parts(text, next(self._references))
+        first_id = None
+        for message, data_coding, esm_class in parts:
+            body = short_message_body(source_addr, destination_addr, message, data_coding, esm_class)
+            message_id = await self._submit_part(body)
+            if first_id is None:
+                first_id = message_id
+                continue
+            # Mapped right away: the part's receipt can arrive before the next part is acknowledged
+            self.part_ids[message_id] = first_id
+            if len(self.part_ids) > PART_IDS_LIMIT:
+                self.part_ids.popitem(last=False)
+        return first_id
+
+    def primary_message_id(self, message_id: str) -> Tuple[str, bool]:
+        """(id of the first part, whether message_id is a later part) for a receipt"""
+        primary = self.part_ids.get(message_id)
+        return (primary, True) if primary else (message_id, False)
+
+    async def _submit_part(self, body: bytes) -> str:
+        while True:
+            session = await self._acquire_session()
+            try:
+                return await session.submit(body)
+            except SessionClosed:
+                # Never written to the wire, so move it to another (or the rebound) session
+                continue
+
+    async def _acquire_session(self) -> SMPPSession:
+        """Pick the bound session with the most free window, waiting for a bind if needed"""
+        async with self._bound:
+            await asyncio.wait_for(
+                self._bound.wait_for(lambda: any(self._live_sessions())),
+                self.response_timeout
+            )
+            sessions = self._live_sessions()
+            offset = next(self._round_robin)
+            sessions = sessions[offset % len(sessions):] + sessions[:offset % len(sessions)]
+            return min(sessions, key=lambda session: session.in_flight)
+
+    def _live_sessions(self) -> List[SMPPSession]:
+        return [session for session in self.sessions if session and not session.closed.is_set()]
+
+    async def _maintain(self, index: int):
+        """Keep one bind alive, rebinding with exponential backoff"""
+        backoff = 1.0
+        while not self._stopping:
+            session = SMPPSession(**self.session_options)
+            try:
+                await session.connect()
+            except Exception as e:
+                logger.warning(f"SMPP bind {index} failed: {e}; retrying in {backoff:.0f}s")
+                session._shutdown(ConnectionError("bind failed"))
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+
+            backoff = 1.0
+            self.sessions[index] = session
+            async with self._bound:
+                self._bound.notify_all()
+            await session.closed.wait()
+            self.sessions[index] = None
+            if not self._stopping:
+                logger.warning(f"SMPP bind {index} closed; rebinding")
+                await asyncio.sleep(backoff)
+
+    async def _close_all(self):
+        for session in self.sessions:
+            if session:
+                await session.close()
+        await cancel_pending_tasks()
+
+
+async def cancel_pending_tasks():
+    """Cancel every other task on the running loop so it can be stopped cleanly"""
+    current = asyncio.current_task()
+    tasks = [task for task in asyncio.all_tasks() if task is not current]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,187 @@
+"""
+SMS encoding and segmentation
+
+A message that fits the GSM 03.38 alphabet is sent as GSM-7 (160 septets,
+153 per part once concatenated); a single character outside it switches the
+whole message to UCS-2 (70 UTF-16 units, 67 per part). Extension-table
+characters cost two septets, and neither an escape pair nor a surrogate pair
+may be split across parts.
+"""
+import unicodedata
+from dataclasses import dataclass, field
+from typing import List
+
+GSM7 = "GSM-7"
+UCS2 = "UCS-2"
+
+# The GSM 03.38 default alphabet in code order; 0x1B escapes to the extension table
+GSM7_ESCAPE = 0x1B
+GSM7_ALPHABET = (
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞ\x1bÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENSION_CODES = {
+    "\f": 0x0A, "^": 0x14, "{": 0x28, "}": 0x29, "\\": 0x2F,
+    "[": 0x3C, "~": 0x3D, "]": 0x3E, "|": 0x40, "€": 0x65,
+}
+GSM7_BASIC = frozenset(GSM7_ALPHABET) - {"\x1b"}
+GSM7_EXTENSION = frozenset(GSM7_EXTENSION_CODES)
+GSM7_CHARACTERS = GSM7_BASIC | GSM7_EXTENSION
+
+_GSM7_CODES = {char: code for code, char in enumerate(GSM7_ALPHABET) if code != GSM7_ESCAPE}
+_GSM7_EXTENSION_CHARS = {code: char for char, code in GSM7_EXTENSION_CODES.items()}
+
+SEGMENT_LIMITS = {
+    GSM7: (160, 153),
+    UCS2: (70, 67),
+}
+
+# Common characters outside GSM-7 with a close GSM-7 equivalent
+TRANSLITERATIONS = {
+    "‘": "'", "’": "'", "‚": "'", "‛": "'", "′": "'",
+    "‹": "'", "›": "'", "`": "'", "´": "'",
+    "“": '"', "”": '"', "„": '"', "‟": '"', "″": '"',
+    "«": '"', "»": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "―": "-",
+    "−": "-",
+    "…": "...",
+    "\u00a0": " ", "\u2002": " ", "\u2003": " ", "\u2009": " ", "\u202f": " ", "\u3000": " ",
+    "\u200b": "", "\u200c": "", "\u200d": "", "\ufeff": "",
+    "•": "*", "·": "*",
+    "×": "x", "÷": "/",
+    "™": "TM", "©": "(C)", "®": "(R)",
+    "°": " deg",
+    "Ł": "L", "ł": "l", "Đ": "D", "đ": "d", "ı": "i",
+    "\t": " ",
+}
+
+
+@dataclass
+class SegmentInfo:
+    """Encoding and segment count of a message"""
+    encoding: str
+    length: int  # septets for GSM-7, UTF-16 code units for UCS-2
+    segments: int
+    segment_limit: int  # units available per segment at this segment count
+    non_gsm_characters: List[str] = field(default_factory=list)
+
+
+def is_gsm7(text: str) -> bool:
+    """Check whether every character of the text is in the GSM-7 alphabet"""
+    return all(char in GSM7_CHARACTERS for char in text)
+
+
+def encode_gsm7(text: str) -> bytes:
+    """GSM 03.38 septets of the text, one per octet (unpacked); raises ValueError outside GSM-7"""
+    septets = bytearray()
+    for char in text:
+        code = _GSM7_CODES.get(char)
+        if code is not None:
+            septets.append(code)
+        elif char in GSM7_EXTENSION_CODES:
+            septets += bytes([GSM7_ESCAPE, GSM7_EXTENSION_CODES[char]])
+        else:
+            raise ValueError(f"{char!r} is not in the GSM-7 alphabet")
+    return bytes(septets)
+
+
+def decode_gsm7(data: bytes) -> str:
+    """Text of unpacked GSM 03.38 septets"""
+    chars = []
+    escaped = False
+    for code in data:
+        code &= 0x7F
+        if escaped:
+            chars.append(_GSM7_EXTENSION_CHARS.get(code, " "))
+            escaped = False
+        elif code == GSM7_ESCAPE:
+            escaped = True
+        else:
+            chars.append(GSM7_ALPHABET[code])
+    return "".join(chars)
+
+
+def _units(char: str, encoding: str) -> int:
+    if encoding == GSM7:
+        return 2 if char in GSM7_EXTENSION else 1
+    return 2 if ord(char) > 0xFFFF else 1
+
+
+def split_segments(text: str) -> List[str]:
+    """Split text into the parts a handset will reassemble, never splitting a character"""
+    encoding = GSM7 if is_gsm7(text) else UCS2
+    single, multi = SEGMENT_LIMITS[encoding]
+    if sum(_units(char, encoding) for char in text) <= single:
+        return [text] if text else []
+
+    parts = []
+    current = []
+    used = 0
+    for char in text:
+        units = _units(char, encoding)
+        if used + units > multi:
+            parts.append("".join(current))
+            current = []
+            used = 0
+        current.append(char)
+        used += units
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def segment_info(text: str) -> SegmentInfo:
+    """Work out the encoding and number of segments a message will be billed as"""
+    non_gsm = sorted({char for char in text if char not in GSM7_CHARACTERS})
+    encoding = UCS2 if non_gsm else GSM7
+    length = sum(_units(char, encoding) for char in text)
+    single, multi = SEGMENT_LIMITS[encoding]
+
+    if length <= single:
+        return SegmentInfo(encoding, length, 1 if text else 0, single, non_gsm)
+    return SegmentInfo(encoding, length, len(split_segments(text)), multi, non_gsm)
+
+
+def transliterate(text: str) -> str:
+    """Replace characters outside GSM-7 with close equivalents where one exists"""
+    if is_gsm7(text):
+        return text
+
+    result = []
+    for char in text:
+        if char in GSM7_CHARACTERS:
+            result.append(char)
+        elif char in TRANSLITERATIONS:
+            result.append(TRANSLITERATIONS[char])
+        else:
+            # Strip accents the GSM alphabet doesn't carry (á -> a, ł stays)
+            base = unicodedata.normalize("NFKD", char)
+            base = "".join(part for part in base if not unicodedata.combining(part))
+            result.append(base if base and is_gsm7(base) else char)
+    return "".join(result)
+
+
+def truncate_to_segments(text: str, max_segments: int, suffix: str = "...") -> str:
+    """Shorten text so it fits in at most max_segments parts"""
+    parts = split_segments(text)
+    if len(parts) <= max_segments:
+        return text
+
+    encoding = GSM7 if is_gsm7(text) else UCS2
+    single, multi = SEGMENT_LIMITS[encoding]
+    budget = (single if max_segments == 1 else multi * max_segments) - sum(
+        _units(char, encoding) for char in suffix
+    )
+    kept = []
+    used = 0
+    for char in text:
+        units = _units(char, encoding)
+        if used + units > budget:
+            break
+        kept.append(char)
+        used += units
+
+    # A double-width character at a part boundary can push the tail into one more part
+    while kept and len(split_segments("".join(kept).rstrip() + suffix)) > max_segments:
+        kept.pop()
+    return "".join(kept).rstrip() + suffix
@@ -1,7 +1,11 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from typing import Optional, Dict
 import logging
+import threading
 from config import settings
+from metrics import SMS_ATTEMPTS, SMS_SEGMENTS
+from services.sms_encoding import SegmentInfo, segment_info
 
 logger = logging.getLogger(__name__)
 
@@ -64,10 +68,15 @@ class TwilioSMSProvider(SMSProvider):
     
     def send_sms(self, recipient: str, message: str) -> Dict[str, any]:
         try:
+            options = {}
+            if settings.twilio_status_callback_url:
+                # Twilio only posts delivery status to a callback named on each message
+                options["status_callback"] = settings.twilio_status_callback_url
             msg = self.client.messages.create(
                 body=message,
                 from_=self.from_number,
-                to=recipient
+                to=recipient,
+                **options
             )
             logger.info(f"Twilio message SID: {msg.sid}")
             
@@ -130,43 +139,140 @@ class GSMModemSMSProvider(SMSProvider):
             return {'success': False, 'error': str(e)}
 
 
+class SMPPSMSProvider(SMSProvider):
+    """SMPP provider using a pool of persistent transceiver binds"""
+    
+    def __init__(self):
+        if not settings.smpp_host or not settings.smpp_system_id:
+            raise ValueError("SMPP credentials not configured")
+        
+        from services.smpp import SMPPClient
+        self.source_addr = settings.smpp_source_addr or ""
+        self.client = SMPPClient(
+            host=settings.smpp_host,
+            port=settings.smpp_port,
+            system_id=settings.smpp_system_id,
+            password=settings.smpp_password or "",
+            system_type=settings.smpp_system_type,
+            binds=settings.smpp_binds,
+            window=settings.smpp_window,
+            enquire_link_interval=settings.smpp_enquire_link_seconds,
+            response_timeout=settings.smpp_response_timeout_seconds,
+            on_deliver=self._handle_deliver
+        )
+        self.client.start()
+    
+    def send_sms(self, recipient: str, message: str) -> Dict[str, any]:
+        try:
+            message_id = self.client.submit(self.source_addr, recipient, message)
+            return {'success': True, 'message_id': message_id, 'status': 'submitted'}
+        except Exception as e:
+            logger.error(f"SMPP error: {e!r}")
+            return {'success': False, 'error': str(e) or repr(e)}
+    
+    def stop(self):
+        self.client.stop()
+    
+    def _handle_deliver(self, short_message):
+        """Forward delivery receipts to the receipt service (runs on the SMPP thread)"""
+        from services.smpp import parse_receipt
+        from services.receipt_service import receipt_service, DeliveryReceipt
+        
+        receipt = parse_receipt(short_message)
+        if receipt is None:
+            return
+        message_id, delivered, error = receipt
+        message_id, later_part = self.client.primary_message_id(message_id)
+        if later_part and delivered:
+            # A long message's notification follows the first part; only failed parts change it
+            return
+        receipt_service.add_threadsafe(DeliveryReceipt(
+            provider_message_id=message_id,
+            delivered=delivered,
+            received_at=datetime.utcnow(),
+            error=error
+        ))
+
+
 class SMSService:
     """Main SMS service that manages multiple providers"""
     
     def __init__(self):
-        self.providers = {}
-        self._initialize_providers()
+        # Providers import their SDKs (and SMPP binds), so they are built on first use
+        # or by warm_up() at startup rather than when this module is imported
+        self._providers: Optional[Dict[str, SMSProvider]] = None
+        self._init_lock = threading.Lock()
+    
+    @property
+    def providers(self) -> Dict[str, SMSProvider]:
+        if self._providers is None:
+            with self._init_lock:
+                if self._providers is None:
+                    providers = self._initialize_providers()
+                    # Unless providers were assigned explicitly meanwhile
+                    if self._providers is None:
+                        self._providers = providers
+        return self._providers
+    
+    @providers.setter
+    def providers(self, providers: Dict[str, SMSProvider]):
+        self._providers = providers
+    
+    def warm_up(self):
+        """Initialize providers ahead of the first send (blocking; run off the event loop)"""
+        return self.providers
     
-    def _initialize_providers(self):
+    def _initialize_providers(self) -> Dict[str, SMSProvider]:
         """Initialize available SMS providers"""
+        providers = {}
         # Try to initialize Africa's Talking
         try:
-            self.providers['africastalking'] = AfricasTalkingSMSProvider()
+            providers['africastalking'] = AfricasTalkingSMSProvider()
             logger.info("Africa's Talking provider initialized")
         except Exception as e:
             logger.warning(f"Africa's Talking not available: {e}")
         
         # Try to initialize Twilio
         try:
-            self.providers['twilio'] = TwilioSMSProvider()
+            providers['twilio'] = TwilioSMSProvider()
             logger.info("Twilio provider initialized")
         except Exception as e:
             logger.warning(f"Twilio not available: {e}")
         
         # Try to initialize GSM Modem
         try:
-            self.providers['gsm_modem'] = GSMModemSMSProvider()
+            providers['gsm_modem'] = GSMModemSMSProvider()
             logger.info("GSM Modem provider initialized")
         except Exception as e:
             logger.warning(f"GSM Modem not available: {e}")
+        
+        # Try to initialize SMPP
+        try:
+            providers['smpp'] = SMPPSMSProvider()
+            logger.info("SMPP provider initialized")
+        except Exception as e:
+            logger.warning(f"SMPP not available: {e}")
+        
+        return providers
     
-    def send_sms(self, recipient: str, message: str, provider: str = 'africastalking') -> Dict[str, any]:
+    def send_sms(
+        self,
+        recipient: str,
+        message: str,
+        provider: str = 'africastalking',
+        segments: Optional[SegmentInfo] = None
+    ) -> Dict[str, any]:
         """Send SMS using specified provider with fallback"""
+        # Callers sending one message to many recipients can pass the precomputed info
+        segments = segments or segment_info(message)
         
         # Try primary provider
         if provider in self.providers:
             result = self.providers[provider].send_sms(recipient, message)
+            SMS_ATTEMPTS.labels(provider, 'success' if result['success'] else 'failure').inc()
             if result['success']:
+                SMS_SEGMENTS.labels(provider, segments.encoding).inc(segments.segments)
+                result['segments'] = segments.segments
                 return result
             logger.warning(f"Provider {provider} failed, trying fallback")
         
@@ -175,12 +281,21 @@ class SMSService:
             if fallback_provider_name != provider:
                 logger.info(f"Trying fallback provider: {fallback_provider_name}")
                 result = fallback_provider.send_sms(recipient, message)
+                SMS_ATTEMPTS.labels(fallback_provider_name, 'success' if result['success'] else 'failure').inc()
                 if result['success']:
+                    SMS_SEGMENTS.labels(fallback_provider_name, segments.encoding).inc(segments.segments)
+                    result['segments'] = segments.segments
                     result['fallback_provider'] = fallback_provider_name
                     return result
         
         return {'success': False, 'error': 'All providers failed'}
     
+    def stop(self):
+        """Release persistent provider connections"""
+        for provider in (self._providers or {}).values():
+            if hasattr(provider, 'stop'):
+                provider.stop()
+    
     def get_available_providers(self) -> list:
         """Get list of available providers"""
         return list(self.providers.keys())
@@ -0,0 +1,37 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """Times the phases of application startup (imports, then each lifespan step)"""
+
+    def __init__(self):
+        self.phases: List[Tuple[str, float]] = []
+
+    def record(self, name: str, seconds: float):
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def summary(self) -> Dict[str, float]:
+        """Milliseconds per phase, in the order they ran"""
+        return {name: round(seconds * 1000, 1) for name, seconds in self.phases}
+
+    def log(self, title: str = "Startup"):
+        total = sum(seconds for _, seconds in self.phases)
+        breakdown = ", ".join(f"{name} {ms:g} ms" for name, ms in self.summary().items())
+        logger.info(f"{title} took {total * 1000:.0f} ms: {breakdown}")
+
+
+# Singleton instance
+startup_report = StartupReport()
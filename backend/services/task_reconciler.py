@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import exists
+
+from config import settings
+from database import SessionLocal
+from metrics import RECONCILED_TASKS
+from models import Task, TaskTombstone
+from services.change_tracker import current_task_change_version
+from services.scheduler_service import task_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class TaskReconciler:
+    """
+    Applies task changes committed by other processes (or directly in the database) to the schedule
+
+    Versions are taken without a lock, so a transaction can commit a version below
+    one already seen. Each pass therefore re-reads from the feed's high version as
+    it was settle_seconds ago; re-applying an unchanged task is a no-op.
+    """
+
+    def __init__(self):
+        self.scheduler = AsyncIOScheduler()
+        self.interval_seconds = settings.reconcile_interval_seconds
+        self.settle_seconds = settings.reconcile_settle_seconds
+        self._lock: Optional[asyncio.Lock] = None
+        self._seen: Deque[Tuple[float, int]] = deque()  # (monotonic time, high version) per pass
+
+    def start(self):
+        """Start polling the task change feed"""
+        if self.interval_seconds > 0 and not self.scheduler.running:
+            self.scheduler.add_job(
+                self.reconcile,
+                trigger=IntervalTrigger(seconds=self.interval_seconds),
+                id='reconcile_tasks',
+                replace_existing=True
+            )
+            self.scheduler.start()
+            logger.info("Task reconciler started")
+
+    def stop(self):
+        """Stop polling the task change feed"""
+        if self.scheduler.running:
+            self.scheduler.shutdown()
+            logger.info("Task reconciler stopped")
+
+    def _settled_version(self, watermark: int) -> int:
+        """The high version seen settle_seconds ago; every version at or below it has committed"""
+        now = time.monotonic()
+        if not self._seen:
+            self._seen.append((now, watermark))
+        while len(self._seen) > 1 and self._seen[1][0] <= now - self.settle_seconds:
+            self._seen.popleft()
+        return self._seen[0][1]
+
+    def _load_changes(self, since: int) -> Tuple[int, List[Task], List[int]]:
+        """Tasks and tombstones with versions above since, up to the current version"""
+        db = SessionLocal()
+        try:
+            high = current_task_change_version(db)
+            if high <= since:
+                return high, [], []
+            tasks = db.query(Task).filter(
+                Task.change_version > since,
+                Task.change_version <= high
+            ).all()
+            # A tombstone whose id has a live row again was followed by id reuse
+            deleted_ids = [
+                task_id for (task_id,) in db.query(TaskTombstone.task_id).filter(
+                    TaskTombstone.change_version > since,
+                    TaskTombstone.change_version <= high,
+                    ~exists().where(Task.id == TaskTombstone.task_id)
+                )
+            ]
+            db.expunge_all()
+            return high, tasks, deleted_ids
+        finally:
+            db.close()
+
+    async def reconcile(self):
+        """Apply one batch of changes from the feed and advance the watermark"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            since = self._settled_version(task_scheduler.change_watermark)
+            loop = asyncio.get_running_loop()
+            high, tasks, deleted_ids = await loop.run_in_executor(None, self._load_changes, since)
+            self._seen.append((time.monotonic(), high))
+            if high <= since:
+                return
+
+            counts = task_scheduler.apply_changes(tasks, deleted_ids)
+            task_scheduler.change_watermark = max(task_scheduler.change_watermark, high)
+
+            for action, count in counts.items():
+                if count:
+                    RECONCILED_TASKS.labels(action).inc(count)
+            if any(counts.values()):
+                logger.info(
+                    f"Reconciled schedule to change version {high}: "
+                    f"{counts['added']} added, {counts['updated']} updated, {counts['removed']} removed"
+                )
+
+
+# Singleton instance
+task_reconciler = TaskReconciler()
@@ -0,0 +1,58 @@
+from services.adaptive_polling import AdaptivePoller
+
+PATHS = ["game.score"]
+
+
+def _poller():
+    poller = AdaptivePoller()
+    poller.backoff_factor = 2.0
+    return poller
+
+
+def _payload(score, updated_at="12:00"):
+    return {"game": {"score": score}, "updated_at": updated_at}
+
+
+def test_first_observation_keeps_the_minimum_interval():
+    poller = _poller()
+    assert poller.observe(1, 10, 300, _payload("70-72"), PATHS) is None
+    assert poller.interval(1, 10, 300) == 10
+
+
+def test_unchanged_data_backs_off_up_to_the_maximum():
+    poller = _poller()
+    poller.observe(1, 10, 300, _payload("70-72"), PATHS)
+
+    intervals = [poller.observe(1, 10, 300, _payload("70-72"), PATHS) for _ in range(5)]
+    assert intervals == [20, 40, 80, 160, 300]
+    # Already at the maximum: nothing changes
+    assert poller.observe(1, 10, 300, _payload("70-72"), PATHS) is None
+    assert poller.interval(1, 10, 300) == 300
+
+
+def test_a_change_in_a_referenced_path_resets_to_the_minimum():
+    poller = _poller()
+    poller.observe(1, 10, 300, _payload("70-72"), PATHS)
+    poller.observe(1, 10, 300, _payload("70-72"), PATHS)
+    poller.observe(1, 10, 300, _payload("70-72"), PATHS)
+    assert poller.interval(1, 10, 300) == 40
+
+    assert poller.observe(1, 10, 300, _payload("72-72"), PATHS) == 10
+    assert poller.interval(1, 10, 300) == 10
+
+
+def test_a_change_in_an_unreferenced_field_does_not_reset():
+    poller = _poller()
+    poller.observe(1, 10, 300, _payload("70-72", updated_at="12:00"), PATHS)
+    assert poller.observe(1, 10, 300, _payload("70-72", updated_at="12:01"), PATHS) == 20
+    assert poller.observe(1, 10, 300, _payload("70-72", updated_at="12:02"), PATHS) == 40
+
+
+def test_a_failed_fetch_backs_off_and_keeps_the_last_fingerprint():
+    poller = _poller()
+    poller.observe(1, 10, 300, _payload("70-72"), PATHS)
+
+    assert poller.observe(1, 10, 300, None, PATHS) == 20
+    assert poller.observe(1, 10, 300, None, PATHS) == 40
+    # The same data after the outage is still no change
+    assert poller.observe(1, 10, 300, _payload("70-72"), PATHS) == 80
@@ -0,0 +1,46 @@
+from database import SessionLocal
+from models import User
+from services.password_hasher import get_hash_rounds, password_hasher
+
+
+def _login(client, username, password):
+    return client.post("/api/auth/login", data={"username": username, "password": password})
+
+
+def test_register_and_login(client):
+    response = client.post("/api/auth/register", json={
+        "email": "auth@example.com", "username": "auth", "password": "secret123"
+    })
+    assert response.status_code == 201
+    assert response.json()["username"] == "auth"
+
+    duplicate = client.post("/api/auth/register", json={
+        "email": "auth@example.com", "username": "other", "password": "secret123"
+    })
+    assert duplicate.status_code == 400
+    assert "Email already registered" in duplicate.json()["detail"]
+
+    assert _login(client, "auth", "wrong-password").status_code == 401
+    assert _login(client, "nobody", "secret123").status_code == 401
+    token = _login(client, "auth", "secret123").json()["access_token"]
+    me = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.json()["email"] == "auth@example.com"
+
+
+def test_login_upgrades_hash_work_factor(client):
+    client.post("/api/auth/register", json={
+        "email": "rehash@example.com", "username": "rehash", "password": "secret123"
+    })
+    rounds = password_hasher.rounds
+    password_hasher.rounds = rounds + 1
+    try:
+        assert _login(client, "rehash", "secret123").status_code == 200
+    finally:
+        password_hasher.rounds = rounds
+
+    db = SessionLocal()
+    try:
+        stored = db.query(User.hashed_password).filter(User.username == "rehash").scalar()
+    finally:
+        db.close()
+    assert get_hash_rounds(stored) == rounds + 1
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from services.condition_evaluator import ConditionEvaluator
+
+URL = "https://example.com/feed.json"
+
+
+def test_concurrent_fetches_share_one_request():
+    evaluator = ConditionEvaluator()
+    requests = []
+
+    async def request(source_link, projector=None):
+        requests.append(source_link)
+        await asyncio.sleep(0.01)
+        return b'{"total": 3}', 12
+
+    evaluator._request = request
+
+    async def fetch_twice():
+        return await asyncio.gather(evaluator._fetch_body(URL), evaluator._fetch_body(URL))
+
+    assert asyncio.run(fetch_twice()) == [(b'{"total": 3}', 12)] * 2
+    assert requests == [URL]
+
+
+def test_waiters_do_not_hang_when_the_leading_fetch_is_cancelled():
+    evaluator = ConditionEvaluator()
+    requests = []
+    leader_started = None
+
+    async def request(source_link, projector=None):
+        requests.append(source_link)
+        if len(requests) == 1:
+            leader_started.set()
+            await asyncio.sleep(60)
+        return b"{}", 2
+
+    evaluator._request = request
+
+    async def cancel_leader():
+        nonlocal leader_started
+        leader_started = asyncio.Event()
+        leader = asyncio.create_task(evaluator._fetch_body(URL))
+        await leader_started.wait()
+        waiter = asyncio.create_task(evaluator._fetch_body(URL))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.wait_for(waiter, timeout=5)
+
+    assert asyncio.run(cancel_leader()) == (b"{}", 2)
+    assert len(requests) == 2
+    assert evaluator._in_flight == {}
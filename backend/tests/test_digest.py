@@ -0,0 +1,76 @@
+import asyncio
+
+from database import SessionLocal
+from models import User, Task, Notification, DeliveryStatus
+from services import digest_service as digest_module
+from services.digest_service import Digest, DigestItem, DigestService, pack_messages
+from services.sms_encoding import segment_info
+
+
+def test_pack_messages_merges_only_when_it_costs_no_extra_segments():
+    bundles = pack_messages(["Lakers 70 - Bulls 72", "Heat 50 - Nets 48", "Lakers 70 - Bulls 72"])
+    assert bundles == [["Lakers 70 - Bulls 72", "Heat 50 - Nets 48"]]
+
+    # A UCS-2 message would turn the GSM-7 bundle into 70-character parts
+    long_gsm = "a" * 150
+    bundles = pack_messages([long_gsm, "Привет"])
+    assert bundles == [[long_gsm], ["Привет"]]
+    assert segment_info(long_gsm + "\nПривет").segments == 3
+
+
+def test_flushes_started_by_window_timers_are_kept_and_awaited_on_shutdown():
+    service = DigestService()
+    sent = []
+
+    async def send(digest):
+        await asyncio.sleep(0.05)
+        sent.append((digest.recipient, [item.message for item in digest.items]))
+
+    service._send = send
+
+    async def scenario():
+        service.add(1, 10, "+254700000001", "first", window_seconds=0.01)
+        service.add(1, 11, "+254700000002", "second", window_seconds=60)
+        await asyncio.sleep(0.02)
+        # The first window closed: its flush runs in a tracked task
+        assert len(service._flushes) == 1
+        await service.flush_all()
+        assert not service._flushes
+
+    asyncio.run(scenario())
+    assert sorted(sent) == [("+254700000001", ["first"]), ("+254700000002", ["second"])]
+
+
+def test_digest_rows_are_committed_as_pending_before_sending(client, monkeypatch):
+    db = SessionLocal()
+    try:
+        user = User(email="digest@example.com", username="digest", hashed_password="x")
+        db.add(user)
+        db.flush()
+        task = Task(name="Digest", recipients=[], user_id=user.id)
+        db.add(task)
+        db.commit()
+        user_id, task_id = user.id, task.id
+    finally:
+        db.close()
+
+    def statuses():
+        db = SessionLocal()
+        try:
+            return sorted(status for (status,) in db.query(Notification.status).filter(Notification.task_id == task_id))
+        finally:
+            db.close()
+
+    seen_while_sending = []
+
+    def send_sms(recipient, text, provider, segments):
+        seen_while_sending.append(statuses())
+        return {"success": True, "message_id": "SM-digest"}
+
+    monkeypatch.setattr(digest_module.sms_service, "send_sms", send_sms)
+    digest = Digest(user_id, "+254700000003", 0.0, [DigestItem(task_id, "first"), DigestItem(task_id, "second")])
+    asyncio.run(DigestService()._send(digest))
+
+    # Both messages went out as one SMS, with their rows already saved
+    assert seen_while_sending == [[DeliveryStatus.PENDING, DeliveryStatus.PENDING]]
+    assert statuses() == [DeliveryStatus.SENT, DeliveryStatus.SENT]
@@ -0,0 +1,67 @@
+import asyncio
+
+from services.event_bus import EventBus
+
+
+def _task_run(task_id, status):
+    return {"type": "task_run", "id": task_id, "status": status}
+
+
+def _notification(notification_id, status):
+    return {"type": "notification", "id": notification_id, "status": status}
+
+
+def test_events_coalesce_per_type_and_id():
+    async def run():
+        bus = EventBus()
+        subscription = bus.subscribe(1)
+        bus.publish(1, _task_run(1, "running"))
+        bus.publish(1, _notification(1, "pending"))
+        bus.publish(1, _task_run(1, "completed"))
+        bus.publish(1, _notification(1, "sent"))
+        bus.publish(1, _task_run(2, "running"))
+        return await subscription.next_batch(window=0, timeout=1)
+
+    # Only the latest event per (type, id), ordered by its latest update; a task and a
+    # notification sharing an id stay separate
+    assert asyncio.run(run()) == [_task_run(1, "completed"), _notification(1, "sent"), _task_run(2, "running")]
+
+
+def test_updates_within_the_window_join_the_batch():
+    async def run():
+        bus = EventBus()
+        subscription = bus.subscribe(1)
+
+        async def publish_later():
+            bus.publish(1, _notification(7, "pending"))
+            await asyncio.sleep(0.02)
+            bus.publish(1, _notification(7, "sent"))
+
+        batch, _ = await asyncio.gather(subscription.next_batch(window=0.1, timeout=1), publish_later())
+        empty = await subscription.next_batch(window=0, timeout=0.01)
+        return batch, empty
+
+    batch, empty = asyncio.run(run())
+    assert batch == [_notification(7, "sent")]
+    assert empty == []
+
+
+def test_slow_subscribers_drop_their_oldest_updates_and_users_are_isolated():
+    async def run():
+        bus = EventBus()
+        bus.max_pending = 2
+        slow = bus.subscribe(1)
+        other_user = bus.subscribe(2)
+        for notification_id in range(3):
+            bus.publish(1, _notification(notification_id, "sent"))
+        bus.publish(1, _notification(2, "delivered"))  # Replaces a pending event; nothing dropped
+        batch = await slow.next_batch(window=0, timeout=1)
+        other = await other_user.next_batch(window=0, timeout=0.01)
+        bus.unsubscribe(slow)
+        return batch, slow.dropped, other, bus.has_subscribers(1)
+
+    batch, dropped, other, subscribed = asyncio.run(run())
+    assert batch == [_notification(1, "sent"), _notification(2, "delivered")]
+    assert dropped == 1
+    assert other == []
+    assert not subscribed
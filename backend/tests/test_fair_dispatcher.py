@@ -0,0 +1,135 @@
+import asyncio
+
+from services.fair_dispatcher import FairDispatcher
+
+
+def _dispatcher(capacity=1, user_cap=0, urgent_reserved=0):
+    dispatcher = FairDispatcher("test", capacity, user_cap, urgent_reserved)
+    dispatcher.quantum = 1.0
+    return dispatcher
+
+
+async def _grant_order(dispatcher, requests, held=1):
+    """Queue requests behind held busy slots, free those, and return who got a slot in which order"""
+    order = []
+
+    async def send(user_id, task_id=None, cost=1, weight=None, lane="normal"):
+        async with dispatcher.slot(user_id, task_id, cost, weight, lane=lane):
+            order.append((user_id, task_id) if task_id is not None else user_id)
+
+    for _ in range(held):
+        await dispatcher.acquire("blocker")
+    senders = [asyncio.create_task(send(*request)) for request in requests]
+    await asyncio.sleep(0)
+    for _ in range(held):
+        dispatcher.release("blocker")
+    await asyncio.gather(*senders)
+    assert dispatcher.in_use == 0 and dispatcher.waiting == 0
+    return order
+
+
+def test_idle_dispatcher_grants_immediately():
+    async def run():
+        dispatcher = _dispatcher(capacity=2)
+        await asyncio.wait_for(dispatcher.acquire(1), timeout=1)
+        await asyncio.wait_for(dispatcher.acquire(2), timeout=1)
+        return dispatcher.in_use, dispatcher.waiting
+
+    assert asyncio.run(run()) == (2, 0)
+
+
+def test_users_share_slots_in_proportion_to_their_weight():
+    requests = [(1, None, 1, 2.0)] * 6 + [(2, None, 1, 1.0)] * 6
+    order = asyncio.run(_grant_order(_dispatcher(), requests))
+    # Weight 2 earns two sends per turn; the queue that arrived first doesn't go first in full
+    assert order[:9] == [1, 1, 2, 1, 1, 2, 1, 1, 2]
+
+
+def test_costly_requests_spend_more_credit():
+    # User 1 sends 3-segment messages, user 2 single ones: user 2 sends three for each of user 1's
+    requests = [(1, None, 3)] * 2 + [(2, None, 1)] * 6
+    order = asyncio.run(_grant_order(_dispatcher(), requests))
+    assert order == [2, 2, 1, 2, 2, 2, 1, 2]
+
+
+def test_a_users_tasks_take_turns():
+    requests = [(1, 10)] * 3 + [(1, 20)] * 3
+    order = asyncio.run(_grant_order(_dispatcher(), requests))
+    assert [task_id for _, task_id in order] == [10, 20, 10, 20, 10, 20]
+
+
+def test_user_cap_leaves_slots_for_other_users():
+    async def run():
+        dispatcher = _dispatcher(capacity=3, user_cap=1)
+        await dispatcher.acquire(1)
+        second = asyncio.create_task(dispatcher.acquire(1))
+        other = asyncio.create_task(dispatcher.acquire(2))
+        await asyncio.sleep(0)
+        granted = (second.done(), other.done())
+        dispatcher.release(1)
+        await asyncio.wait_for(second, timeout=1)
+        return granted, dispatcher.in_use
+
+    assert asyncio.run(run()) == ((False, True), 2)
+
+
+def test_urgent_lane_goes_first_and_keeps_its_reserved_slots():
+    async def run():
+        dispatcher = _dispatcher(capacity=3, urgent_reserved=1)
+        await dispatcher.acquire(1, lane="bulk")
+        await dispatcher.acquire(1, lane="bulk")
+        # Bulk may not take the reserved slot, even when it is free
+        bulk = asyncio.create_task(dispatcher.acquire(1, lane="bulk"))
+        await asyncio.sleep(0)
+        bulk_waited = not bulk.done()
+        await asyncio.wait_for(dispatcher.acquire(2, lane="urgent"), timeout=1)
+
+        # A freed slot goes to the urgent request that queued after the bulk one
+        urgent = asyncio.create_task(dispatcher.acquire(2, lane="urgent"))
+        await asyncio.sleep(0)
+        dispatcher.release(1, lane="bulk")
+        await asyncio.wait_for(urgent, timeout=1)
+        return bulk_waited, bulk.done(), dispatcher.waiting_in("bulk")
+
+    assert asyncio.run(run()) == (True, False, 1)
+
+
+def test_cancelled_waiters_are_skipped():
+    async def run():
+        dispatcher = _dispatcher()
+        await dispatcher.acquire(1)
+        gave_up = asyncio.create_task(dispatcher.acquire(2))
+        waiting = asyncio.create_task(dispatcher.acquire(3))
+        await asyncio.sleep(0)
+        gave_up.cancel()
+        await asyncio.sleep(0)
+        dispatcher.release(1)
+        await asyncio.wait_for(waiting, timeout=1)
+        return dispatcher.in_use, dispatcher.waiting_by_user()
+
+    assert asyncio.run(run()) == (1, {})
+
+
+def test_max_waits_are_per_user_and_reset_when_taken():
+    async def run():
+        dispatcher = _dispatcher()
+        await dispatcher.acquire("blocker")
+        granted = asyncio.create_task(dispatcher.acquire(1))
+        queued = asyncio.create_task(dispatcher.acquire(2))
+        await asyncio.sleep(0.05)
+        dispatcher.release("blocker")
+        await granted
+        await asyncio.sleep(0.02)
+        first = dispatcher.take_max_waits()
+        second = dispatcher.take_max_waits()
+        dispatcher.release(1)
+        await queued
+        dispatcher.release(2)
+        return first, second, dispatcher.take_max_waits()
+
+    first, second, after = asyncio.run(run())
+    assert set(first) == {1, 2}
+    assert 0.05 <= first[1] < first[2]
+    # User 1 got its slot before the first take; user 2 is still waiting, and longer
+    assert set(second) == {2} and second[2] >= first[2]
+    assert set(after) == {2} and after[2] >= second[2]
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.triggers.cron import CronTrigger
+
+from services.fire_calendar import FireCalendar
+
+START = datetime(2030, 1, 1, tzinfo=timezone.utc)
+HALF_HOUR = timedelta(minutes=30)
+
+
+def _task(task_id, cron=None, human=None, next_run=None):
+    return (task_id, cron, human, None, None, next_run)
+
+
+def test_tasks_sharing_a_cron_schedule_fire_together_in_order():
+    tasks = [_task(1, cron="0 9 * * *"), _task(2, cron="30 9 * * *"), _task(3, cron="0 9 * * *")]
+    nine = CronTrigger.from_crontab("0 9 * * *").get_next_fire_time(None, START)
+
+    timeline = FireCalendar().timeline(tasks, START, limit=6)
+
+    assert timeline == [
+        (nine, 1), (nine, 3), (nine + HALF_HOUR, 2),
+        (nine + timedelta(days=1), 1), (nine + timedelta(days=1), 3), (nine + timedelta(days=1, minutes=30), 2)
+    ]
+
+
+def test_interval_tasks_merge_only_when_their_phase_matches():
+    anchor = START.replace(tzinfo=None)  # Stored next_run values are naive UTC
+    tasks = [
+        _task(1, human="every 30 minutes", next_run=anchor),
+        _task(2, human="every 30 minutes", next_run=anchor),
+        _task(3, human="every 30 minutes", next_run=anchor + timedelta(minutes=10)),
+    ]
+
+    timeline = FireCalendar().timeline(tasks, START, limit=6)
+
+    ten = timedelta(minutes=10)
+    assert timeline == [
+        (START, 1), (START, 2), (START + ten, 3),
+        (START + HALF_HOUR, 1), (START + HALF_HOUR, 2), (START + HALF_HOUR + ten, 3)
+    ]
+
+
+def test_a_past_interval_anchor_is_advanced_to_the_window():
+    tasks = [_task(1, human="every 1 hour", next_run=(START - timedelta(hours=5, minutes=45)).replace(tzinfo=None))]
+
+    timeline = FireCalendar().timeline(tasks, START, limit=2)
+
+    assert timeline == [(START + timedelta(minutes=15), 1), (START + timedelta(hours=1, minutes=15), 1)]
+
+
+def test_timeline_stops_at_end_and_limit_and_skips_unscheduled_tasks():
+    tasks = [
+        _task(1, human="every 30 minutes", next_run=START.replace(tzinfo=None)),
+        _task(2, human="every 30 minutes", next_run=START.replace(tzinfo=None)),
+        _task(3),  # Push only
+        _task(4, cron="not a cron", human="whenever"),
+    ]
+    calendar = FireCalendar()
+
+    assert calendar.timeline(tasks, START, end=START + timedelta(hours=1), limit=100) == [
+        (START, 1), (START, 2), (START + HALF_HOUR, 1), (START + HALF_HOUR, 2)
+    ]
+    assert calendar.timeline(tasks, START, limit=3) == [(START, 1), (START, 2), (START + HALF_HOUR, 1)]
@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Request
+
+from config import settings
+from database import SessionLocal
+from models import User, Task
+from routers.webhooks import _read_body
+from services.ingest_service import IngestService, ingest_service, new_ingest_token
+from services.scheduler_service import task_scheduler
+
+
+@pytest.fixture
+def ingest_task(client, monkeypatch):
+    """A task with a push token; pushes are recorded instead of running it"""
+    token, token_hash = new_ingest_token()
+    db = SessionLocal()
+    try:
+        user = User(email="ingest@example.com", username="ingest", hashed_password="x")
+        db.add(user)
+        db.flush()
+        task = Task(name="Ingest", recipients=[], user_id=user.id, ingest_token_hash=token_hash)
+        db.add(task)
+        db.commit()
+        task_id = task.id
+    finally:
+        db.close()
+
+    submitted = []
+    monkeypatch.setattr(ingest_service, "submit", lambda *args: submitted.append(args) or False)
+    yield task_id, token, submitted
+
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.id == task_id).delete(synchronize_session=False)
+        db.query(User).filter(User.username == "ingest").delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_pushes_need_the_tasks_token(client, ingest_task):
+    task_id, token, submitted = ingest_task
+    url = f"/api/webhooks/tasks/{task_id}"
+
+    assert client.post(url, json={"price": 1}).status_code == 403
+    assert client.post(url, json={"price": 1}, headers={"X-Ingest-Token": token + "x"}).status_code == 403
+    assert client.post(f"/api/webhooks/tasks/{task_id + 1000}", json={}, headers={"X-Ingest-Token": token}).status_code == 403
+
+    response = client.post(url, json={"price": 1}, headers={"X-Ingest-Token": token})
+    assert response.status_code == 202
+    assert client.post(url, params={"token": token}, json={"price": 2}).status_code == 202
+    assert [payload for _, payload, _ in submitted] == [{"price": 1}, {"price": 2}]
+
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.id == task_id).update({"is_active": False})
+        db.commit()
+    finally:
+        db.close()
+    assert client.post(url, json={"price": 3}, headers={"X-Ingest-Token": token}).status_code == 409
+
+
+def test_oversized_pushes_are_refused_without_reading_them_whole(client, ingest_task, monkeypatch):
+    task_id, token, submitted = ingest_task
+    url = f"/api/webhooks/tasks/{task_id}"
+    monkeypatch.setattr(settings, "ingest_max_body_bytes", 64)
+    body = b'{"text": "' + b"x" * 100 + b'"}'
+
+    # Declared too large: refused before the token is even checked
+    assert client.post(url, content=body).status_code == 413
+
+    # Chunked, so no Content-Length: refused once the stream passes the limit
+    def chunks():
+        for start in range(0, len(body), 16):
+            yield body[start:start + 16]
+
+    assert client.post(url, content=chunks(), headers={"X-Ingest-Token": token}).status_code == 413
+    assert submitted == []
+
+
+def test_body_reading_stops_at_the_limit():
+    received = []
+
+    async def receive():
+        received.append(16)
+        return {"type": "http.request", "body": b"x" * 16, "more_body": len(received) < 1000}
+
+    request = Request({"type": "http", "method": "POST", "headers": []}, receive)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(_read_body(request, 64))
+    assert error.value.status_code == 413
+    assert sum(received) == 80
+
+
+def test_bursts_are_debounced_into_one_run_on_the_merged_payload(monkeypatch):
+    runs = []
+
+    async def run_with_payload(task_id, payload, size):
+        runs.append((task_id, payload, size))
+
+    monkeypatch.setattr(task_scheduler, "run_with_payload", run_with_payload)
+
+    async def burst():
+        service = IngestService()
+        service.debounce_seconds = 0.1
+        coalesced = [
+            service.submit(1, {"price": 10, "currency": "KES"}, 30),
+            service.submit(1, {"price": 12}, 12),
+            service.submit(2, {"level": 3}, 10),
+        ]
+        assert service.pending == 2 and runs == []
+        await asyncio.sleep(0.04)
+        coalesced.append(service.submit(1, {"price": 14}, 12))
+        await asyncio.sleep(0.08)
+        assert runs == [(2, {"level": 3}, 10)]  # Task 1's timer restarted with the last push
+        await asyncio.sleep(0.1)
+        return coalesced, service.pending
+
+    coalesced, pending = asyncio.run(burst())
+    assert coalesced == [False, True, False, True]
+    assert pending == 0
+    assert sorted(runs) == [(1, {"price": 14, "currency": "KES"}, 54), (2, {"level": 3}, 10)]
+
+
+def test_a_steady_stream_still_runs_after_the_max_delay(monkeypatch):
+    runs = []
+
+    async def run_with_payload(task_id, payload, size):
+        runs.append(asyncio.get_running_loop().time())
+
+    monkeypatch.setattr(task_scheduler, "run_with_payload", run_with_payload)
+
+    async def stream():
+        service = IngestService()
+        service.debounce_seconds = 0.05
+        service.max_delay_seconds = 0.1
+        service.max_pending = 1
+        started = asyncio.get_running_loop().time()
+        for n in range(8):
+            service.submit(1, {"n": n}, 1)
+            assert service.is_full(2) and not service.is_full(1)
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.06)
+        return started
+
+    started = asyncio.run(stream())
+    assert len(runs) == 2
+    assert runs[0] - started < 0.15
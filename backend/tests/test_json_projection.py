@@ -0,0 +1,52 @@
+import orjson
+import pytest
+
+from services.json_projection import JSONProjector, minimal_paths, project
+
+DOCUMENT = orjson.dumps({
+    "status": "live",
+    "home_score": 71,
+    "odds": 1.85,
+    "match": {"venue": {"city": "Nairobi", "capacity": 60000}, "teams": ["A", "B"]},
+    "events": [{"minute": 12, "type": "goal"}] * 100,
+    "total": 143
+})
+
+
+def test_minimal_paths_drops_fields_under_a_requested_parent():
+    assert minimal_paths(["match", "match.venue.city", "status", "", "statuses"]) == {"match", "status", "statuses"}
+
+
+def test_project_keeps_only_the_requested_paths():
+    data = project(DOCUMENT, ["status", "match.venue.city", "total", "missing", "match.missing"])
+    assert data == {"status": "live", "match": {"venue": {"city": "Nairobi"}}, "total": 143}
+
+
+def test_requested_containers_are_built_whole():
+    data = project(DOCUMENT, ["match.venue", "match.teams", "events"])
+    assert data["match"] == {"venue": {"city": "Nairobi", "capacity": 60000}, "teams": ["A", "B"]}
+    assert len(data["events"]) == 100 and data["events"][0] == {"minute": 12, "type": "goal"}
+
+
+def test_numbers_are_parsed_as_floats_not_decimals():
+    data = project(DOCUMENT, ["odds", "home_score"])
+    assert type(data["odds"]) is float and data["odds"] == 1.85
+    assert type(data["home_score"]) is int
+
+
+def test_chunked_feed_matches_a_full_parse_and_reports_completion():
+    projector = JSONProjector(["status", "match.venue.city"])
+    fed = 0
+    while not projector.complete:
+        projector.feed(DOCUMENT[fed:fed + 7])
+        fed += 7
+    # Both fields come before the large events array, which is never read
+    assert fed < DOCUMENT.index(b'"events"') + 7
+    assert projector.data == {"status": "live", "match": {"venue": {"city": "Nairobi"}}}
+
+
+def test_truncated_document_raises_on_close():
+    projector = JSONProjector(["total"])
+    projector.feed(DOCUMENT[:-10])
+    with pytest.raises(Exception):
+        projector.close()
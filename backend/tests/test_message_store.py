@@ -0,0 +1,55 @@
+from database import SessionLocal
+from models import MessageBody
+from services.message_store import body_hash, message_store
+
+
+def _stored(text):
+    db = SessionLocal()
+    try:
+        return db.query(MessageBody.id).filter(MessageBody.hash == body_hash(text)).scalar()
+    finally:
+        db.close()
+
+
+def test_body_is_saved_and_cached_with_the_callers_commit(client):
+    text = "Lakers 70 - Bulls 72. Total: 142"
+    db = SessionLocal()
+    try:
+        body_id = message_store.body_id(db, text)
+        assert message_store.body_id(db, text) == body_id
+        assert message_store._cached(body_hash(text)) is None
+        db.commit()
+    finally:
+        db.close()
+
+    assert _stored(text) == body_id
+    assert message_store._cached(body_hash(text)) == body_id
+
+
+def test_rolled_back_body_is_neither_saved_nor_cached(client):
+    text = "Rolled back with its notifications"
+    db = SessionLocal()
+    try:
+        message_store.body_id(db, text)
+        db.rollback()
+    finally:
+        db.close()
+
+    assert _stored(text) is None
+    assert message_store._cached(body_hash(text)) is None
+
+
+def test_body_stored_by_another_writer_is_reused(client):
+    text = "Stored by another run"
+    other = SessionLocal()
+    first = SessionLocal()
+    try:
+        existing = message_store.body_id(other, text)
+        other.commit()
+        message_store.forget()
+        assert message_store.body_id(first, text) == existing
+        first.commit()
+    finally:
+        other.close()
+        first.close()
+    assert _stored(text) == existing
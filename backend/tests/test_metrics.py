@@ -0,0 +1,60 @@
+from database import SessionLocal
+from metrics import TOP_WAITING_USERS, latest_metrics
+from models import Notification, DeliveryStatus, SMSProvider
+from services.backlog_monitor import backlog_monitor
+from services.fair_dispatcher import send_dispatcher
+
+
+def _gauge(body: str, line_prefix: str) -> float:
+    line = next(line for line in body.splitlines() if line.startswith(line_prefix))
+    return float(line.rsplit(" ", 1)[1])
+
+
+def test_backlog_gauges_serve_counts_from_the_last_refresh(client):
+    client.portal.call(backlog_monitor.refresh)
+    queued = _gauge(client.get("/metrics").text, 'task2sms_outbox_depth{queue="queued_notifications"}')
+
+    db = SessionLocal()
+    try:
+        notification = Notification(
+            recipient="+254712345678", provider=SMSProvider.AFRICASTALKING, status=DeliveryStatus.QUEUED
+        )
+        db.add(notification)
+        db.commit()
+
+        # Not counted until the next refresh
+        body = client.get("/metrics").text
+        assert _gauge(body, 'task2sms_outbox_depth{queue="queued_notifications"}') == queued
+        client.portal.call(backlog_monitor.refresh)
+        body = client.get("/metrics").text
+        assert _gauge(body, 'task2sms_outbox_depth{queue="queued_notifications"}') == queued + 1
+        assert _gauge(body, "task2sms_retry_backlog ") >= 1
+
+        db.delete(notification)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_per_user_waiting_lists_only_the_busiest_users(monkeypatch):
+    waiting = {user_id: user_id for user_id in range(1, 31)}
+    monkeypatch.setattr(send_dispatcher, "waiting_by_user", lambda: waiting)
+
+    body = latest_metrics()[0].decode()
+    listed = [line for line in body.splitlines() if line.startswith('task2sms_dispatch_user_waiting{queue="sends"')]
+    assert len(listed) == TOP_WAITING_USERS
+    assert _gauge(body, 'task2sms_dispatch_user_waiting{queue="sends",user="30"}') == 30
+    assert not any('user="20"' in line for line in listed)
+
+
+def test_per_user_max_wait_lists_only_the_longest_waits(monkeypatch):
+    waits = {user_id: user_id / 10 for user_id in range(1, 31)}
+    monkeypatch.setattr(send_dispatcher, "take_max_waits", lambda: waits)
+
+    body = latest_metrics()[0].decode()
+    listed = [
+        line for line in body.splitlines() if line.startswith('task2sms_dispatch_user_max_wait_seconds{queue="sends"')
+    ]
+    assert len(listed) == TOP_WAITING_USERS
+    assert _gauge(body, 'task2sms_dispatch_user_max_wait_seconds{queue="sends",user="30"}') == 3.0
+    assert not any('user="20"' in line for line in listed)
@@ -0,0 +1,61 @@
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from database import Base
+from migrations.upgrade_schema import pending_changes, upgrade
+from models import Notification, Task, User
+
+# The tables as the first release created them
+BASELINE_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, email VARCHAR NOT NULL UNIQUE, username VARCHAR NOT NULL UNIQUE,
+        hashed_password VARCHAR NOT NULL, is_active BOOLEAN, created_at DATETIME
+    )""",
+    """CREATE TABLE tasks (
+        id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, description TEXT, source_link VARCHAR,
+        schedule_cron VARCHAR, schedule_human VARCHAR, recipients JSON, condition_rules JSON,
+        message_template TEXT, is_active BOOLEAN, last_run DATETIME, next_run DATETIME,
+        created_at DATETIME, updated_at DATETIME, user_id INTEGER REFERENCES users(id)
+    )""",
+    """CREATE TABLE notifications (
+        id INTEGER PRIMARY KEY, task_id INTEGER REFERENCES tasks(id), recipient VARCHAR NOT NULL,
+        message TEXT NOT NULL, provider VARCHAR(14) NOT NULL, status VARCHAR(7), sent_at DATETIME,
+        delivered_at DATETIME, error_message TEXT, retry_count INTEGER, created_at DATETIME
+    )""",
+    """CREATE TABLE data_cache (
+        id INTEGER PRIMARY KEY, task_id INTEGER REFERENCES tasks(id), cache_key VARCHAR,
+        cache_data JSON, expires_at DATETIME, created_at DATETIME
+    )""",
+    "INSERT INTO users (id, email, username, hashed_password, is_active) VALUES (1, 'old@example.com', 'old', 'x', 1)",
+    "INSERT INTO tasks (id, name, recipients, is_active, user_id) VALUES (1, 'Old', '[\"+254712345678\"]', 1, 1)",
+    """INSERT INTO notifications (id, task_id, recipient, message, provider, status, retry_count)
+        VALUES (1, 1, '+254712345678', 'Hello', 'AFRICASTALKING', 'SENT', 0)""",
+]
+
+
+def test_upgrade_adds_every_new_column_to_a_baseline_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(text(statement))
+
+    statements = upgrade(engine)
+
+    assert "ALTER TABLE notifications ADD COLUMN body_id INTEGER REFERENCES message_bodies(id)" in statements
+    assert "ALTER TABLE tasks ADD COLUMN priority VARCHAR(10) DEFAULT 'normal' NOT NULL" in statements
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert columns == set(table.columns.keys()), table.name
+    assert pending_changes(engine) == []
+    assert upgrade(engine) == []
+
+    with Session(engine) as db:
+        task = db.get(Task, 1)
+        assert (task.priority, task.transliterate, task.digest_window_seconds, task.change_version) == (
+            "normal", False, 0, 0
+        )
+        assert db.get(User, 1).tasks_version == 0
+        notification = db.get(Notification, 1)
+        assert (notification.message, notification.priority, notification.body_id) == ("Hello", "normal", None)
+    engine.dispose()
@@ -0,0 +1,147 @@
+import csv
+import gzip
+import io
+
+import orjson
+import pytest
+
+from database import SessionLocal
+from models import User, Task, Notification, DeliveryStatus, SMSProvider
+from routers import notifications as notifications_router
+from serialization import make_etag
+from services.change_tracker import bump_notifications_version
+
+
+def _auth_headers(client, username):
+    client.post("/api/auth/register", json={
+        "email": f"{username}@example.com", "username": username, "password": "secret123"
+    })
+    token = client.post("/api/auth/login", data={"username": username, "password": "secret123"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def owned_task(client):
+    """A task with two notifications, owned by "owner"; returns (task id, owner headers, other user headers)"""
+    owner = _auth_headers(client, "owner")
+    other = _auth_headers(client, "other")
+    db = SessionLocal()
+    try:
+        user_id = db.query(User.id).filter(User.username == "owner").scalar()
+        task = Task(name="Owned", recipients=["+254712345678"], user_id=user_id)
+        db.add(task)
+        db.flush()
+        db.add_all([
+            Notification(task_id=task.id, recipient="+254712345678", inline_message=f"Message {n}",
+                         provider=SMSProvider.AFRICASTALKING, status=DeliveryStatus.SENT)
+            for n in range(2)
+        ])
+        db.commit()
+        task_id = task.id
+    finally:
+        db.close()
+    yield task_id, owner, other
+
+    db = SessionLocal()
+    try:
+        db.query(Notification).filter(Notification.task_id == task_id).delete(synchronize_session=False)
+        db.query(Task).filter(Task.id == task_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_unchanged_task_notifications_answer_304_until_a_write(client, owned_task):
+    task_id, owner, _ = owned_task
+    url = f"/api/notifications/task/{task_id}"
+
+    first = client.get(url, headers=owner)
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+    etag = first.headers["ETag"]
+
+    cached = client.get(url, headers={**owner, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    db = SessionLocal()
+    try:
+        user_id = db.query(User.id).filter(User.username == "owner").scalar()
+        db.add(Notification(task_id=task_id, recipient="+254712345678", inline_message="Message 2",
+                            provider=SMSProvider.AFRICASTALKING, status=DeliveryStatus.SENT))
+        bump_notifications_version(db, [user_id])
+        db.commit()
+    finally:
+        db.close()
+
+    changed = client.get(url, headers={**owner, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json()) == 3
+
+
+def test_other_users_get_404_even_with_a_matching_tag(client, owned_task):
+    task_id, _, other = owned_task
+    db = SessionLocal()
+    try:
+        other_user = db.query(User).filter(User.username == "other").one()
+        notification_id = db.query(Notification.id).filter(Notification.task_id == task_id).first().id
+        # The tag the other user would get if the rows were theirs
+        task_tag = make_etag("task-notifications", task_id, other_user.notifications_version, 0, 100)
+        notification_tag = make_etag("notification", notification_id, other_user.notifications_version)
+    finally:
+        db.close()
+
+    response = client.get(f"/api/notifications/task/{task_id}", headers={**other, "If-None-Match": task_tag})
+    assert response.status_code == 404
+    response = client.get(f"/api/notifications/{notification_id}", headers={**other, "If-None-Match": notification_tag})
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_export_streams_the_users_rows_as_csv_and_ndjson(client, owned_task, monkeypatch, compress):
+    task_id, owner, other = owned_task
+    monkeypatch.setattr(notifications_router, "EXPORT_BATCH_SIZE", 1)  # A chunk per row
+    db = SessionLocal()
+    try:
+        db.add(Notification(task_id=task_id, recipient="+254712345678", inline_message="Café €5, \"quoted\"\nline",
+                            provider=SMSProvider.AFRICASTALKING, status=DeliveryStatus.FAILED))
+        db.commit()
+    finally:
+        db.close()
+
+    def export(export_format, headers):
+        with client.stream(
+            "GET", "/api/notifications/export", params={"format": export_format, "compress": compress}, headers=headers
+        ) as response:
+            assert response.status_code == 200
+            body = response.read()
+        if compress:
+            assert response.headers["Content-Type"] == "application/gzip"
+            assert response.headers["Content-Disposition"].endswith('.gz"')
+            body = gzip.decompress(body)
+        return body.decode("utf-8")
+
+    text = export("csv", owner)
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert [row["message"] for row in rows] == ["Message 0", "Message 1", "Café €5, \"quoted\"\nline"]
+    assert {row["task_id"] for row in rows} == {str(task_id)}
+    assert [row["status"] for row in rows] == ["sent", "sent", "failed"]
+
+    text = export("ndjson", owner)
+    assert text.endswith("\n")
+    records = [orjson.loads(line) for line in text.splitlines()]
+    assert [record["message"] for record in records] == ["Message 0", "Message 1", "Café €5, \"quoted\"\nline"]
+    assert records[2]["status"] == "failed" and records[2]["provider"] == "africastalking"
+
+    assert export("ndjson", other) == ""
+
+
+def test_ndjson_is_encoded_a_batch_per_chunk(monkeypatch):
+    monkeypatch.setattr(notifications_router, "EXPORT_BATCH_SIZE", 2)
+    rows = ({"id": n, "message": f"é{n}"} for n in range(5))
+
+    chunks = list(notifications_router._encode_ndjson(rows))
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+    assert orjson.loads(chunks[2]) == {"id": 4, "message": "é4"}
@@ -0,0 +1,214 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from config import settings
+from database import SessionLocal
+from models import User, Task, Notification, DeliveryStatus, SMSProvider
+from routers.webhooks import _twilio_signature
+from services.receipt_service import receipt_service, DeliveryReceipt
+from services.retry_service import retry_service
+from services import retry_service as retry_module
+from services.sms_service import TwilioSMSProvider
+
+TWILIO_URL = "https://example.com/api/webhooks/twilio/status"
+
+
+@pytest.fixture
+def notifications(client):
+    """Two sent notifications with provider message ids; returns their ids by message id"""
+    db = SessionLocal()
+    try:
+        user = User(email="receipts@example.com", username="receipts", hashed_password="x")
+        db.add(user)
+        db.flush()
+        task = Task(name="Receipts", schedule_human="every 1 hour", recipients=["+254712345678"], user_id=user.id)
+        db.add(task)
+        db.flush()
+        rows = {
+            message_id: Notification(
+                task_id=task.id,
+                recipient="+254712345678",
+                provider=SMSProvider.TWILIO,
+                status=DeliveryStatus.SENT,
+                provider_message_id=message_id
+            )
+            for message_id in ("SM-delivered", "SM-failed")
+        }
+        db.add_all(rows.values())
+        db.commit()
+        ids = {message_id: row.id for message_id, row in rows.items()}
+    finally:
+        db.close()
+    yield ids
+
+    db = SessionLocal()
+    try:
+        db.query(Notification).filter(Notification.id.in_(ids.values())).delete(synchronize_session=False)
+        db.query(Task).filter(Task.name == "Receipts").delete(synchronize_session=False)
+        db.query(User).filter(User.username == "receipts").delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _status(notification_id):
+    db = SessionLocal()
+    try:
+        return db.query(Notification.status, Notification.delivered_at, Notification.error_message).filter(
+            Notification.id == notification_id
+        ).one()
+    finally:
+        db.close()
+
+
+def test_delivered_receipt_is_not_overwritten_by_a_later_failure(notifications):
+    now = datetime.utcnow()
+    receipt_service._apply([
+        DeliveryReceipt("SM-delivered", delivered=True, received_at=now),
+        DeliveryReceipt("SM-failed", delivered=False, received_at=now, error="Absent subscriber")
+    ])
+    receipt_service._apply([DeliveryReceipt("SM-delivered", delivered=False, received_at=now, error="Late")])
+
+    delivered = _status(notifications["SM-delivered"])
+    assert delivered.status == DeliveryStatus.DELIVERED
+    assert delivered.delivered_at == now
+    assert delivered.error_message is None
+    failed = _status(notifications["SM-failed"])
+    assert failed.status == DeliveryStatus.FAILED
+    assert failed.error_message == "Absent subscriber"
+
+
+def test_failed_later_part_is_not_hidden_by_the_first_parts_delivery(client, notifications):
+    # A long SMPP message's failed second part is reported under the first part's id
+    now = datetime.utcnow()
+    receipt_service._apply([DeliveryReceipt("SM-delivered", delivered=False, received_at=now, error="UNDELIV err:034")])
+    receipt_service._apply([DeliveryReceipt("SM-delivered", delivered=True, received_at=now)])
+    failed = _status(notifications["SM-delivered"])
+    assert failed.status == DeliveryStatus.FAILED
+    assert failed.error_message == "UNDELIV err:034"
+
+    # Both reports in the same flush window
+    receipt_service.add(DeliveryReceipt("SM-failed", delivered=False, received_at=now, error="UNDELIV err:034"))
+    receipt_service.add(DeliveryReceipt("SM-failed", delivered=True, received_at=now))
+    client.portal.call(receipt_service.flush)
+    assert _status(notifications["SM-failed"]).status == DeliveryStatus.FAILED
+
+
+def test_carrier_rejected_messages_are_not_resent(client, notifications, monkeypatch):
+    receipt_service._apply([
+        DeliveryReceipt("SM-failed", delivered=False, received_at=datetime.utcnow(), error="UserInBlacklist")
+    ])
+
+    # A resend would succeed and replace the message id
+    monkeypatch.setattr(
+        retry_module.sms_service, "send_sms", lambda *args: {"success": True, "message_id": "SM-resent"}
+    )
+    client.portal.call(retry_service._retry_failed_notifications)
+
+    db = SessionLocal()
+    try:
+        failed = db.query(Notification).filter(Notification.id == notifications["SM-failed"]).one()
+        assert failed.status == DeliveryStatus.FAILED
+        assert failed.retry_count == retry_service.max_retries
+        assert failed.provider_message_id == "SM-failed"
+    finally:
+        db.close()
+
+
+def test_twilio_callback_requires_a_valid_signature(client, notifications, monkeypatch):
+    monkeypatch.setattr(settings, "twilio_auth_token", "twilio-secret")
+    monkeypatch.setattr(settings, "twilio_status_callback_url", TWILIO_URL)
+    params = {"MessageSid": "SM-delivered", "MessageStatus": "delivered"}
+
+    forged = client.post("/api/webhooks/twilio/status", data=params, headers={"X-Twilio-Signature": "forged"})
+    assert forged.status_code == 403
+    tampered = client.post(
+        "/api/webhooks/twilio/status",
+        data={**params, "MessageStatus": "failed"},
+        headers={"X-Twilio-Signature": _twilio_signature(TWILIO_URL, params)}
+    )
+    assert tampered.status_code == 403
+
+    signed = client.post(
+        "/api/webhooks/twilio/status",
+        data=params,
+        headers={"X-Twilio-Signature": _twilio_signature(TWILIO_URL, params)}
+    )
+    assert signed.status_code == 200
+    client.portal.call(receipt_service.flush)
+    assert _status(notifications["SM-delivered"]).status == DeliveryStatus.DELIVERED
+
+
+def test_twilio_callback_is_refused_when_not_configured(client, monkeypatch):
+    monkeypatch.setattr(settings, "twilio_auth_token", None)
+    response = client.post("/api/webhooks/twilio/status", data={"MessageSid": "SM-x"})
+    assert response.status_code == 403
+
+
+def test_africastalking_callback_requires_the_shared_token(client, notifications, monkeypatch):
+    monkeypatch.setattr(settings, "africastalking_callback_token", "at-secret")
+    report = {"id": "SM-failed", "status": "Failed", "failureReason": "UserInBlacklist"}
+
+    assert client.post("/api/webhooks/africastalking/delivery", data=report).status_code == 403
+    assert client.post("/api/webhooks/africastalking/delivery?token=wrong", data=report).status_code == 403
+    accepted = client.post("/api/webhooks/africastalking/delivery?token=at-secret", data=report)
+    assert accepted.status_code == 200
+    client.portal.call(receipt_service.flush)
+    failed = _status(notifications["SM-failed"])
+    assert failed.status == DeliveryStatus.FAILED
+    assert failed.error_message == "UserInBlacklist"
+
+
+def test_receipt_arriving_before_its_notification_is_retried(client, notifications, monkeypatch):
+    monkeypatch.setattr(receipt_service, "unmatched_retry_seconds", 60)
+    receipt_service.add(DeliveryReceipt("SM-early", delivered=True, received_at=datetime.utcnow()))
+    client.portal.call(receipt_service.flush)
+    assert "SM-early" in receipt_service._buffer
+
+    # The send is recorded after the receipt arrived
+    db = SessionLocal()
+    try:
+        db.query(Notification).filter(Notification.id == notifications["SM-failed"]).update(
+            {"provider_message_id": "SM-early"}
+        )
+        db.commit()
+    finally:
+        db.close()
+    client.portal.call(receipt_service.flush)
+    assert "SM-early" not in receipt_service._buffer
+    assert _status(notifications["SM-failed"]).status == DeliveryStatus.DELIVERED
+
+
+def test_unmatched_receipt_is_dropped_after_the_retry_window(client, monkeypatch):
+    monkeypatch.setattr(receipt_service, "unmatched_retry_seconds", 0)
+    expired = receipt_service.expired
+    receipt_service.add(DeliveryReceipt("SM-unknown", delivered=False, received_at=datetime.utcnow()))
+    client.portal.call(receipt_service.flush)
+    assert "SM-unknown" not in receipt_service._buffer
+    assert receipt_service.expired == expired + 1
+
+
+class _TwilioMessages:
+    def __init__(self):
+        self.created = []
+
+    def create(self, **params):
+        self.created.append(params)
+        return SimpleNamespace(sid="SM-new", status="queued", price=None)
+
+
+def test_twilio_messages_name_the_status_callback(monkeypatch):
+    provider = TwilioSMSProvider.__new__(TwilioSMSProvider)
+    provider.client = SimpleNamespace(messages=_TwilioMessages())
+    provider.from_number = "+15005550006"
+
+    monkeypatch.setattr(settings, "twilio_status_callback_url", TWILIO_URL)
+    assert provider.send_sms("+254712345678", "Hello")["message_id"] == "SM-new"
+    monkeypatch.setattr(settings, "twilio_status_callback_url", None)
+    provider.send_sms("+254712345678", "Hello")
+
+    first, second = provider.client.messages.created
+    assert first["status_callback"] == TWILIO_URL
+    assert "status_callback" not in second
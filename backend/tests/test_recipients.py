@@ -0,0 +1,46 @@
+import pytest
+
+from config import settings
+from services.recipients import normalize_phone_number, normalize_recipients
+
+
+@pytest.fixture
+def no_default_country(monkeypatch):
+    monkeypatch.setattr(settings, "default_country_code", None)
+
+
+@pytest.mark.parametrize("number, expected", [
+    ("+254 712 345 678", "+254712345678"),
+    ("00254-712-345-678", "+254712345678"),
+    ("(+1) 415.555.0100", "+14155550100"),
+])
+def test_international_numbers_keep_their_country_code(number, expected, no_default_country):
+    assert normalize_phone_number(number) == expected
+
+
+@pytest.mark.parametrize("number, expected", [
+    ("0712345678", "+254712345678"),
+    ("712345678", "+254712345678"),
+    ("0712 345 678", "+254712345678"),
+])
+def test_local_numbers_get_the_default_country_code(number, expected):
+    assert normalize_phone_number(number, default_country_code="+254") == expected
+
+
+@pytest.mark.parametrize("number", ["0712345678", "712345678"])
+def test_local_numbers_are_rejected_without_a_default_country_code(number, no_default_country):
+    with pytest.raises(ValueError):
+        normalize_phone_number(number)
+
+
+@pytest.mark.parametrize("number", ["+0712345678", "+12345", "+2547123456789012", "not a number", ""])
+def test_malformed_numbers_are_rejected(number):
+    with pytest.raises(ValueError):
+        normalize_phone_number(number, default_country_code="254")
+
+
+def test_recipients_are_deduplicated_in_first_seen_order(monkeypatch):
+    monkeypatch.setattr(settings, "default_country_code", "254")
+    valid, invalid = normalize_recipients(["0712345678", "+1 415 555 0100", "+254712345678", "abc"])
+    assert valid == ["+254712345678", "+14155550100"]
+    assert invalid == ["abc"]
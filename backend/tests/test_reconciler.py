@@ -0,0 +1,150 @@
+import pytest
+
+from database import SessionLocal
+from models import User, Task, TaskTombstone
+from services.change_tracker import current_task_change_version, mark_tasks_changed, mark_tasks_deleted
+from services.scheduler_service import task_scheduler
+from services.task_reconciler import task_reconciler
+
+
+@pytest.fixture
+def feed(client, monkeypatch):
+    """A user whose tasks are edited straight in the database, as another worker would"""
+    monkeypatch.setattr(task_reconciler, "_seen", type(task_reconciler._seen)())
+    db = SessionLocal()
+    try:
+        user = User(email="reconciler@example.com", username="reconciler", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+    finally:
+        db.close()
+
+    def reconcile():
+        client.portal.call(task_reconciler.reconcile)
+
+    yield user_id, reconcile
+
+    db = SessionLocal()
+    try:
+        task_ids = [task_id for (task_id,) in db.query(Task.id).filter(Task.user_id == user_id)]
+        task_scheduler.unschedule_tasks(task_ids)
+        db.query(Task).filter(Task.user_id == user_id).delete(synchronize_session=False)
+        mark_tasks_deleted(db, task_ids)
+        db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def write_task(user_id, task_id=None, **values):
+    db = SessionLocal()
+    try:
+        task = db.get(Task, task_id) if task_id else None
+        if task is None:
+            task = Task(id=task_id, name="Feed", schedule_human="every 1 hour", recipients=[], user_id=user_id)
+            db.add(task)
+        for name, value in values.items():
+            setattr(task, name, value)
+        db.flush()
+        mark_tasks_changed(db, [task])
+        db.commit()
+        return task.id
+    finally:
+        db.close()
+
+
+def delete_task(task_id):
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.id == task_id).delete(synchronize_session=False)
+        mark_tasks_deleted(db, [task_id])
+        db.commit()
+    finally:
+        db.close()
+
+
+def job_trigger(task_id):
+    job = task_scheduler.scheduler.get_job(f"task_{task_id}")
+    return job and str(job.trigger)
+
+
+def test_new_tasks_are_scheduled_and_the_watermark_advances(feed):
+    user_id, reconcile = feed
+    task_id = write_task(user_id)
+
+    reconcile()
+
+    assert job_trigger(task_id) == "interval[1:00:00]"
+    db = SessionLocal()
+    try:
+        assert task_scheduler.change_watermark == current_task_change_version(db)
+    finally:
+        db.close()
+
+
+def test_deactivated_and_rescheduled_tasks_update_their_jobs(feed):
+    user_id, reconcile = feed
+    paused = write_task(user_id)
+    moved = write_task(user_id)
+    reconcile()
+
+    write_task(user_id, paused, is_active=False)
+    write_task(user_id, moved, schedule_human="every 2 hours")
+    reconcile()
+
+    assert job_trigger(paused) is None
+    assert job_trigger(moved) == "interval[2:00:00]"
+
+
+def test_tombstones_remove_jobs_unless_the_id_was_reused(feed):
+    user_id, reconcile = feed
+    deleted = write_task(user_id)
+    reused = write_task(user_id)
+    reconcile()
+
+    delete_task(deleted)
+    delete_task(reused)
+    write_task(user_id, reused, schedule_human="every 3 hours")
+    reconcile()
+
+    assert job_trigger(deleted) is None
+    assert job_trigger(reused) == "interval[3:00:00]"
+    db = SessionLocal()
+    try:
+        assert db.get(TaskTombstone, reused) is not None
+    finally:
+        db.close()
+
+
+def test_a_version_committed_after_the_watermark_passed_it_is_still_applied(feed, monkeypatch):
+    user_id, reconcile = feed
+    write_task(user_id)
+    reconcile()
+    late_version = task_scheduler.change_watermark
+
+    # Another transaction took this version before the pass above but committed after it
+    db = SessionLocal()
+    try:
+        late = Task(name="Late", schedule_human="every 4 hours", recipients=[], user_id=user_id,
+                    change_version=late_version)
+        db.add(late)
+        db.commit()
+        late_id = late.id
+    finally:
+        db.close()
+    reconcile()
+    assert job_trigger(late_id) == "interval[4:00:00]"
+
+    # Once the settle window has passed, versions at or below the watermark are no longer re-read
+    monkeypatch.setattr(task_reconciler, "settle_seconds", 0)
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.id == late_id).update(
+            {"schedule_human": "every 5 hours", "change_version": late_version}
+        )
+        db.commit()
+    finally:
+        db.close()
+    reconcile()
+    assert job_trigger(late_id) == "interval[4:00:00]"
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import settings
+from database import SessionLocal
+from models import Task, TaskRun
+
+
+@pytest.fixture
+def auth_headers(client):
+    client.post("/api/auth/register", json={
+        "email": "runs@example.com", "username": "runs", "password": "secret123"
+    })
+    token = client.post("/api/auth/login", data={"username": "runs", "password": "secret123"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_summary_counts_every_run_and_samples_the_latest(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "run_summary_sample_size", 10)
+    task_id = client.post("/api/tasks/", headers=auth_headers, json={
+        "name": "Summary", "schedule_human": "every 1 hour", "recipients": ["+254712345678"], "is_active": False
+    }).json()["id"]
+
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        # 30 runs: the oldest is the slowest; the latest 10 take 1..10 ms
+        db.add_all([
+            TaskRun(
+                task_id=task_id,
+                scheduled_at=now - timedelta(minutes=index, seconds=1),
+                started_at=now - timedelta(minutes=index),
+                duration_ms=1000.0 if index == 29 else float(index + 1),
+                condition_matched=index % 3 == 0,
+                recipients_sent=1 if index % 3 == 0 else 0,
+                outcome="completed" if index % 3 == 0 else "skipped"
+            )
+            for index in range(30)
+        ])
+        # Outside the window
+        db.add(TaskRun(task_id=task_id, started_at=now - timedelta(days=3), duration_ms=5000.0, outcome="failed"))
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.get("/api/runs/summary?hours=24", headers=auth_headers)
+    assert response.status_code == 200
+    summary = next(item for item in response.json() if item["task_id"] == task_id)
+    assert summary["runs"] == 30
+    assert summary["sampled_runs"] == 10
+    assert summary["outcomes"] == {"completed": 10, "skipped": 20}
+    assert summary["condition_matched"] == 10
+    assert summary["duration_ms"]["p50"] == 5.0
+    assert summary["duration_ms"]["p99"] == 10.0
+    assert summary["duration_ms"]["max"] == 1000.0  # Exact, from every run
+    assert summary["recipients"]["max"] == 1
+    assert summary["lag_ms"]["p50"] == pytest.approx(1000.0)
+
+    db = SessionLocal()
+    try:
+        db.query(TaskRun).filter(TaskRun.task_id == task_id).delete()
+        db.query(Task).filter(Task.id == task_id).delete()
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import event
+
+from database import SessionLocal, engine
+from models import User, Task, Notification, DeliveryStatus
+from services.scheduler_service import task_scheduler
+from services.sms_service import SMSProvider, sms_service
+
+
+class RecordingProvider(SMSProvider):
+    """Checks, as each message goes out, that its notification row is already committed"""
+
+    def __init__(self):
+        self.committed_before_send = []
+
+    def send_sms(self, recipient, message):
+        db = SessionLocal()
+        try:
+            row = db.query(Notification.status).filter(Notification.recipient == recipient).one_or_none()
+        finally:
+            db.close()
+        self.committed_before_send.append(row is not None and row.status == DeliveryStatus.PENDING)
+        if recipient.endswith("99"):
+            return {"success": False, "error": "Absent subscriber"}
+        return {"success": True, "message_id": f"SM-{recipient}"}
+
+
+@pytest.fixture
+def task(client):
+    db = SessionLocal()
+    try:
+        user = User(email="scheduler@example.com", username="scheduler", hashed_password="x")
+        db.add(user)
+        db.flush()
+        task = Task(name="Scheduler", schedule_human="every 1 hour", recipients=[], user_id=user.id)
+        db.add(task)
+        db.commit()
+        task_id = task.id
+    finally:
+        db.close()
+    yield task_id
+
+    db = SessionLocal()
+    try:
+        db.query(Notification).filter(Notification.task_id == task_id).delete(synchronize_session=False)
+        db.query(Task).filter(Task.id == task_id).delete(synchronize_session=False)
+        db.query(User).filter(User.username == "scheduler").delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_chunk_is_recorded_before_sending_and_updated_without_per_row_queries(client, task, monkeypatch):
+    provider = RecordingProvider()
+    monkeypatch.setattr(sms_service, "providers", {"africastalking": provider})
+    recipients = [f"+2547123450{i:02d}" for i in range(50)] + ["+254712345099"]
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    db = SessionLocal()
+    try:
+        loaded = db.query(Task).filter(Task.id == task).one()
+        loaded.owner  # Loaded up front, as a run does
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            sent = client.portal.call(task_scheduler._send_notifications, db, loaded, recipients, "Hello")
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+    finally:
+        db.close()
+
+    assert sent == 50
+    assert provider.committed_before_send == [True] * 51
+    # No reload of each row after the commits (the provider's own checks account for 51 selects)
+    assert sum(statement.startswith("SELECT notifications") for statement in statements) == 51
+    assert sum(statement.startswith("UPDATE notifications") for statement in statements) == 1
+
+    db = SessionLocal()
+    try:
+        rows = dict(db.query(Notification.recipient, Notification.status).filter(Notification.task_id == task))
+        failed = db.query(Notification.error_message).filter(Notification.recipient == "+254712345099").scalar()
+        message_id = db.query(Notification.provider_message_id).filter(
+            Notification.recipient == recipients[0]
+        ).scalar()
+    finally:
+        db.close()
+    assert list(rows.values()).count(DeliveryStatus.SENT) == 50
+    assert rows["+254712345099"] == DeliveryStatus.FAILED and failed
+    assert message_id == f"SM-{recipients[0]}"
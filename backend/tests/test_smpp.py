@@ -0,0 +1,222 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.smpp_simulator import SMPPSimulator
+from services import smpp
+from services.sms_encoding import segment_info
+from services.smpp import (
+    PDU, SMPPClient, ShortMessage, decode_short_message, encode_text, encode_tlv, message_parts,
+    parse_receipt, short_message_body, DATA_CODING_DEFAULT, DATA_CODING_UCS2, ESM_CLASS_DELIVERY_RECEIPT,
+    ESM_CLASS_UDHI, SUBMIT_SM, TAG_MESSAGE_STATE, TAG_RECEIPTED_MESSAGE_ID
+)
+
+
+def make_client(simulator, **options):
+    client = SMPPClient(
+        host=simulator.host,
+        port=simulator.port,
+        system_id="test",
+        password="secret",
+        response_timeout=5.0,
+        **options
+    )
+    client.start()
+    return client
+
+
+@pytest.fixture
+def simulator():
+    simulators = []
+
+    def start(**options):
+        simulator = SMPPSimulator(seed=1, **options)
+        simulator.start()
+        simulators.append(simulator)
+        return simulator
+
+    yield start
+    for simulator in simulators:
+        simulator.stop()
+
+
+def test_submit_sm_round_trips_through_pdu_encoding():
+    message, data_coding = encode_text("Hello {world} €5 @ 10_00")
+    pdu = PDU(SUBMIT_SM, sequence_number=7, body=short_message_body("Task2SMS", "+254712345678", message, data_coding))
+
+    header, body = pdu.encode()[:16], pdu.encode()[16:]
+    assert int.from_bytes(header[:4], "big") == 16 + len(body)
+    decoded = decode_short_message(body)
+    assert decoded.source_addr == "Task2SMS"
+    assert decoded.destination_addr == "+254712345678"
+    assert decoded.data_coding == DATA_CODING_DEFAULT
+    assert decoded.text == "Hello {world} €5 @ 10_00"
+
+
+def test_text_is_encoded_as_gsm_03_38_not_ascii():
+    message, data_coding = encode_text("@$_é€")
+    assert data_coding == DATA_CODING_DEFAULT
+    assert message == bytes([0x00, 0x02, 0x11, 0x05, 0x1B, 0x65])
+
+    message, data_coding = encode_text("Привет")
+    assert data_coding == DATA_CODING_UCS2
+    assert message == "Привет".encode("utf-16-be")
+
+
+@pytest.mark.parametrize("text", ["a" * 400, "Ж" * 150, "{}" * 100])
+def test_long_messages_are_concatenated_with_a_user_data_header(text):
+    parts = message_parts(text, reference=300)
+
+    assert len(parts) == segment_info(text).segments
+    reassembled = []
+    for number, (message, data_coding, esm_class) in enumerate(parts, 1):
+        assert esm_class == ESM_CLASS_UDHI
+        assert message[:6] == bytes([0x05, 0x00, 0x03, 300 & 0xFF, len(parts), number])
+        assert len(message) <= 140 if data_coding == DATA_CODING_UCS2 else len(message) <= 159
+        reassembled.append(ShortMessage("", "", esm_class, data_coding, message).text)
+    assert "".join(reassembled) == text
+
+
+def test_short_message_body_refuses_oversized_messages():
+    with pytest.raises(ValueError):
+        short_message_body("", "+254712345678", b"x" * 255, DATA_CODING_DEFAULT)
+
+
+def test_parse_receipt_reads_text_and_tlv_receipts():
+    text = b"id:0000000042 sub:001 dlvrd:000 submit date:2401011200 done date:2401011201 stat:UNDELIV err:034 text:"
+    message = ShortMessage("", "", ESM_CLASS_DELIVERY_RECEIPT, DATA_CODING_DEFAULT, text)
+    assert parse_receipt(message) == ("0000000042", False, "UNDELIV err:034")
+
+    message = ShortMessage("", "", ESM_CLASS_DELIVERY_RECEIPT, DATA_CODING_DEFAULT, b"", {
+        TAG_RECEIPTED_MESSAGE_ID: b"abc\x00",
+        TAG_MESSAGE_STATE: bytes([2]),
+    })
+    assert parse_receipt(message) == ("abc", True, None)
+
+    enroute = ShortMessage("", "", ESM_CLASS_DELIVERY_RECEIPT, DATA_CODING_DEFAULT, b"id:1 stat:ENROUTE")
+    assert parse_receipt(enroute) is None
+    assert decode_short_message(
+        short_message_body("", "", b"", DATA_CODING_DEFAULT, tlvs={TAG_MESSAGE_STATE: bytes([5])})
+    ).tlvs == {TAG_MESSAGE_STATE: bytes([5])}
+    assert encode_tlv(TAG_MESSAGE_STATE, b"\x05") == b"\x04\x27\x00\x01\x05"
+
+
+def test_long_message_parts_map_receipts_to_the_first_part(simulator):
+    sim = simulator()
+    receipts = []
+    received = threading.Event()
+
+    def on_deliver(message):
+        receipts.append(parse_receipt(message))
+        if len(receipts) == 3:
+            received.set()
+
+    client = make_client(sim, on_deliver=on_deliver)
+    try:
+        message_id = client.submit("Task2SMS", "+254712345678", "word " * 90)
+        assert received.wait(5)
+    finally:
+        client.stop()
+
+    assert sim.submitted == 3
+    reference = sim.messages[0].short_message[3]
+    assert [message.short_message[:6] for message in sim.messages] == [
+        bytes([0x05, 0x00, 0x03, reference, 3, number]) for number in (1, 2, 3)
+    ]
+    assert all(message.esm_class & ESM_CLASS_UDHI for message in sim.messages)
+    part_ids = [receipt[0] for receipt in receipts if receipt[0] != message_id]
+    assert len(part_ids) == 2
+    assert {client.primary_message_id(part_id) for part_id in part_ids} == {(message_id, True)}
+    assert client.primary_message_id(message_id) == (message_id, False)
+
+
+def test_later_parts_are_mapped_before_the_message_is_fully_acknowledged(simulator):
+    # Each part's receipt comes back while the next part still waits for its submit_sm_resp
+    sim = simulator(latency_ms=100, receipt_delay_ms=20)
+    mapped = []
+    received = threading.Event()
+    client = None
+
+    def on_deliver(message):
+        mapped.append(client.primary_message_id(parse_receipt(message)[0]))
+        if len(mapped) == 3:
+            received.set()
+
+    client = make_client(sim, on_deliver=on_deliver)
+    try:
+        message_id = client.submit("Task2SMS", "+254712345678", "word " * 90)
+        assert received.wait(5)
+    finally:
+        client.stop()
+
+    assert mapped == [(message_id, False), (message_id, True), (message_id, True)]
+
+
+def test_client_rebinds_after_the_connection_drops(simulator):
+    sim = simulator(drop_after=3)
+    client = make_client(sim)
+    try:
+        message_ids = [client.submit("Task2SMS", f"+2547000000{n:02d}", "hello") for n in range(3)]
+        # The fourth submit was written before the drop, so it fails rather than risk a duplicate
+        with pytest.raises(ConnectionError):
+            client.submit("Task2SMS", "+254700000003", "hello")
+        message_ids += [client.submit("Task2SMS", f"+2547000000{n:02d}", "hello") for n in range(4, 7)]
+    finally:
+        client.stop()
+
+    assert len(set(message_ids)) == 6
+    assert sim.binds == 2
+
+
+def test_throttled_submissions_are_retried_with_backoff(simulator, monkeypatch):
+    monkeypatch.setattr(smpp, "THROTTLE_BACKOFF", 0.01)
+    sim = simulator(failure_rate=0.3)
+    client = make_client(sim, binds=2, window=5)
+    try:
+        # Concurrent submits from executor threads, as the app's sends make them
+        with ThreadPoolExecutor(10) as pool:
+            outcomes = list(pool.map(
+                lambda n: client.submit("Task2SMS", f"+2547000000{n:02d}", "hello"), range(40)
+            ))
+        throttled = sum(session.throttled for session in client.sessions if session)
+    finally:
+        client.stop()
+
+    assert all(isinstance(outcome, str) for outcome in outcomes)
+    assert sim.submitted == 40
+    assert sim.throttled > 0
+    assert throttled == sim.throttled
+
+
+def test_persistent_throttling_gives_up(simulator, monkeypatch):
+    monkeypatch.setattr(smpp, "THROTTLE_BACKOFF", 0.001)
+    sim = simulator(failure_rate=1.0)
+    client = make_client(sim)
+    try:
+        with pytest.raises(smpp.SMPPError) as error:
+            client.submit("Task2SMS", "+254712345678", "hello")
+    finally:
+        client.stop()
+
+    assert error.value.command_status == smpp.ESME_RTHROTTLED
+    assert sim.throttled == smpp.THROTTLE_RETRIES + 1
+
+
+def test_timed_out_submit_gives_back_its_window_slot(simulator, monkeypatch):
+    monkeypatch.setattr(smpp, "THROTTLE_WAIT_LIMIT", 0)
+    sim = simulator(latency_ms=500)
+    client = make_client(sim, window=1)
+    try:
+        deadline = time.monotonic() + 5
+        while not client._live_sessions() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # The caller gives up long before the simulated SMSC answers
+        client.response_timeout = 0.05
+        with pytest.raises(TimeoutError):
+            client.submit("Task2SMS", "+254712345678", "hello")
+        time.sleep(0.05)
+        assert all(session.in_flight == 0 for session in client._live_sessions())
+    finally:
+        client.stop()
@@ -0,0 +1,67 @@
+import pytest
+
+from services.sms_encoding import (
+    GSM7, UCS2, segment_info, split_segments, transliterate, truncate_to_segments
+)
+
+
+@pytest.mark.parametrize("length, segments", [(0, 0), (1, 1), (160, 1), (161, 2), (306, 2), (307, 3)])
+def test_gsm7_segment_limits(length, segments):
+    info = segment_info("a" * length)
+    assert info.encoding == GSM7
+    assert info.length == length
+    assert info.segments == segments
+    assert info.segment_limit == (160 if segments <= 1 else 153)
+
+
+@pytest.mark.parametrize("length, segments", [(70, 1), (71, 2), (134, 2), (135, 3)])
+def test_ucs2_segment_limits(length, segments):
+    info = segment_info("ж" * length)
+    assert info.encoding == UCS2
+    assert info.segments == segments
+    assert info.non_gsm_characters == ["ж"]
+
+
+def test_extension_characters_cost_two_septets():
+    assert segment_info("€" * 80).segments == 1
+    assert segment_info("€" * 81).segments == 2
+
+
+def test_one_non_gsm_character_switches_the_whole_message_to_ucs2():
+    info = segment_info("a" * 100 + "✓")
+    assert info.encoding == UCS2
+    assert info.segments == 2
+    assert info.non_gsm_characters == ["✓"]
+
+
+def test_escape_pairs_are_not_split_across_parts():
+    # 152 septets then a two-septet character: it must start the second part
+    parts = split_segments("a" * 152 + "€" + "b" * 10)
+    assert parts[0] == "a" * 152
+    assert parts[1].startswith("€")
+
+
+def test_surrogate_pairs_count_as_two_units_and_stay_whole():
+    text = "a" * 66 + "😀" + "b" * 10
+    assert segment_info(text).length == 78
+    parts = split_segments(text)
+    assert parts[0] == "a" * 66
+    assert parts[1].startswith("😀")
+
+
+def test_transliterate_replaces_lookalikes_and_strips_accents():
+    assert transliterate("“Score” – 3…1") == '"Score" - 3...1'
+    assert transliterate("São Tomé") == "Sao Tomé"  # é is in GSM-7, ã is not
+    assert transliterate("Ωmega ok") == "Ωmega ok"  # Already GSM-7
+    assert transliterate("日本") == "日本"  # Nothing close: left as is
+
+
+def test_truncate_to_segments_fits_the_limit():
+    text = "word " * 100
+    truncated = truncate_to_segments(text, 2)
+    assert truncated.endswith("...")
+    assert segment_info(truncated).segments == 2
+    assert truncate_to_segments("short", 1) == "short"
+
+    unicode_text = "ж" * 80 + "€" * 100
+    assert segment_info(truncate_to_segments(unicode_text, 1)).segments == 1
@@ -0,0 +1,177 @@
+from config import settings
+from database import SessionLocal
+from models import User, Task, TaskTombstone
+
+
+def _auth_headers(client, username):
+    client.post("/api/auth/register", json={
+        "email": f"{username}@example.com", "username": username, "password": "secret123"
+    })
+    token = client.post("/api/auth/login", data={"username": username, "password": "secret123"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _create_task(client, headers, name):
+    response = client.post("/api/tasks/", json={"name": name, "is_active": False}, headers=headers)
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_task_list_answers_304_until_a_write(client):
+    owner = _auth_headers(client, "tasklister")
+    _create_task(client, owner, "Listed")
+
+    first = client.get("/api/tasks/", headers=owner)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cached = client.get("/api/tasks/", headers={**owner, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    _create_task(client, owner, "Another")
+    changed = client.get("/api/tasks/", headers={**owner, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert {task["name"] for task in changed.json()} >= {"Listed", "Another"}
+
+
+def test_single_task_answers_304_until_it_changes(client):
+    owner = _auth_headers(client, "taskreader")
+    task_id = _create_task(client, owner, "Single")
+
+    first = client.get(f"/api/tasks/{task_id}", headers=owner)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cached = client.get(f"/api/tasks/{task_id}", headers={**owner, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    assert client.put(f"/api/tasks/{task_id}", json={"name": "Renamed"}, headers=owner).status_code == 200
+    changed = client.get(f"/api/tasks/{task_id}", headers={**owner, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["name"] == "Renamed"
+
+
+def test_missing_or_foreign_tasks_get_404_even_with_a_matching_tag(client):
+    owner = _auth_headers(client, "taskowner")
+    other = _auth_headers(client, "taskstranger")
+    task_id = _create_task(client, owner, "Private")
+    etag = client.get(f"/api/tasks/{task_id}", headers=owner).headers["ETag"]
+
+    for headers in ({**other, "If-None-Match": etag}, {**other, "If-None-Match": "*"}):
+        assert client.get(f"/api/tasks/{task_id}", headers=headers).status_code == 404
+
+    assert client.delete(f"/api/tasks/{task_id}", headers=owner).status_code == 204
+    for tag in (etag, "*"):
+        response = client.get(f"/api/tasks/{task_id}", headers={**owner, "If-None-Match": tag})
+        assert response.status_code == 404
+
+
+def _tasks_version(username):
+    db = SessionLocal()
+    try:
+        return db.query(User.tasks_version).filter(User.username == username).scalar()
+    finally:
+        db.close()
+
+
+def _change_versions(task_ids):
+    """Change-feed versions stamped on the tasks"""
+    db = SessionLocal()
+    try:
+        return {version for (version,) in db.query(Task.change_version).filter(Task.id.in_(task_ids))}
+    finally:
+        db.close()
+
+
+def _tombstone_versions(task_ids):
+    db = SessionLocal()
+    try:
+        return {
+            version
+            for (version,) in db.query(TaskTombstone.change_version).filter(TaskTombstone.task_id.in_(task_ids))
+        }
+    finally:
+        db.close()
+
+
+def test_bulk_create_reports_failures_per_item_and_bumps_versions_once(client):
+    owner = _auth_headers(client, "bulkcreator")
+    version = _tasks_version("bulkcreator")
+
+    response = client.post("/api/tasks/bulk", json={"tasks": [
+        {"name": "First", "is_active": False},
+        {"name": "Unknown list", "is_active": False, "contact_list_ids": [999999]},
+        {"name": "Third", "is_active": False},
+    ]}, headers=owner)
+    assert response.status_code == 201
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (2, 1)
+    assert [result["index"] for result in body["results"]] == [0, 1, 2]
+    assert body["results"][1] == {
+        "index": 1, "id": None, "success": False, "error": "Contact list not found", "task": None
+    }
+    assert [body["results"][i]["task"]["name"] for i in (0, 2)] == ["First", "Third"]
+
+    # One list version and one change-feed version for the whole batch
+    assert _tasks_version("bulkcreator") == version + 1
+    created = [body["results"][i]["id"] for i in (0, 2)]
+    assert len(_change_versions(created)) == 1
+
+
+def test_bulk_update_ignores_other_users_tasks(client):
+    owner = _auth_headers(client, "bulkupdater")
+    other = _auth_headers(client, "bulkbystander")
+    mine = [_create_task(client, owner, f"Mine {n}") for n in range(2)]
+    theirs = _create_task(client, other, "Theirs")
+    version, other_version = _tasks_version("bulkupdater"), _tasks_version("bulkbystander")
+
+    response = client.put("/api/tasks/bulk", json={"tasks": [
+        {"id": mine[0], "name": "Renamed 0"},
+        {"id": theirs, "name": "Hijacked"},
+        {"id": mine[1], "name": "Renamed 1"},
+        {"id": mine[0], "name": "Again"},
+    ]}, headers=owner)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["success"] for result in results] == [True, False, True, False]
+    assert results[1]["error"] == "Task not found"
+    assert results[3]["error"] == "Duplicate task id in batch"
+
+    assert client.get(f"/api/tasks/{theirs}", headers=other).json()["name"] == "Theirs"
+    assert client.get(f"/api/tasks/{mine[0]}", headers=owner).json()["name"] == "Renamed 0"
+    assert _tasks_version("bulkupdater") == version + 1
+    assert _tasks_version("bulkbystander") == other_version
+    assert len(_change_versions(mine)) == 1
+
+
+def test_bulk_delete_only_removes_owned_tasks(client):
+    owner = _auth_headers(client, "bulkdeleter")
+    other = _auth_headers(client, "bulkkeeper")
+    mine = [_create_task(client, owner, f"Doomed {n}") for n in range(2)]
+    theirs = _create_task(client, other, "Kept")
+    version = _tasks_version("bulkdeleter")
+
+    response = client.post("/api/tasks/bulk/delete", json={"ids": [mine[0], theirs, mine[1], mine[1]]}, headers=owner)
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (2, 2)
+    assert [result["success"] for result in body["results"]] == [True, False, True, False]
+
+    assert client.get(f"/api/tasks/{theirs}", headers=other).status_code == 200
+    assert all(client.get(f"/api/tasks/{task_id}", headers=owner).status_code == 404 for task_id in mine)
+    assert _tasks_version("bulkdeleter") == version + 1
+    assert len(_tombstone_versions(mine)) == 1
+    assert not _tombstone_versions([theirs])
+
+
+def test_bulk_batches_are_bounded(client):
+    owner = _auth_headers(client, "bulklimits")
+
+    ids = list(range(1, settings.bulk_max_items + 2))
+    assert client.post("/api/tasks/bulk/delete", json={"ids": ids}, headers=owner).status_code == 422
+    assert client.post("/api/tasks/bulk", json={"tasks": []}, headers=owner).status_code == 422
+    assert client.put("/api/tasks/bulk", json={"tasks": []}, headers=owner).status_code == 422
@@ -46,7 +46,7 @@ function Analytics() {
       const totalTasks = tasks.length;
       const activeTasks = tasks.filter(t => t.is_active).length;
       const totalNotifications = notifications.length;
-      const successfulNotifications = notifications.filter(n => n.status === 'sent').length;
+      const successfulNotifications = notifications.filter(n => n.status === 'sent' || n.status === 'delivered').length;
       const successRate = totalNotifications > 0 ? (successfulNotifications / totalNotifications * 100).toFixed(1) : 0;
       
       // Group notifications by provider
@@ -102,7 +102,7 @@ function Analytics() {
       stats.push({
         date: date.toLocaleDateString('en', { month: 'short', day: 'numeric' }),
         total: dayNotifications.length,
-        successful: dayNotifications.filter(n => n.status === 'sent').length,
+        successful: dayNotifications.filter(n => n.status === 'sent' || n.status === 'delivered').length,
         failed: dayNotifications.filter(n => n.status === 'failed').length
       });
     }
@@ -113,6 +113,7 @@ function Analytics() {
   const getStatusIcon = (status) => {
     switch (status) {
       case 'sent':
+      case 'delivered':
         return <CheckCircle className="w-4 h-4 text-green-600" />;
       case 'failed':
         return <XCircle className="w-4 h-4 text-red-600" />;
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
 import { useTheme } from '../context/ThemeContext';
-import { tasksAPI } from '../services/api';
+import { tasksAPI, eventsAPI } from '../services/api';
 import toast from 'react-hot-toast';
 import {
   Plus, LogOut, Bell, Clock, ToggleLeft, ToggleRight, Trash2, Edit, Eye,
@@ -12,6 +12,7 @@ import {
 
 function Dashboard() {
   const [tasks, setTasks] = useState([]);
+  const [upcoming, setUpcoming] = useState([]);
   const [loading, setLoading] = useState(true);
   const [stats, setStats] = useState({
     total: 0,
@@ -25,8 +26,22 @@ function Dashboard() {
 
   useEffect(() => {
     fetchTasks();
+    return eventsAPI.subscribe(applyEvents);
   }, []);
 
+  const applyEvents = (events) => {
+    const runs = new Map(
+      events
+        .filter((event) => event.type === 'task_run' && event.last_run)
+        .map((event) => [event.id, event.last_run])
+    );
+    if (runs.size > 0) {
+      setTasks((current) => current.map((task) => (
+        runs.has(task.id) ? { ...task, last_run: runs.get(task.id) } : task
+      )));
+    }
+  };
+
   const fetchTasks = async () => {
     try {
       const response = await tasksAPI.getAll();
@@ -38,13 +53,23 @@ function Dashboard() {
         total: tasksData.length,
         active: tasksData.filter(t => t.is_active).length,
         inactive: tasksData.filter(t => !t.is_active).length,
-        totalNotifications: tasksData.reduce((sum, task) => sum + (task.recipients?.length || 0), 0)
+        totalNotifications: tasksData.reduce((sum, task) => sum + (task.recipient_count || 0), 0)
       });
     } catch (error) {
       toast.error('Failed to fetch tasks');
     } finally {
       setLoading(false);
     }
+    fetchUpcoming();
+  };
+
+  const fetchUpcoming = async () => {
+    try {
+      const response = await tasksAPI.getUpcoming({ limit: 10 });
+      setUpcoming(response.data);
+    } catch (error) {
+      setUpcoming([]);
+    }
   };
 
   const handleToggle = async (taskId) => {
@@ -240,6 +265,31 @@ function Dashboard() {
           </div>
         </div>
 
+        {/* Upcoming Runs */}
+        {upcoming.length > 0 && (
+          <div className={`${isDark ? 'bg-gray-800' : 'bg-white'} rounded-lg shadow p-6 mb-8`}>
+            <h2 className={`text-lg font-semibold mb-4 flex items-center gap-2 ${isDark ? 'text-white' : 'text-gray-900'}`}>
+              <Clock className="w-5 h-5" />
+              Coming Up
+            </h2>
+            <ul className={`divide-y ${isDark ? 'divide-gray-700' : 'divide-gray-200'}`}>
+              {upcoming.map((run) => (
+                <li key={`${run.task_id}-${run.fire_time}`} className="flex justify-between py-2 text-sm">
+                  <Link
+                    to={`/tasks/${run.task_id}`}
+                    className={isDark ? 'text-gray-200 hover:text-indigo-400' : 'text-gray-800 hover:text-indigo-600'}
+                  >
+                    {run.task_name}
+                  </Link>
+                  <span className={isDark ? 'text-gray-400' : 'text-gray-600'}>
+                    {new Date(run.fire_time).toLocaleString()}
+                  </span>
+                </li>
+              ))}
+            </ul>
+          </div>
+        )}
+
         {/* Automations Section */}
         <div className="mb-6 flex flex-col sm:flex-row justify-between items-start sm:items-center">
           <div className="mb-4 sm:mb-0">
@@ -322,7 +372,7 @@ function Dashboard() {
                         <ArrowRight className="w-4 h-4" />
                         <div className="flex items-center gap-1">
                           <Smartphone className="w-4 h-4" />
-                          <span>SMS to {task.recipients?.length || 0} recipients</span>
+                          <span>SMS to {task.recipient_count || 0} recipients</span>
                         </div>
                       </div>
                     </div>
@@ -349,7 +399,7 @@ function Dashboard() {
                     </div>
                     <div className={`flex items-center gap-2 ${isDark ? 'text-gray-400' : 'text-gray-600'}`}>
                       <Bell className="w-4 h-4" />
-                      <span>{task.recipients?.length || 0} recipients</span>
+                      <span>{task.recipient_count || 0} recipients</span>
                     </div>
                     <div className={`flex items-center gap-2 ${isDark ? 'text-gray-400' : 'text-gray-600'}`}>
                       <Activity className="w-4 h-4" />
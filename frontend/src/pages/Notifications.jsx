@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { notificationsAPI } from '../services/api';
+import { notificationsAPI, eventsAPI, mergeNotificationEvents } from '../services/api';
 import { useTheme } from '../context/ThemeContext';
 import toast from 'react-hot-toast';
 import { ArrowLeft, CheckCircle, XCircle, AlertCircle, Clock } from 'lucide-react';
@@ -12,8 +12,16 @@ function Notifications() {
 
   useEffect(() => {
     fetchNotifications();
+    return eventsAPI.subscribe(applyEvents);
   }, []);
 
+  const applyEvents = (events) => {
+    const updates = events.filter((event) => event.type === 'notification');
+    if (updates.length > 0) {
+      setNotifications((current) => mergeNotificationEvents(current, updates));
+    }
+  };
+
   const fetchNotifications = async () => {
     try {
       const response = await notificationsAPI.getAll();
@@ -28,6 +36,7 @@ function Notifications() {
   const getStatusIcon = (status) => {
     switch (status) {
       case 'sent':
+      case 'delivered':
         return <CheckCircle className="w-5 h-5 text-green-600" />;
       case 'failed':
         return <XCircle className="w-5 h-5 text-red-600" />;
@@ -41,6 +50,7 @@ function Notifications() {
   const getStatusColor = (status) => {
     switch (status) {
       case 'sent':
+      case 'delivered':
         return 'bg-green-100 text-green-800';
       case 'failed':
         return 'bg-red-100 text-red-800';
@@ -1,8 +1,8 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, Link, useNavigate } from 'react-router-dom';
-import { tasksAPI, notificationsAPI } from '../services/api';
+import { tasksAPI, notificationsAPI, eventsAPI, mergeNotificationEvents } from '../services/api';
 import toast from 'react-hot-toast';
-import { ArrowLeft, Edit, Trash2, Clock, Bell, Link as LinkIcon, CheckCircle, XCircle, AlertCircle } from 'lucide-react';
+import { ArrowLeft, Edit, Trash2, Clock, Bell, Link as LinkIcon, CheckCircle, XCircle, AlertCircle, Webhook } from 'lucide-react';
 
 function TaskDetails() {
   const { id } = useParams();
@@ -10,11 +10,27 @@ function TaskDetails() {
   const [task, setTask] = useState(null);
   const [notifications, setNotifications] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [ingestToken, setIngestToken] = useState(null);
 
   useEffect(() => {
     fetchTaskDetails();
+    return eventsAPI.subscribe(applyEvents);
   }, [id]);
 
+  const applyEvents = (events) => {
+    const taskId = Number(id);
+    const updates = events.filter(
+      (event) => event.type === 'notification' && event.task_id === taskId
+    );
+    if (updates.length > 0) {
+      setNotifications((current) => mergeNotificationEvents(current, updates));
+    }
+    const run = events.find((event) => event.type === 'task_run' && event.id === taskId);
+    if (run?.last_run) {
+      setTask((current) => current && { ...current, last_run: run.last_run });
+    }
+  };
+
   const fetchTaskDetails = async () => {
     try {
       const [taskResponse, notificationsResponse] = await Promise.all([
@@ -45,9 +61,35 @@ function TaskDetails() {
     }
   };
 
+  const handleEnableIngest = async () => {
+    if (task.ingest_enabled && !window.confirm('Replace the current token? Senders using it will be rejected.')) {
+      return;
+    }
+
+    try {
+      const response = await tasksAPI.createIngestToken(id);
+      setIngestToken(response.data);
+      setTask((current) => ({ ...current, ingest_enabled: true }));
+    } catch (error) {
+      toast.error('Failed to create push token');
+    }
+  };
+
+  const handleDisableIngest = async () => {
+    try {
+      await tasksAPI.deleteIngestToken(id);
+      setIngestToken(null);
+      setTask((current) => ({ ...current, ingest_enabled: false }));
+      toast.success('Push webhook disabled');
+    } catch (error) {
+      toast.error('Failed to disable push webhook');
+    }
+  };
+
   const getStatusIcon = (status) => {
     switch (status) {
       case 'sent':
+      case 'delivered':
         return <CheckCircle className="w-5 h-5 text-green-600" />;
       case 'failed':
         return <XCircle className="w-5 h-5 text-red-600" />;
@@ -143,8 +185,13 @@ function TaskDetails() {
                   Schedule
                 </h3>
                 <p className="text-gray-900 mt-1">
-                  {task.schedule_human || task.schedule_cron || 'No schedule set'}
+                  {task.poll_min_seconds
+                    ? `Adaptive, every ${task.poll_min_seconds}s to ${task.poll_max_seconds}s`
+                    : task.schedule_human || task.schedule_cron || 'No schedule set'}
                 </p>
+                {task.priority && task.priority !== 'normal' && (
+                  <p className="text-sm text-gray-600 mt-1">Priority: {task.priority}</p>
+                )}
               </div>
 
               <div>
@@ -159,6 +206,11 @@ function TaskDetails() {
                     </span>
                   ))}
                 </div>
+                {task.contact_list_ids?.length > 0 && (
+                  <p className="text-sm text-gray-600 mt-1">
+                    Plus {task.contact_list_ids.length} contact list(s), {task.recipient_count} distinct numbers in total
+                  </p>
+                )}
               </div>
             </div>
 
@@ -169,6 +221,41 @@ function TaskDetails() {
               </div>
             )}
 
+            <div>
+              <h3 className="text-sm font-medium text-gray-700 flex items-center gap-2">
+                <Webhook className="w-4 h-4" />
+                Push Webhook
+              </h3>
+              <p className="text-sm text-gray-600 mt-1">
+                {task.ingest_enabled
+                  ? 'Enabled: JSON posted to the webhook runs this task right away, in place of fetching the source.'
+                  : 'Disabled: this task only runs on its schedule.'}
+              </p>
+              {ingestToken && (
+                <div className="mt-2 bg-gray-50 p-3 rounded text-sm space-y-1">
+                  <p className="text-gray-700">Copy the token now, it will not be shown again.</p>
+                  <p><span className="text-gray-600">URL:</span> <code>{ingestToken.url}</code></p>
+                  <p><span className="text-gray-600">X-Ingest-Token:</span> <code className="break-all">{ingestToken.token}</code></p>
+                </div>
+              )}
+              <div className="flex gap-2 mt-2">
+                <button
+                  onClick={handleEnableIngest}
+                  className="px-3 py-1 text-sm bg-indigo-600 text-white rounded-md hover:bg-indigo-700"
+                >
+                  {task.ingest_enabled ? 'New Token' : 'Enable'}
+                </button>
+                {task.ingest_enabled && (
+                  <button
+                    onClick={handleDisableIngest}
+                    className="px-3 py-1 text-sm bg-gray-200 text-gray-800 rounded-md hover:bg-gray-300"
+                  >
+                    Disable
+                  </button>
+                )}
+              </div>
+            </div>
+
             <div className="grid md:grid-cols-2 gap-4 text-sm">
               <div>
                 <span className="text-gray-600">Last Run:</span>{' '}
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate, useParams, Link } from 'react-router-dom';
 import { useTheme } from '../context/ThemeContext';
-import { tasksAPI } from '../services/api';
+import { tasksAPI, contactsAPI } from '../services/api';
 import toast from 'react-hot-toast';
 import WebScrapingForm from './WebScrapingForm';
 import {
@@ -25,9 +25,15 @@ const [formData, setFormData] = useState({
     web_scraping_frequency: 'hourly', // New field for web scraping
     schedule_cron: '',
     schedule_human: '',
+    poll_min_seconds: null,
+    poll_max_seconds: null,
     recipients: [],
+    contact_list_ids: [],
     condition_rules: { type: 'always' },
     message_template: '',
+    transliterate: false,
+    digest_window_seconds: 0,
+    priority: 'normal',
     is_active: true,
   });
 
@@ -75,8 +81,37 @@ const dataSources = [
   const [conditionValue, setConditionValue] = useState('');
   const [conditionField, setConditionField] = useState('');
   const [loading, setLoading] = useState(false);
+  const [messagePreview, setMessagePreview] = useState(null);
+  const [contactLists, setContactLists] = useState([]);
   const { isDark } = useTheme();
 
+  useEffect(() => {
+    contactsAPI.getLists()
+      .then((response) => setContactLists(response.data))
+      .catch(() => setContactLists([]));
+  }, []);
+
+  // Encoding and segment count of the template, refreshed shortly after typing stops
+  useEffect(() => {
+    if (!formData.message_template) {
+      setMessagePreview(null);
+      return undefined;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const response = await tasksAPI.previewMessage({
+          template: formData.message_template,
+          sample_data: { name: formData.name, description: formData.description },
+          transliterate: formData.transliterate,
+        });
+        setMessagePreview(response.data);
+      } catch (error) {
+        setMessagePreview(null);
+      }
+    }, 400);
+    return () => clearTimeout(timer);
+  }, [formData.message_template, formData.transliterate, formData.name, formData.description]);
+
   useEffect(() => {
     if (isEdit) {
       fetchTask();
@@ -87,12 +122,22 @@ const dataSources = [
     try {
       const response = await tasksAPI.getById(id);
       const task = response.data;
+      const scraped = task.source_type === 'html' ? task.scrape_fields?.content : null;
       setFormData({
         ...task,
         data_source_type: task.data_source_type || 'web_scraping',
         web_scraping_keyword: task.web_scraping_keyword || '',
         web_scraping_frequency: task.web_scraping_frequency || 'hourly',
+        ...(scraped && {
+          web_scraping_mode: scraped.css ? 'css_selector' : 'xpath',
+          web_scraping_selector: scraped.css || '',
+          web_scraping_xpath: scraped.xpath || '',
+          web_scraping_extract_numbers: scraped.number,
+        }),
       });
+      if (scraped) {
+        setSelectedDataSource('web_scraping');
+      }
       
       if (task.condition_rules) {
         setConditionType(task.condition_rules.type || 'always');
@@ -123,6 +168,15 @@ const dataSources = [
     }
   };
 
+  const toggleContactList = (listId) => {
+    setFormData((prev) => ({
+      ...prev,
+      contact_list_ids: prev.contact_list_ids.includes(listId)
+        ? prev.contact_list_ids.filter((id) => id !== listId)
+        : [...prev.contact_list_ids, listId],
+    }));
+  };
+
   const removeRecipient = (index) => {
     setFormData((prev) => ({
       ...prev,
@@ -151,6 +205,24 @@ const dataSources = [
     return rules;
   };
 
+  // CSS/XPath scraping extracts the selected element as {content} for conditions and templates
+  const buildScrapeConfig = () => {
+    const mode = formData.web_scraping_mode;
+    const selector = mode === 'css_selector' ? formData.web_scraping_selector : formData.web_scraping_xpath;
+    if (selectedDataSource !== 'web_scraping' || !['css_selector', 'xpath'].includes(mode) || !selector) {
+      return { source_type: 'json', scrape_fields: null };
+    }
+    return {
+      source_type: 'html',
+      scrape_fields: {
+        content: {
+          [mode === 'css_selector' ? 'css' : 'xpath']: selector,
+          number: Boolean(formData.web_scraping_extract_numbers),
+        },
+      },
+    };
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     setLoading(true);
@@ -158,6 +230,7 @@ const dataSources = [
     try {
       const submitData = {
         ...formData,
+        ...buildScrapeConfig(),
         condition_rules: buildConditionRules(),
       };
 
@@ -501,6 +574,38 @@ const dataSources = [
                 </p>
               </div>
             </div>
+
+            <div className="mt-6">
+              <label className={`block text-sm font-medium mb-2 ${
+                isDark ? 'text-gray-300' : 'text-gray-700'
+              }`}>
+                Adaptive Polling (seconds)
+              </label>
+              <div className="grid md:grid-cols-2 gap-6">
+                {['poll_min_seconds', 'poll_max_seconds'].map((name) => (
+                  <input
+                    key={name}
+                    type="number"
+                    min="5"
+                    max="86400"
+                    name={name}
+                    value={formData[name] ?? ''}
+                    onChange={(e) => handleChange({
+                      target: { name, value: e.target.value === '' ? null : Number(e.target.value) },
+                    })}
+                    className={`w-full px-3 py-2 rounded-md focus:outline-none focus:ring-indigo-500 focus:border-indigo-500 ${
+                      isDark
+                        ? 'bg-gray-700 border-gray-600 text-white'
+                        : 'bg-white border-gray-300 text-gray-900'
+                    }`}
+                    placeholder={name === 'poll_min_seconds' ? 'Fastest, e.g. 10' : 'Slowest, e.g. 3600'}
+                  />
+                ))}
+              </div>
+              <p className={`text-sm mt-1 ${isDark ? 'text-gray-400' : 'text-gray-500'}`}>
+                Optional: replaces the schedule. Polls at the fastest rate while the data changes and slows down while it stays the same
+              </p>
+            </div>
           </div>
 
           {/* Step 3: Conditions */}
@@ -643,6 +748,31 @@ const dataSources = [
                   </span>
                 ))}
               </div>
+              {contactLists.length > 0 && (
+                <div className="mt-4">
+                  <p className={`text-sm font-medium mb-2 ${isDark ? 'text-gray-300' : 'text-gray-700'}`}>
+                    Contact Lists
+                  </p>
+                  <div className="space-y-2">
+                    {contactLists.map((contactList) => (
+                      <div key={contactList.id} className="flex items-center">
+                        <input
+                          type="checkbox"
+                          id={`contact_list_${contactList.id}`}
+                          checked={formData.contact_list_ids.includes(contactList.id)}
+                          onChange={() => toggleContactList(contactList.id)}
+                          className={`h-4 w-4 text-indigo-600 focus:ring-indigo-500 rounded ${
+                            isDark ? 'border-gray-600 bg-gray-700' : 'border-gray-300'
+                          }`}
+                        />
+                        <label htmlFor={`contact_list_${contactList.id}`} className={`ml-2 block text-sm ${isDark ? 'text-gray-300' : 'text-gray-900'}`}>
+                          {contactList.name} ({contactList.contact_count} numbers)
+                        </label>
+                      </div>
+                    ))}
+                  </div>
+                </div>
+              )}
             </div>
 
             {/* Message Template */}
@@ -667,6 +797,77 @@ const dataSources = [
               <p className={`text-sm mt-1 ${isDark ? 'text-gray-400' : 'text-gray-500'}`}>
                 Use curly braces for dynamic fields from your data source
               </p>
+              {messagePreview && (
+                <p className={`text-sm mt-1 ${
+                  messagePreview.segments > 1
+                    ? (isDark ? 'text-yellow-400' : 'text-yellow-700')
+                    : (isDark ? 'text-gray-400' : 'text-gray-500')
+                }`}>
+                  {messagePreview.encoding} · {messagePreview.length}/{messagePreview.segment_limit * Math.max(messagePreview.segments, 1)} characters · {messagePreview.segments} SMS {messagePreview.segments === 1 ? 'part' : 'parts'} per recipient
+                  {messagePreview.transliterated && messagePreview.transliterated.segments < messagePreview.segments && (
+                    <> (characters {messagePreview.non_gsm_characters.join(' ')} force UCS-2; transliterating would use {messagePreview.transliterated.segments})</>
+                  )}
+                </p>
+              )}
+              <div className="flex items-center mt-2">
+                <input
+                  type="checkbox"
+                  name="transliterate"
+                  id="transliterate"
+                  checked={formData.transliterate}
+                  onChange={handleChange}
+                  className={`h-4 w-4 text-indigo-600 focus:ring-indigo-500 rounded ${
+                    isDark ? 'border-gray-600 bg-gray-700' : 'border-gray-300'
+                  }`}
+                />
+                <label htmlFor="transliterate" className={`ml-2 block text-sm ${isDark ? 'text-gray-300' : 'text-gray-900'}`}>
+                  Replace smart quotes, dashes and accents with plain characters to keep messages in GSM-7
+                </label>
+              </div>
+              <div className="mt-4">
+                <label htmlFor="digest_window_seconds" className={`block text-sm font-medium ${isDark ? 'text-gray-300' : 'text-gray-700'}`}>
+                  Digest Window
+                </label>
+                <select
+                  name="digest_window_seconds"
+                  id="digest_window_seconds"
+                  value={formData.digest_window_seconds}
+                  onChange={(e) => handleChange({ target: { name: 'digest_window_seconds', value: Number(e.target.value) } })}
+                  className={`mt-1 block w-full rounded-md shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm ${
+                    isDark ? 'bg-gray-700 border-gray-600 text-white' : 'border-gray-300'
+                  }`}
+                >
+                  <option value={0}>Send immediately</option>
+                  <option value={60}>1 minute</option>
+                  <option value={300}>5 minutes</option>
+                  <option value={900}>15 minutes</option>
+                  <option value={3600}>1 hour</option>
+                </select>
+                <p className={`mt-1 text-xs ${isDark ? 'text-gray-400' : 'text-gray-500'}`}>
+                  Messages to the same recipient within the window are merged into as few SMS as possible
+                </p>
+              </div>
+              <div className="mt-4">
+                <label htmlFor="priority" className={`block text-sm font-medium ${isDark ? 'text-gray-300' : 'text-gray-700'}`}>
+                  Priority
+                </label>
+                <select
+                  name="priority"
+                  id="priority"
+                  value={formData.priority}
+                  onChange={handleChange}
+                  className={`mt-1 block w-full rounded-md shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm ${
+                    isDark ? 'bg-gray-700 border-gray-600 text-white' : 'border-gray-300'
+                  }`}
+                >
+                  <option value="urgent">Urgent (alerts)</option>
+                  <option value="normal">Normal</option>
+                  <option value="bulk">Bulk (broadcasts)</option>
+                </select>
+                <p className={`mt-1 text-xs ${isDark ? 'text-gray-400' : 'text-gray-500'}`}>
+                  Urgent messages go out ahead of normal and bulk ones when the server is busy
+                </p>
+              </div>
             </div>
           </div>
 
@@ -73,10 +73,26 @@ export const authAPI = {
 export const tasksAPI = {
   getAll: () => api.get('/api/tasks/'),
   getById: (id) => api.get(`/api/tasks/${id}`),
+  getUpcoming: (params) => api.get('/api/tasks/upcoming', { params, paramsSerializer: { indexes: null } }),
   create: (data) => api.post('/api/tasks/', data),
   update: (id, data) => api.put(`/api/tasks/${id}`, data),
   delete: (id) => api.delete(`/api/tasks/${id}`),
   toggle: (id) => api.post(`/api/tasks/${id}/toggle`),
+  previewMessage: (data) => api.post('/api/tasks/preview', data),
+  createIngestToken: (id) => api.post(`/api/tasks/${id}/ingest-token`),
+  deleteIngestToken: (id) => api.delete(`/api/tasks/${id}/ingest-token`),
+};
+
+// Contact lists API
+export const contactsAPI = {
+  getLists: () => api.get('/api/contacts/lists'),
+  getList: (id) => api.get(`/api/contacts/lists/${id}`),
+  createList: (data) => api.post('/api/contacts/lists', data),
+  updateList: (id, data) => api.put(`/api/contacts/lists/${id}`, data),
+  deleteList: (id) => api.delete(`/api/contacts/lists/${id}`),
+  getContacts: (id, after) => api.get(`/api/contacts/lists/${id}/contacts`, { params: { after } }),
+  importContacts: (id, phoneNumbers) => api.post(`/api/contacts/lists/${id}/contacts`, { phone_numbers: phoneNumbers }),
+  removeContacts: (id, phoneNumbers) => api.post(`/api/contacts/lists/${id}/contacts/delete`, { phone_numbers: phoneNumbers }),
 };
 
 // Notifications API
@@ -86,5 +102,31 @@ export const notificationsAPI = {
   getById: (id) => api.get(`/api/notifications/${id}`),
 };
 
+// Real-time events (Server-Sent Events)
+export const eventsAPI = {
+  // Calls onBatch with each coalesced batch of events; returns an unsubscribe function
+  subscribe: (onBatch) => {
+    const token = localStorage.getItem('token');
+    const source = new EventSource(
+      `${API_BASE_URL}/api/events/stream?token=${encodeURIComponent(token || '')}`
+    );
+    source.addEventListener('batch', (event) => onBatch(JSON.parse(event.data)));
+    return () => source.close();
+  },
+};
+
+// Merge pushed notification events into a notification list (newest first)
+export const mergeNotificationEvents = (notifications, events) => {
+  const updates = new Map(events.map((event) => [event.id, event]));
+  const merged = notifications.map((notification) => {
+    const update = updates.get(notification.id);
+    if (!update) return notification;
+    updates.delete(notification.id);
+    return { ...notification, ...update };
+  });
+  const added = [...updates.values()].sort((a, b) => b.id - a.id);
+  return [...added, ...merged];
+};
+
 export default api;
 